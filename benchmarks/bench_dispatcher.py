@@ -0,0 +1,370 @@
+"""Бенчмарк диспетчера: сколько апдейтов в секунду выдерживает настройка из main.
+
+Собирает настоящий диспетчер (main.build_dispatcher: middleware, роутеры,
+обработчики) и бота с фейковой сессией: она записывает исходящие вызовы
+Bot API и отвечает с заданной задержкой. Поток апдейтов — синтетическая смесь
+болтовни, обращений к боту, админ-команд и тиков новостей либо записанный
+JSONL-файл (одна строка — апдейт Telegram или {"news_tick": channel_id}).
+AI-ответы подменяются задержкой --ai-latency, ленты — синтетическим RSS,
+поэтому бенчмарк работает без сети. Лимиты очереди отправки по умолчанию
+сняты, чтобы мерить диспетчер, а не token bucket (--real-limits вернёт их).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_dispatcher
+    python -m benchmarks.bench_dispatcher --count 5000 --api-latency 0.03 --save stream.jsonl
+    python -m benchmarks.bench_dispatcher --replay stream.jsonl --json after.json --compare before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+try:
+    import resource
+except ImportError:  # Windows: пиковый RSS недоступен
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TOKEN = "42:bench"
+BOT_ID = 42
+BOT_USERNAME = "benchbot"
+ADMIN_USERS = range(1, 51)  # Команды приходят от разных админов, чтобы не упираться в антифлуд
+FIRST_USER_ID = 100
+NEWS_TOPIC = "bench"
+NEWS_FEED = "bench://feed"
+NEWS_CHANNEL_BASE = -2000
+
+WORDS = (
+    "привет как дела кто знает где купить видеокарту сегодня завтра погода новости "
+    "релиз python asyncio телеграм бот чат работа вечером встреча код ревью баг фикс "
+    "кофе обед отпуск спасибо отлично согласен сомневаюсь ссылка документация"
+).split()
+COMMANDS = ("/stats", "/mod_list", "/warn", "/del")
+KINDS = ("chatter", "mention", "command", "news")
+
+
+def synthetic_stream(count: int, chats: int, users: int, mix: Dict[str, float],
+                     seed: int) -> Iterator[Dict[str, Any]]:
+    """Поток апдейтов в формате Bot API вперемешку с тиками новостей"""
+    rng = random.Random(seed)
+    kinds, weights = zip(*((kind, mix.get(kind, 0)) for kind in KINDS))
+    message_ids = itertools.count(1)
+    last_message: Dict[int, Dict[str, Any]] = {}
+
+    for update_id in range(1, count + 1):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "news":
+            yield {"news_tick": NEWS_CHANNEL_BASE - rng.randrange(max(1, chats // 5))}
+            continue
+
+        chat_id = -1000 - rng.randrange(chats)
+        if kind == "command":
+            user_id = rng.choice(ADMIN_USERS)
+        else:
+            user_id = FIRST_USER_ID + rng.randrange(users)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+        if kind == "mention":
+            text = f"@{BOT_USERNAME} {text}?"
+        elif kind == "command":
+            text = rng.choice(COMMANDS)
+
+        message = {
+            "message_id": next(message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"bench {chat_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+        }
+        if kind == "command" and text in ("/warn", "/del") and chat_id in last_message:
+            message["reply_to_message"] = last_message[chat_id]
+        if kind == "command" and text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        if kind == "chatter":
+            last_message[chat_id] = dict(message)
+        yield {"update_id": update_id, "message": message}
+
+
+def classify(record: Dict[str, Any]) -> str:
+    if "news_tick" in record:
+        return "news"
+    text = record.get("message", {}).get("text", "")
+    if text.startswith("/"):
+        return "command"
+    if f"@{BOT_USERNAME}" in text:
+        return "mention"
+    return "chatter"
+
+
+def load_stream(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_stream(path: Path, stream: List[Dict[str, Any]]):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in stream:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def make_session(latency: float, jitter: float, seed: int):
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import (
+        EditMessageText, GetChatMember, GetMe, SendDocument, SendMediaGroup, SendMessage, SendPhoto
+    )
+    from aiogram.types import Chat, ChatMemberMember, ChatMemberOwner, Message, User
+
+    class FakeSession(BaseSession):
+        """Записывает вызовы Bot API и отвечает после задержки"""
+
+        def __init__(self):
+            super().__init__()
+            self.calls: Counter = Counter()
+            self._rng = random.Random(seed)
+            self._message_ids = itertools.count(10 ** 6)
+
+        async def make_request(self, bot, method, timeout=None):
+            self.calls[method.__api_method__] += 1
+            delay = latency + self._rng.uniform(0, jitter)
+            if delay:
+                await asyncio.sleep(delay)
+
+            if isinstance(method, GetMe):
+                return User(id=BOT_ID, is_bot=True, first_name="bench", username=BOT_USERNAME)
+            if isinstance(method, GetChatMember):
+                user = User(id=method.user_id, is_bot=False, first_name="user")
+                if method.user_id in ADMIN_USERS:
+                    return ChatMemberOwner(user=user, is_anonymous=False)
+                return ChatMemberMember(user=user)
+            if isinstance(method, (SendMessage, SendPhoto, SendDocument, EditMessageText)):
+                return self._message(bot, method.chat_id)
+            if isinstance(method, SendMediaGroup):
+                return [self._message(bot, method.chat_id) for _ in method.media]
+            return True
+
+        def _message(self, bot, chat_id):
+            chat = Chat(id=chat_id or 0, type="supergroup")
+            return Message(message_id=next(self._message_ids), date=int(time.time()),
+                           chat=chat, text="ok").as_(bot)
+
+        async def stream_content(self, *args, **kwargs):
+            raise NotImplementedError
+            yield b""
+
+        async def close(self):
+            pass
+
+    return FakeSession()
+
+
+def synthetic_feed(tick: int, items: int = 5):
+    """Свежие записи RSS на каждый тик, чтобы рассылка не упиралась в дедупликацию"""
+    import feedparser
+
+    entries = [
+        feedparser.FeedParserDict(
+            id=f"bench-{tick}-{index}",
+            title=f"Новость {tick}.{index}: {' '.join(random.sample(WORDS, 5))}",
+            link=f"https://example.com/{tick}/{index}",
+            description=f"<p>{' '.join(random.sample(WORDS, 20))}</p>",
+            published_parsed=time.gmtime(),
+        )
+        for index in range(items)
+    ]
+    return feedparser.FeedParserDict(bozo=0, entries=entries)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def isolate_storage(workdir: Path):
+    """Переносит хранилища с абсолютными путями (статистика, варны, промпты) в workdir"""
+    from services import prompt_manager, stats_manager, warn_manager
+
+    stats_manager.STATS_DIR = warn_manager.WARNS_DIR = workdir / "stats"
+    stats_manager.STATS_FILE = stats_manager.STATS_DIR / "stats.json"
+    warn_manager.WARNS_FILE = warn_manager.WARNS_DIR / "warns.json"
+    prompt_manager.PROMPTS_FILE = workdir / "data" / "chat_settings.json"
+
+
+async def run(stream: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    import main
+    from aiogram import Bot
+    from config import config
+    from services import ai
+    from services.news_service import news_service
+    from services.send_queue import TokenBucket, outbound
+
+    async def fake_ai_response(chat_id: int, text: str) -> str:
+        await asyncio.sleep(args.ai_latency)
+        return "Ответ модели: " + text[::-1][:200]
+
+    ai.get_ai_response = fake_ai_response
+    if not args.real_limits:
+        unlimited = 1e9
+        outbound.chat_rate = outbound.group_rate = outbound.group_capacity = unlimited
+        outbound._global = TokenBucket(unlimited, unlimited)
+
+    session = make_session(args.api_latency, args.api_jitter, args.seed)
+    bot = Bot(TOKEN, session=session)
+    dp = main.build_dispatcher()
+    await main.load_services()
+
+    config.RSS_MAPPING[NEWS_TOPIC] = [NEWS_FEED]
+    news_channels = {record["news_tick"] for record in stream if "news_tick" in record}
+    for channel_id in news_channels:
+        news_service.add_subscription(channel_id, [NEWS_TOPIC], ["09:00"])
+    ticks = itertools.count()
+
+    async def handle(record: Dict[str, Any]):
+        if "news_tick" in record:
+            news_service.feed_cache._entries[NEWS_FEED] = (time.monotonic(), synthetic_feed(next(ticks)))
+            await news_service.process_scheduled_posts(bot, [(record["news_tick"], "09:00")])
+        else:
+            await dp.feed_raw_update(bot, record)
+
+    latencies: Dict[str, List[float]] = {kind: [] for kind in KINDS}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def timed(record: Dict[str, Any]):
+        try:
+            start = time.perf_counter()
+            await handle(record)
+            latencies[classify(record)].append(time.perf_counter() - start)
+        finally:
+            semaphore.release()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    started = time.perf_counter()
+    tasks = []
+    for record in stream:
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(timed(record)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    blocks_after = sys.getallocatedblocks()
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else 0
+    if args.tracemalloc:
+        tracemalloc.stop()
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "updates": len(stream),
+        "elapsed": elapsed,
+        "throughput": len(stream) / elapsed,
+        "p50_ms": percentile(everything, 0.5) * 1000,
+        "p99_ms": percentile(everything, 0.99) * 1000,
+        "by_kind": {
+            kind: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.5) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+            }
+            for kind, values in latencies.items() if values
+        },
+        "api_calls": dict(session.calls.most_common()),
+        "net_blocks": blocks_after - blocks_before,
+        "traced_peak_kb": traced_peak / 1024,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0,
+    }
+
+
+def report(result: Dict[str, Any], baseline: Dict[str, Any] = None):
+    def delta(key: str) -> str:
+        if not baseline or not baseline.get(key):
+            return ""
+        return f"  ({(result[key] / baseline[key] - 1) * 100:+.1f}%)"
+
+    print(f"Updates:      {result['updates']} in {result['elapsed']:.2f} s")
+    print(f"Throughput:   {result['throughput']:.0f} updates/s{delta('throughput')}")
+    print(f"Latency:      p50 {result['p50_ms']:.2f} ms{delta('p50_ms')}, "
+          f"p99 {result['p99_ms']:.2f} ms{delta('p99_ms')}")
+    for kind, stats in result["by_kind"].items():
+        print(f"  {kind:8} {stats['count']:6}  p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms")
+    print("Bot API calls: " + ", ".join(f"{name} {count}" for name, count in result["api_calls"].items()))
+    print(f"Memory:       peak RSS {result['peak_rss_kb'] / 1024:.1f} MB{delta('peak_rss_kb')}, "
+          f"net allocated blocks {result['net_blocks']}")
+    if result["traced_peak_kb"]:
+        print(f"              tracemalloc peak {result['traced_peak_kb'] / 1024:.1f} MB{delta('traced_peak_kb')}")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"unknown kind {kind!r}, expected one of {KINDS}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--users", type=int, default=5000,
+                        help="авторов болтовни; антифлуд пропускает 5 сообщений автора в минуту")
+    parser.add_argument("--mix", type=parse_mix, default="chatter=85,mention=8,command=5,news=2",
+                        help="веса видов апдейтов: chatter, mention, command, news")
+    parser.add_argument("--concurrency", type=int, default=100, help="апдейтов в обработке одновременно")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="задержка ответа Bot API, сек")
+    parser.add_argument("--api-jitter", type=float, default=0.01)
+    parser.add_argument("--ai-latency", type=float, default=0.5, help="задержка ответа AI, сек")
+    parser.add_argument("--real-limits", action="store_true", help="оставить лимиты очереди отправки")
+    parser.add_argument("--tracemalloc", action="store_true", help="пиковая память через tracemalloc (медленнее)")
+    parser.add_argument("--replay", type=Path, help="JSONL-поток вместо синтетического")
+    parser.add_argument("--save", type=Path, help="сохранить поток в JSONL для повторных прогонов")
+    parser.add_argument("--json", type=Path, help="сохранить результат для сравнения коммитов")
+    parser.add_argument("--compare", type=Path, help="результат прошлого прогона (--json)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+
+    if args.replay:
+        stream = load_stream(args.replay)
+    else:
+        stream = list(synthetic_stream(args.count, args.chats, args.users, args.mix, args.seed))
+    if args.save:
+        save_stream(args.save, stream)
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    os.environ.setdefault("BOT_TOKEN", TOKEN)
+    sys.path.insert(0, str(ROOT))
+    logging.basicConfig(level=logging.CRITICAL)
+
+    # Пустой рабочий каталог: хранилища сервисов создаются с нуля и не трогают data/ и stats/ проекта
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            isolate_storage(Path(workdir))
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = asyncio.run(run(stream, args))
+        finally:
+            os.chdir(cwd)
+
+    report(result, baseline)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Бенчмарк модерации: скорость проверки сообщений при тысячах правил.
+
+Сравнивает прежнюю схему (re.search по каждому шаблону) с движком
+services.moderation (автомат Ахо-Корасик + одна regex-альтернация).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_moderation
+    python -m benchmarks.bench_moderation --rules 1000 5000 20000 --messages 2000
+"""
+import argparse
+import random
+import re
+import time
+
+from services.moderation import ChatRules, CompiledRules
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+
+def random_word(rng: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(low, high)))
+
+
+def make_messages(rng: random.Random, count: int, words: list, hit_rate: float) -> list:
+    messages = []
+    for _ in range(count):
+        text = [random_word(rng, 2, 9) for _ in range(rng.randint(5, 40))]
+        if rng.random() < hit_rate:
+            text.insert(rng.randrange(len(text)), rng.choice(words).upper())
+        messages.append(" ".join(text))
+    return messages
+
+
+def legacy_check(patterns, text: str) -> bool:
+    """Прежняя схема contains_bad_words"""
+    text_lower = text.lower()
+    return any(re.search(pattern, text_lower) for pattern in patterns)
+
+
+def measure(func, messages) -> float:
+    start = time.perf_counter()
+    for text in messages:
+        func(text)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--patterns", type=int, default=20, help="regex-правил в каждом наборе")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--hit-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for count in args.rules:
+        rng = random.Random(args.seed)
+        words = sorted({random_word(rng) for _ in range(count)})
+        patterns = [rf"{random_word(rng, 3, 5)}\d{{2,}}" for _ in range(args.patterns)]
+        messages = make_messages(rng, args.messages, words, args.hit_rate)
+
+        start = time.perf_counter()
+        compiled = CompiledRules([ChatRules(words=words, patterns=patterns)])
+        build = time.perf_counter() - start
+
+        engine = measure(compiled.match, messages)
+        legacy_patterns = [re.escape(word) for word in words] + patterns
+        legacy = measure(lambda text: legacy_check(legacy_patterns, text), messages)
+        print(f"{len(words):6} words + {len(patterns)} patterns: "
+              f"engine {engine:8.0f} msg/s (build {build * 1000:6.1f} ms)   "
+              f"re.search loop {legacy:8.0f} msg/s   x{engine / legacy:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Бенчмарк разбора RSS-записей: записей в секунду на сохранённом корпусе.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_news_parser
+    python -m benchmarks.bench_news_parser --save https://habr.com/ru/rss/all/all/
+"""
+import argparse
+import re
+import time
+import urllib.request
+from pathlib import Path
+
+import feedparser
+
+from services.news_parser import extract_item
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus" / "feeds"
+
+
+def legacy_extract(entry):
+    """Прежняя схема: два прохода BeautifulSoup html.parser"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(entry.description, "html.parser")
+    img_tag = soup.find("img")
+    image_url = img_tag["src"] if img_tag else ""
+    text = re.sub(r'<a\b[^>]*>Читать далее</a>', '', entry.description)
+    clean_text = BeautifulSoup(text, "html.parser").get_text().strip()
+    return image_url, clean_text
+
+
+def load_corpus(corpus_dir: Path):
+    entries = []
+    for path in sorted(corpus_dir.glob("*.xml")):
+        feed = feedparser.parse(str(path))
+        entries.extend(feed.entries)
+        print(f"  {path.name}: {len(feed.entries)} entries")
+    return entries
+
+
+def measure(func, entries, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for entry in entries:
+            func(entry)
+    elapsed = time.perf_counter() - start
+    return len(entries) * rounds / elapsed
+
+
+def save_feeds(urls, corpus_dir: Path):
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    for url in urls:
+        name = re.sub(r"[^a-zA-Z0-9]+", "_", url.split("://", 1)[-1]).strip("_")
+        with urllib.request.urlopen(url, timeout=30) as response:
+            (corpus_dir / f"{name}.xml").write_bytes(response.read())
+        print(f"Saved {url} -> {name}.xml")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--save", nargs="+", metavar="URL", help="сохранить ленты в корпус")
+    args = parser.parse_args()
+
+    if args.save:
+        save_feeds(args.save, args.corpus)
+
+    print(f"Corpus: {args.corpus}")
+    entries = load_corpus(args.corpus)
+    if not entries:
+        print("Корпус пуст")
+        return
+
+    rate = measure(lambda e: extract_item(e, e.get("id", "")), entries, args.rounds)
+    print(f"lxml single pass : {rate:10.0f} entries/s")
+    try:
+        legacy = measure(legacy_extract, entries, args.rounds)
+        print(f"bs4 two pass     : {legacy:10.0f} entries/s  (x{rate / legacy:.1f})")
+    except ImportError:
+        print("bs4 не установлен, сравнение пропущено")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Бенчмарк масштабирования обработки апдейтов по процессам-воркерам.
+
+Супервизор раздаёт синтетические апдейты групп по chat_id воркерам; каждый
+воркер разбирает их через aiogram Dispatcher, а хендлер выполняет
+CPU-работу, похожую на реальную (SimHash текста, JSON-сериализация).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sharding
+    python -m benchmarks.bench_sharding --workers 1 2 4 8 --count 20000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+
+from services.simhash import simhash
+from services.supervisor import Supervisor, consume_updates
+
+TEXT = ("Бот обрабатывает сообщение в группе: проверка правил, подсчёт статистики, "
+        "контекст диалога и ответ модели. ") * 4
+
+
+def make_update(update_id: int, chats: int):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": -1001000000000 - update_id % chats, "type": "supergroup", "title": "bench"},
+            "from": {"id": update_id % 1000 + 1, "is_bot": False, "first_name": "user"},
+            "text": f"{TEXT} #{update_id}"
+        }
+    }
+
+
+async def bench_worker_main(updates, ready, done, rounds: int):
+    handled = 0
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handler(message: Message):
+        nonlocal handled
+        for _ in range(rounds):
+            fingerprint = simhash(message.text)
+            json.dumps({"chat": message.chat.id, "text": message.text, "hash": fingerprint})
+        handled += 1
+
+    bot = Bot("42:bench")
+    ready.put(os.getpid())
+    await consume_updates(dp, bot, updates)
+    await bot.session.close()
+    done.put(handled)
+
+
+def bench_worker(index, count, updates, limiter_state, ready, done, rounds):
+    asyncio.run(bench_worker_main(updates, ready, done, rounds))
+
+
+def run(workers: int, count: int, chats: int, rounds: int) -> float:
+    ctx = multiprocessing.get_context("spawn")
+    ready, done = ctx.Queue(), ctx.Queue()
+    supervisor = Supervisor(workers, bench_worker, args=(ready, done, rounds))
+    supervisor.start()
+    for _ in range(workers):
+        ready.get()
+
+    updates = [make_update(update_id, chats) for update_id in range(1, count + 1)]
+    start = time.perf_counter()
+    for update in updates:
+        supervisor.dispatch(update)
+    supervisor.stop(timeout=600)
+    elapsed = time.perf_counter() - start
+
+    handled = sum(done.get() for _ in range(workers))
+    assert handled == count, f"handled {handled} of {count}"
+    spread = "/".join(str(n) for n in supervisor.routed)
+    print(f"  workers={workers:<2}  {count / elapsed:8.0f} updates/s   routed {spread}")
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cpus = os.cpu_count() or 1
+    defaults = sorted({n for n in (1, 2, 4, 8) if n <= cpus} | {cpus})
+    parser.add_argument("--workers", type=int, nargs="+", default=defaults)
+    parser.add_argument("--count", type=int, default=10000, help="сколько апдейтов подать")
+    parser.add_argument("--chats", type=int, default=500, help="сколько разных групп")
+    parser.add_argument("--rounds", type=int, default=3, help="повторов CPU-работы в хендлере")
+    args = parser.parse_args()
+
+    print(f"{args.count} updates over {args.chats} chats, {cpus} CPUs")
+    base = None
+    for workers in args.workers:
+        rate = run(workers, args.count, args.chats, args.rounds)
+        base = base or rate
+        print(f"             speedup x{rate / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
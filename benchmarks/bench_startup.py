@@ -0,0 +1,84 @@
+"""Бенчмарк старта бота: время импорта модулей и загрузки сервисов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --top 30 --rounds 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Импорт main и загрузка состояния сервисов в отдельном процессе
+STARTUP_SCRIPT = """
+import asyncio, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+asyncio.run(main.load_services())
+loaded = time.perf_counter()
+print(f"{{imported - start:.6f}} {{loaded - imported:.6f}}")
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, str]]:
+    """(self мкс, cumulative мкс, модуль) из вывода -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def run_startup(cwd: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    env = dict(os.environ, BOT_TOKEN=os.getenv("BOT_TOKEN", "0:bench"))
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", STARTUP_SCRIPT.format(root=str(ROOT))]
+    return subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=20, help="сколько модулей показать")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    # Пустой рабочий каталог: сервисы создают хранилища с нуля, как при первом запуске
+    with tempfile.TemporaryDirectory() as cwd:
+        result = run_startup(cwd, importtime=True)
+        if result.returncode != 0:
+            print(result.stderr[-2000:])
+            sys.exit(result.returncode)
+
+        rows = parse_importtime(result.stderr)
+        print(f"Top {args.top} modules by cumulative import time:")
+        for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+        import_times, load_times = [], []
+        for _ in range(args.rounds):
+            result = run_startup(cwd)
+            imported, loaded = map(float, result.stdout.split()[-2:])
+            import_times.append(imported)
+            load_times.append(loaded)
+
+    print(f"\nimport main      : {statistics.median(import_times) * 1000:8.1f} ms (median of {args.rounds})")
+    print(f"load_services()  : {statistics.median(load_times) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
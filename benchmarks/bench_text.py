@@ -0,0 +1,313 @@
+"""Бенчмарк обработки текста ответов: время и память по функциям и размерам.
+
+Гоняет функции, через которые проходит каждое сообщение и каждый ответ
+нейросети: split_long_message, sanitize_for_telegram, split_markdown_safe,
+remove_markdown и contains_bad_words. Корпус — типичные ответы моделей
+из corpus/replies (длинные блоки кода, вложенная разметка, кириллица, эмодзи,
+битая разметка); каждый образец растягивается или обрезается до размеров
+short/medium/long/huge.
+
+Для каждой пары функция × размер записываются время вызова (минимум из
+нескольких повторов), пиковая память через tracemalloc и хэш результата.
+С сохранённым эталоном (--update-baseline) прогон завершается с кодом 1,
+если функция стала медленнее больше чем на --tolerance, съела больше памяти
+или вернула другой результат. Время эталона пересчитывается на скорость
+текущей машины по калибровочному циклу, поэтому эталон переносим между
+машинами, но не между версиями Python.
+
+Шум гасится минимумами: калибровка — лучшая из замеров перед каждым
+размером и в конце прогона, подозрительно медленные ячейки перемеряются
+несколькими кругами вразбивку, в счёт идёт лучший замер. Эталон снимается
+так же, только перемеряются все ячейки.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_text
+    python -m benchmarks.bench_text --update-baseline
+    python -m benchmarks.bench_text --only split_markdown_safe --sizes long huge --tolerance 0.1
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus" / "replies"
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines" / "bench_text.json"
+
+SIZES = {"short": 400, "medium": 3000, "long": 12000, "huge": 48000}
+CHAT_ID = -100  # Чат со своими правилами поверх общих, как в группе
+RULE_WORDS = 200
+RULE_PATTERNS = 10
+MEMORY_SLACK = 1024  # Байт пиковой памяти, которые не считаются регрессией
+TIME_SLACK = 1e-6  # Секунд на вызов, которые не считаются регрессией (шум таймера)
+CONFIRM_RUNS = 3  # Кругов перемера медленных ячеек (при записи эталона — всех)
+# Правила, которые срабатывают на корпусе: «ссылка» (broken_markup), «клиент» и шаблон
+# (code_python); и почти-совпадения внутри слов «парк», «хранения», «автоматически»,
+# которые срабатывать не должны — смена результата ловит поиск подстрок без границ слов
+CORPUS_GLOBAL_WORDS = ["ссылка", "пар", "хран"]
+CORPUS_CHAT_WORDS = ["клиент", "авто"]
+CORPUS_PATTERNS = [r"повтор\w*ами"]
+
+
+def load_corpus(corpus_dir: Path) -> Dict[str, str]:
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(corpus_dir.glob("*.md"))}
+
+
+def fit(sample: str, size: int) -> str:
+    """Образец, повторённый через пустую строку и обрезанный до size символов"""
+    text = sample
+    while len(text) < size:
+        text += "\n\n" + sample
+    return text[:size]
+
+
+def setup_moderation(seed: int):
+    """Правила модерации в памяти: общие и чатовые слова плюс regex-шаблоны.
+
+    К случайным словам добавлены CORPUS_GLOBAL_WORDS, CORPUS_CHAT_WORDS и CORPUS_PATTERNS,
+    чтобы на корпусе были и срабатывания, и почти-совпадения.
+    """
+    from benchmarks.bench_moderation import random_word
+    from services.moderation import GLOBAL_KEY, ChatRules, moderation_engine
+
+    rng = random.Random(seed)
+    words = sorted({random_word(rng) for _ in range(RULE_WORDS)})
+    patterns = [rf"{random_word(rng, 3, 5)}\d{{2,}}" for _ in range(RULE_PATTERNS)] + CORPUS_PATTERNS
+    half = len(words) // 2
+    # Несуществующий файл: движок не перечитает правила с диска посреди замера
+    moderation_engine.file_path = Path("moderation_rules.json")
+    moderation_engine.rules = {
+        GLOBAL_KEY: ChatRules(words=words[:half] + CORPUS_GLOBAL_WORDS, patterns=patterns),
+        str(CHAT_ID): ChatRules(words=words[half:] + CORPUS_CHAT_WORDS),
+    }
+    moderation_engine._compiled.clear()
+
+
+def load_functions(seed: int) -> Dict[str, Callable[[str], Any]]:
+    from handlers import common
+    from services import ai, moderation
+
+    setup_moderation(seed)
+    return {
+        "split_long_message": ai.split_long_message,
+        "sanitize_for_telegram": ai.sanitize_for_telegram,
+        "split_markdown_safe": lambda text: common.split_markdown_safe(text, max_length=2000),
+        "remove_markdown": common.remove_markdown,
+        "contains_bad_words": lambda text: moderation.contains_bad_words(text, CHAT_ID),
+    }
+
+
+def digest(results: List[Any]) -> str:
+    """Короткий хэш результатов: ускорение не должно менять вывод"""
+    payload = json.dumps(results, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def seconds_per_call(func: Callable[[], Any], repeat: int) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def calibrate(repeat: int) -> float:
+    """Эталонная нагрузка на строках и словарях: мера скорости интерпретатора"""
+    text = fit(" ".join(f"слово{i} word{i}" for i in range(200)), 4000)
+
+    def work():
+        counts: Dict[str, int] = {}
+        for char in text:
+            counts[char] = counts.get(char, 0) + 1
+        return "".join(sorted(counts)).upper().split("А")
+
+    return seconds_per_call(work, repeat)
+
+
+def peak_bytes(func: Callable[[str], Any], texts: List[str]) -> int:
+    """Наибольший прирост памяти за один вызов по всем текстам размера"""
+    peak = 0
+    tracemalloc.start()
+    try:
+        for text in texts:
+            func(text)  # Прогрев: кэши шаблонов и автоматов не в счёт
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(text)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(func: Callable[[str], Any], texts: List[str], repeat: int) -> Dict[str, Any]:
+    def batch():
+        return [func(text) for text in texts]
+
+    return {
+        "seconds": seconds_per_call(batch, repeat) / len(texts),
+        "peak_bytes": peak_bytes(func, texts),
+        "digest": digest(batch()),
+    }
+
+
+def run(functions: Dict[str, Callable[[str], Any]], corpus: Dict[str, str],
+        sizes: List[str], repeat: int) -> Tuple[Dict[str, Dict[str, Any]], float]:
+    """Замеры всех ячеек и калибровка: лучшая из замеров перед каждым размером и в конце.
+
+    Всплеск нагрузки на машине растягивает один замер калибровки на секунду
+    и больше; по одному замеру все ячейки казались бы медленнее эталона.
+    """
+    results = {}
+    calibrations = []
+    for size in sizes:
+        calibrations.append(calibrate(repeat))
+        texts = [fit(sample, SIZES[size]) for sample in corpus.values()]
+        for name, func in functions.items():
+            results[f"{name}/{size}"] = measure(func, texts, repeat)
+    calibrations.append(calibrate(repeat))
+    return results, min(calibrations)
+
+
+def too_slow(current: Dict[str, Any], baseline: Dict[str, Any], scale: float, tolerance: float) -> bool:
+    expected = baseline["seconds"] * scale
+    return current["seconds"] > max(expected * (1 + tolerance), expected + TIME_SLACK)
+
+
+def remeasure(functions: Dict[str, Callable[[str], Any]], corpus: Dict[str, str],
+              results: Dict[str, Dict[str, Any]], keys: List[str], repeat: int):
+    """Ещё один круг замеров ячеек keys; в результате остаётся лучшее время"""
+    for key in keys:
+        name, size = key.split("/")
+        func = functions[name]
+        texts = [fit(sample, SIZES[size]) for sample in corpus.values()]
+        seconds = seconds_per_call(lambda: [func(text) for text in texts], repeat) / len(texts)
+        results[key]["seconds"] = min(results[key]["seconds"], seconds)
+
+
+def confirm(functions: Dict[str, Callable[[str], Any]], corpus: Dict[str, str],
+            results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], scale: float,
+            tolerance: float, repeat: int):
+    """Перемеряет медленные ячейки кругами: выброс на шумной машине — не регрессия.
+
+    Круг проходит по всем подозрительным ячейкам, поэтому повторы одной
+    ячейки разнесены во времени и не попадают в один всплеск нагрузки.
+    """
+    for _ in range(CONFIRM_RUNS):
+        slow = [key for key, result in results.items()
+                if key in baseline["results"] and too_slow(result, baseline["results"][key], scale, tolerance)]
+        if not slow:
+            break
+        remeasure(functions, corpus, results, slow, repeat)
+
+
+def compare(key: str, current: Dict[str, Any], baseline: Dict[str, Any], scale: float,
+            tolerance: float) -> List[str]:
+    """Причины считать замер регрессией относительно эталона"""
+    problems = []
+    expected = baseline["seconds"] * scale
+    if too_slow(current, baseline, scale, tolerance):
+        problems.append(f"{key}: время {current['seconds'] / expected - 1:+.0%}")
+    limit = baseline["peak_bytes"] * (1 + tolerance) + MEMORY_SLACK
+    if current["peak_bytes"] > limit:
+        problems.append(f"{key}: память {current['peak_bytes'] / 1024:.1f} KB "
+                        f"(эталон {baseline['peak_bytes'] / 1024:.1f} KB)")
+    if current["digest"] != baseline["digest"]:
+        problems.append(f"{key}: изменился результат")
+    return problems
+
+
+def report(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], scale: float):
+    print(f"{'функция':24} {'размер':7} {'мкс/вызов':>11} {'пик KB':>9} {'к эталону':>10}")
+    for key, result in results.items():
+        name, size = key.split("/")
+        reference = baseline.get("results", {}).get(key) if baseline else None
+        delta = f"{result['seconds'] / (reference['seconds'] * scale) - 1:+.0%}" if reference else "—"
+        print(f"{name:24} {size:7} {result['seconds'] * 1e6:11.1f} "
+              f"{result['peak_bytes'] / 1024:9.1f} {delta:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", help="только эти функции")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5, help="повторов замера, берётся лучший")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="допустимое замедление и рост памяти относительно эталона")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="записать замеры как новый эталон (к уже сохранённым)")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    os.environ.setdefault("BOT_TOKEN", "42:bench")
+    sys.path.insert(0, str(ROOT))
+    logging.basicConfig(level=logging.CRITICAL)
+
+    # Пустой рабочий каталог: синглтоны сервисов не трогают data/ проекта
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            functions = load_functions(args.seed)
+            unknown = set(args.only or ()) - set(functions)
+            if unknown:
+                parser.error(f"неизвестные функции: {', '.join(sorted(unknown))}")
+            if args.only:
+                functions = {name: functions[name] for name in args.only}
+            results, calibration = run(functions, corpus, args.sizes, args.repeat)
+            scale = calibration / baseline["calibration"] if baseline else 1.0
+            if args.update_baseline:
+                # Эталон — лучший из нескольких кругов, как и замер при проверке
+                for _ in range(CONFIRM_RUNS):
+                    remeasure(functions, corpus, results, list(results), args.repeat)
+            elif baseline:
+                confirm(functions, corpus, results, baseline, scale, args.tolerance, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    report(results, baseline, scale)
+
+    if args.update_baseline:
+        # Незатронутые замеры старого эталона переводятся на новую калибровку
+        stored = {key: dict(value, seconds=value["seconds"] * scale)
+                  for key, value in (baseline["results"] if baseline else {}).items()}
+        stored.update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "python": platform.python_version(),
+            "calibration": calibration,
+            "results": dict(sorted(stored.items())),
+        }, indent=2) + "\n")
+        print(f"Эталон записан: {args.baseline}")
+        return
+
+    if baseline is None:
+        print("Эталона нет, сравнивать не с чем (--update-baseline создаст его)")
+        return
+    if baseline["python"].rsplit(".", 1)[0] != platform.python_version().rsplit(".", 1)[0]:
+        print(f"Внимание: эталон снят на Python {baseline['python']}, время может отличаться")
+    problems = []
+    for key, result in results.items():
+        if key in baseline["results"]:
+            problems += compare(key, result, baseline["results"][key], scale, args.tolerance)
+    if problems:
+        print("\nРегрессии:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nРегрессий нет")
+
+
+if __name__ == "__main__":
+    main()
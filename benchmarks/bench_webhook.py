@@ -0,0 +1,209 @@
+"""Нагрузочный тест приёма апдейтов: webhook (aiohttp) против long polling.
+
+Синтетические апдейты подаются с заданной скоростью; обработчик имитирует
+работу хендлера. Для polling используется фейковая сессия бота, отдающая
+накопившиеся апдейты пачками с задержкой сетевого round-trip, для webhook —
+настоящий aiohttp-сервер на localhost и POST-запросы с секретом.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_webhook
+    python -m benchmarks.bench_webhook --count 5000 --rate 2000 --rtt 0.05
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import DeleteWebhook, GetMe, GetUpdates
+from aiogram.types import Message, Update, User
+from aiohttp import web
+
+from services.webhook import BoundedRequestHandler
+
+TOKEN = "42:bench"
+SECRET = "bench-secret"
+
+
+def make_update(update_id: int) -> Dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": -1000 - update_id % 50, "type": "supergroup", "title": "bench"},
+            "from": {"id": update_id % 500 + 1, "is_bot": False, "first_name": "user"},
+            "text": f"сообщение номер {update_id}"
+        }
+    }
+
+
+class Recorder:
+    """Время подачи и завершения обработки каждого апдейта"""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.sent: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.done = asyncio.Event()
+        self.started = 0.0
+        self.finished = 0.0
+        self.rejected = 0  # Ответы 429 при переполненном backlog
+
+    def handled(self, update_id: int):
+        self.latencies.append(time.perf_counter() - self.sent[update_id])
+        if len(self.latencies) == self.count:
+            self.finished = time.perf_counter()
+            self.done.set()
+
+
+def build_dispatcher(recorder: Recorder, work: float) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handler(message: Message):
+        await asyncio.sleep(work)  # Имитация I/O хендлера
+        recorder.handled(message.message_id)
+
+    return dp
+
+
+async def produce(recorder: Recorder, rate: float, emit):
+    """Подаёт апдейты равномерно с заданной скоростью"""
+    start = time.perf_counter()
+    for update_id in range(1, recorder.count + 1):
+        delay = start + (update_id - 1) / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        recorder.sent[update_id] = time.perf_counter()
+        await emit(update_id)
+    return start
+
+
+class FakePollingSession(BaseSession):
+    """Сессия, отдающая накопленные апдейты на getUpdates после round-trip"""
+
+    def __init__(self, rtt: float):
+        super().__init__()
+        self.rtt = rtt
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, GetMe):
+            return User(id=42, is_bot=True, first_name="bench")
+        if isinstance(method, DeleteWebhook):
+            return True
+        if isinstance(method, GetUpdates):
+            await asyncio.sleep(self.rtt / 2)
+            batch = [await self.queue.get()]
+            while len(batch) < (method.limit or 100) and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await asyncio.sleep(self.rtt / 2)
+            return [Update.model_validate(make_update(update_id), context={"bot": bot}) for update_id in batch]
+        raise NotImplementedError(type(method).__name__)
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+        yield b""
+
+    async def close(self):
+        pass
+
+
+async def bench_polling(args) -> Recorder:
+    recorder = Recorder(args.count)
+    session = FakePollingSession(args.rtt)
+    bot = Bot(TOKEN, session=session)
+    dp = build_dispatcher(recorder, args.work)
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=0))
+
+    async def emit(update_id: int):
+        session.queue.put_nowait(update_id)
+
+    recorder.started = await produce(recorder, args.rate, emit)
+    await recorder.done.wait()
+    await dp.stop_polling()
+    await polling
+    return recorder
+
+
+async def bench_webhook(args) -> Recorder:
+    recorder = Recorder(args.count)
+    bot = Bot(TOKEN)
+    dp = build_dispatcher(recorder, args.work)
+
+    app = web.Application()
+    BoundedRequestHandler(
+        dp, bot, secret_token=SECRET,
+        max_concurrency=args.concurrency, backlog=args.backlog
+    ).register(app, path="/webhook")
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    url = f"http://127.0.0.1:{args.port}/webhook"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    rejected = 0
+
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as client:
+        posts = set()
+
+        async def post(update_id: int):
+            nonlocal rejected
+            # Как и Telegram, повторяем доставку, пока сервер не примет апдейт
+            while True:
+                async with client.post(url, json=make_update(update_id)) as response:
+                    if response.status == 200:
+                        return
+                    rejected += 1
+                await asyncio.sleep(0.05)
+
+        async def emit(update_id: int):
+            task = asyncio.create_task(post(update_id))
+            posts.add(task)
+            task.add_done_callback(posts.discard)
+
+        recorder.started = await produce(recorder, args.rate, emit)
+        await recorder.done.wait()
+
+    await runner.cleanup()
+    recorder.rejected = rejected
+    return recorder
+
+
+def report(name: str, recorder: Recorder):
+    latencies = sorted(recorder.latencies)
+    throughput = recorder.count / (recorder.finished - recorder.started)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    line = (f"{name:8}: {throughput:8.0f} updates/s   "
+            f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms")
+    if recorder.rejected:
+        line += f"   429: {recorder.rejected}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=3000, help="сколько апдейтов подать")
+    parser.add_argument("--rate", type=float, default=1000, help="апдейтов в секунду на входе")
+    parser.add_argument("--work", type=float, default=0.005, help="время работы хендлера, сек")
+    parser.add_argument("--rtt", type=float, default=0.05, help="round-trip getUpdates, сек")
+    parser.add_argument("--concurrency", type=int, default=100, help="WEBHOOK_MAX_CONCURRENCY")
+    parser.add_argument("--backlog", type=int, default=1000, help="WEBHOOK_BACKLOG")
+    parser.add_argument("--connections", type=int, default=40, help="параллельных соединений, как max_connections у Telegram")
+    parser.add_argument("--port", type=int, default=18080)
+    args = parser.parse_args()
+
+    print(f"{args.count} updates at {args.rate:.0f}/s, handler {args.work * 1000:.1f} ms, rtt {args.rtt * 1000:.0f} ms")
+    report("polling", asyncio.run(bench_polling(args)))
+    report("webhook", asyncio.run(bench_webhook(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""Локальные заглушки Bot API, Gemini и OpenAI-совместимого API для нагрузочных тестов.
+
+Bot API отдаёт синтетический поток апдейтов через getUpdates с заданной
+скоростью и отвечает на методы отправки; Gemini (generateContent и
+streamGenerateContent?alt=sse) и OpenAI (/v1/chat/completions, в том числе
+stream) генерируют ответы. У каждого сервера настраиваются распределение
+задержки (логнормальное: медиана и sigma), доля ошибок 5xx и доля ответов
+429 с retry_after. Раз в --report секунд и при остановке печатается сводка:
+вызовы по методам, внесённые сбои и время от доставки обращения к боту до
+его ответа (p50/p99).
+
+Запуск из корня проекта (бот — во втором терминале):
+    python -m benchmarks.stub_servers --rate 50 --retry-rate 0.02 --ai-error-rate 0.1
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 GEMINI_API_BASE=http://127.0.0.1:8082 \\
+        OPENAI_API_BASE=http://127.0.0.1:8083/v1 BOT_TOKEN=42:stub GEMINI_API_KEY=stub python main.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from benchmarks.bench_dispatcher import (
+    ADMIN_USERS, BOT_ID, BOT_USERNAME, parse_mix, percentile, synthetic_stream
+)
+
+LOREM = (
+    "Конечно! Вот подробный ответ на ваш вопрос. Во-первых, стоит учитывать контекст "
+    "обсуждения. Во-вторых, есть несколько подходов, и у каждого свои плюсы и минусы. "
+    "Пример кода:\n```python\nasync def main():\n    await asyncio.sleep(1)\n```\n"
+    "Надеюсь, это поможет 🙂"
+)
+# Методы, на которых сбои не имитируются: иначе бот просто не стартует
+NO_FAULTS = {"getMe", "getUpdates", "deleteWebhook", "setWebhook", "close", "logOut"}
+
+
+class Faults:
+    """Задержка и сбои одного сервера"""
+
+    def __init__(self, rng: random.Random, latency: float, sigma: float, error_rate: float,
+                 retry_rate: float, retry_after: int):
+        self.rng = rng
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.retry_rate = retry_rate
+        self.retry_after = retry_after
+        self.injected: Counter = Counter()
+
+    def delay(self) -> float:
+        if not self.latency:
+            return 0.0
+        return self.latency * self.rng.lognormvariate(0, self.sigma) if self.sigma else self.latency
+
+    async def wait(self) -> Optional[str]:
+        """Выдерживает задержку; возвращает "retry", "error" или None"""
+        await asyncio.sleep(self.delay())
+        roll = self.rng.random()
+        if roll < self.retry_rate:
+            self.injected["429"] += 1
+            return "retry"
+        if roll < self.retry_rate + self.error_rate:
+            self.injected["5xx"] += 1
+            return "error"
+        return None
+
+
+class FakeBotAPI:
+    """Bot API: getUpdates из синтетического потока и ответы на методы отправки"""
+
+    def __init__(self, faults: Faults, args):
+        self.faults = faults
+        self.args = args
+        self.calls: Counter = Counter()
+        self.updates: Deque[Dict[str, Any]] = deque()
+        self.arrived = asyncio.Event()
+        self.delivered: Dict[Tuple[int, int], float] = {}  # (чат, сообщение) -> время доставки
+        self.reply_latencies: List[float] = []
+        self._message_ids = itertools.count(10 ** 6)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=50 * 1024 ** 2)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+    async def produce(self):
+        """Подаёт апдейты с заданной скоростью (тики новостей пропускаются)"""
+        stream = synthetic_stream(self.args.updates or 10 ** 9, self.args.chats, self.args.users,
+                                  self.args.mix, self.args.seed)
+        updates = (record for record in stream if "update_id" in record)
+        start = time.monotonic()
+        for index, update in enumerate(updates):
+            delay = start + index / self.args.rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            update["message"]["date"] = int(time.time())
+            self.updates.append(update)
+            self.arrived.set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = await self._params(request)
+
+        if method == "getUpdates":
+            return self._ok(await self._get_updates(params))
+        if method not in NO_FAULTS:
+            fault = await self.faults.wait()
+            if fault == "retry":
+                return web.json_response({
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.faults.retry_after}",
+                    "parameters": {"retry_after": self.faults.retry_after}
+                }, status=429)
+            if fault == "error":
+                return web.json_response(
+                    {"ok": False, "error_code": 500, "description": "Internal Server Error"}, status=500
+                )
+        return self._ok(self._result(method, params))
+
+    @staticmethod
+    async def _params(request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            params[key] = value
+        return params
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Апдейты до offset подтверждены клиентом и больше не нужны
+        offset = int(params.get("offset") or 0)
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        if not self.updates:
+            self.arrived.clear()
+            try:
+                await asyncio.wait_for(self.arrived.wait(), timeout=float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                return []
+
+        batch = list(itertools.islice(self.updates, int(params.get("limit") or 100)))
+        now = time.monotonic()
+        for update in batch:
+            message = update["message"]
+            self.delivered.setdefault((message["chat"]["id"], message["message_id"]), now)
+        return batch
+
+    def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        chat_id = params.get("chat_id")
+        if method == "getMe":
+            return {"id": BOT_ID, "is_bot": True, "first_name": "stub", "username": BOT_USERNAME}
+        if method == "getChatMember":
+            user = {"id": int(params["user_id"]), "is_bot": False, "first_name": "user"}
+            if int(params["user_id"]) in ADMIN_USERS:
+                return {"status": "creator", "user": user, "is_anonymous": False}
+            return {"status": "member", "user": user}
+        if method == "getChat":
+            return {"id": int(chat_id), "type": "private", "first_name": f"user{chat_id}"}
+        if method in ("sendMessage", "sendPhoto", "sendDocument", "editMessageText"):
+            self._record_reply(chat_id, params)
+            return self._message(chat_id, params.get("text") or params.get("caption") or "")
+        if method == "sendMediaGroup":
+            return [self._message(chat_id, "") for _ in params.get("media") or [None]]
+        return True
+
+    def _record_reply(self, chat_id: Any, params: Dict[str, Any]):
+        reply_to = params.get("reply_to_message_id") or (params.get("reply_parameters") or {}).get("message_id")
+        if chat_id is None or reply_to is None:
+            return
+        delivered = self.delivered.pop((int(chat_id), int(reply_to)), None)
+        if delivered is not None:
+            self.reply_latencies.append(time.monotonic() - delivered)
+
+    def _message(self, chat_id: Any, text: str) -> Dict[str, Any]:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id or 0), "type": "supergroup", "title": "stub"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "stub", "username": BOT_USERNAME},
+            "text": text or "ok",
+        }
+
+
+def _chunks(text: str, count: int) -> List[str]:
+    size = max(1, -(-len(text) // max(1, count)))
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+class FakeAI:
+    """Gemini generateContent и OpenAI chat/completions с потоковой выдачей"""
+
+    def __init__(self, faults: Faults, stream_chunks: int, chunk_delay: float):
+        self.faults = faults
+        self.stream_chunks = stream_chunks
+        self.chunk_delay = chunk_delay
+        self.calls: Counter = Counter()
+
+    def gemini_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/{version}/models/{target}", self.gemini)
+        return app
+
+    def openai_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.openai)
+        return app
+
+    @staticmethod
+    def _classifier_answer(prompt: str) -> str:
+        """Для запросов с JSON-ответом (классификатор) — массив меток нужной длины"""
+        match = re.search(r"\[.*\]", prompt, re.DOTALL)
+        try:
+            count = len(json.loads(match.group(0))) if match else 1
+        except ValueError:
+            count = 1
+        return json.dumps(["ok"] * count)
+
+    async def _sse(self, request: web.Request, events: List[Dict[str, Any]], done: bool) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for event in events:
+            await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await asyncio.sleep(self.chunk_delay)
+        if done:
+            await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def gemini(self, request: web.Request) -> web.StreamResponse:
+        model, _, action = request.match_info["target"].partition(":")
+        self.calls[f"gemini {action}"] += 1
+        body = await request.json()
+        fault = await self.faults.wait()
+        if fault:
+            code, status = (429, "RESOURCE_EXHAUSTED") if fault == "retry" else (500, "INTERNAL")
+            return web.json_response(
+                {"error": {"code": code, "message": f"stub {status.lower()}", "status": status}},
+                status=code, headers={"Retry-After": str(self.faults.retry_after)} if code == 429 else None
+            )
+
+        prompt = " ".join(
+            part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+        )
+        config = body.get("generationConfig") or body.get("generation_config") or {}
+        json_mode = "json" in str(config.get("responseMimeType") or config.get("response_mime_type") or "")
+        text = self._classifier_answer(prompt) if json_mode else LOREM
+
+        def candidate(chunk: str) -> Dict[str, Any]:
+            return {
+                "candidates": [{
+                    "content": {"parts": [{"text": chunk}], "role": "model"},
+                    "finishReason": "STOP", "index": 0
+                }],
+                "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(chunk) // 4},
+                "modelVersion": model
+            }
+
+        if action == "streamGenerateContent":
+            return await self._sse(request, [candidate(chunk) for chunk in _chunks(text, self.stream_chunks)],
+                                   done=False)
+        return web.json_response(candidate(text))
+
+    async def openai(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        stream = bool(body.get("stream"))
+        self.calls["openai stream" if stream else "openai"] += 1
+        fault = await self.faults.wait()
+        if fault:
+            code = 429 if fault == "retry" else 500
+            return web.json_response(
+                {"error": {"message": "stub error", "type": "rate_limit" if code == 429 else "server_error"}},
+                status=code, headers={"Retry-After": str(self.faults.retry_after)} if code == 429 else None
+            )
+
+        created = int(time.time())
+        model = body.get("model", "stub")
+        if stream:
+            events = [
+                {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                for chunk in _chunks(LOREM, self.stream_chunks)
+            ]
+            return await self._sse(request, events, done=True)
+        return web.json_response({
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": LOREM}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(LOREM) // 4, "total_tokens": len(LOREM) // 4}
+        })
+
+
+def summary(bot_api: FakeBotAPI, ai: FakeAI) -> str:
+    latencies = bot_api.reply_latencies
+    lines = [
+        "Bot API: " + ", ".join(f"{name} {count}" for name, count in bot_api.calls.most_common()),
+        f"  injected {dict(bot_api.faults.injected) or 'nothing'}, updates waiting {len(bot_api.updates)}",
+        "AI: " + (", ".join(f"{name} {count}" for name, count in ai.calls.most_common()) or "no calls"),
+        f"  injected {dict(ai.faults.injected) or 'nothing'}",
+    ]
+    if latencies:
+        lines.append(f"Replies: {len(latencies)}, delivery -> reply p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+                     f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    return "\n".join(lines)
+
+
+async def serve(args):
+    rng = random.Random(args.seed)
+    bot_api = FakeBotAPI(Faults(rng, args.latency, args.sigma, args.error_rate, args.retry_rate,
+                                args.retry_after), args)
+    ai = FakeAI(Faults(rng, args.ai_latency, args.sigma, args.ai_error_rate, args.ai_retry_rate,
+                       args.retry_after), args.stream_chunks, args.chunk_delay)
+
+    runners = []
+    for app, port in ((bot_api.app(), args.bot_port), (ai.gemini_app(), args.gemini_port),
+                      (ai.openai_app(), args.openai_port)):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, port).start()
+        runners.append(runner)
+    print(f"Bot API http://{args.host}:{args.bot_port}, Gemini http://{args.host}:{args.gemini_port}, "
+          f"OpenAI http://{args.host}:{args.openai_port}/v1")
+
+    producer = asyncio.create_task(bot_api.produce())
+    try:
+        while True:
+            await asyncio.sleep(args.report)
+            print(summary(bot_api, ai), flush=True)
+    finally:
+        producer.cancel()
+        print(summary(bot_api, ai))
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--bot-port", type=int, default=8081)
+    parser.add_argument("--gemini-port", type=int, default=8082)
+    parser.add_argument("--openai-port", type=int, default=8083)
+    parser.add_argument("--rate", type=float, default=20, help="апдейтов в секунду")
+    parser.add_argument("--updates", type=int, default=0, help="сколько апдейтов подать (0 — без конца)")
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--mix", type=parse_mix, default="chatter=85,mention=10,command=5")
+    parser.add_argument("--latency", type=float, default=0.03, help="медиана задержки Bot API, сек")
+    parser.add_argument("--ai-latency", type=float, default=0.8, help="медиана задержки AI, сек")
+    parser.add_argument("--sigma", type=float, default=0.5, help="разброс логнормальной задержки (0 — фиксированная)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 5xx Bot API")
+    parser.add_argument("--retry-rate", type=float, default=0.0, help="доля ответов 429 Bot API")
+    parser.add_argument("--ai-error-rate", type=float, default=0.0)
+    parser.add_argument("--ai-retry-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=2, help="retry_after в ответах 429, сек")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="частей в потоковом ответе AI")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="пауза между частями, сек")
+    parser.add_argument("--report", type=float, default=10, help="период сводки, сек")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,63 @@ class Config:
     MAX_HISTORY_LENGTH = int(os.getenv('MAX_HISTORY_LENGTH', 6))  # Добавить в .env
     AI_TIMEOUT = int(os.getenv('AI_TIMEOUT', 20))
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
+    SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', 30))  # Сообщений в секунду на весь бот
+    SEND_CHAT_RATE = float(os.getenv('SEND_CHAT_RATE', 1))  # Сообщений в секунду в личный чат
+    SEND_GROUP_RATE_PER_MIN = float(os.getenv('SEND_GROUP_RATE_PER_MIN', 20))  # Сообщений в минуту в группу/канал
+    SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', 5))  # Повторов после flood wait
+    GUID_RETENTION_DAYS = int(os.getenv('GUID_RETENTION_DAYS', 30))  # Сколько хранить GUID отправленных новостей
+    GUID_STORE_MAX = int(os.getenv('GUID_STORE_MAX', 100000))  # Верхняя граница числа GUID в памяти
+    NEWS_TIMEZONE = os.getenv('NEWS_TIMEZONE')  # Часовой пояс расписания по умолчанию (напр. Europe/Moscow), пусто — время сервера
+    NEWS_CATCHUP_WINDOW = int(os.getenv('NEWS_CATCHUP_WINDOW', 60))  # За сколько минут догонять пропущенные слоты после рестарта
+    NEWS_CATCHUP_LIMIT = int(os.getenv('NEWS_CATCHUP_LIMIT', 1))  # Максимум пропущенных слотов на канал
+    MEDIA_CACHE_SIZE = int(os.getenv('MEDIA_CACHE_SIZE', 2000))  # Сколько file_id картинок новостей помнить
+    MEDIA_FAILURE_TTL = int(os.getenv('MEDIA_FAILURE_TTL', 21600))  # Сколько секунд не пробовать битую картинку
+    STORY_DEDUP_DISTANCE = int(os.getenv('STORY_DEDUP_DISTANCE', 3))  # Порог расстояния Хэмминга для дублей сюжетов
+    STORY_DEDUP_WINDOW = int(os.getenv('STORY_DEDUP_WINDOW', 2000))  # Сколько последних сюжетов помнить
+    NEWS_DIGEST_ITEMS = int(os.getenv('NEWS_DIGEST_ITEMS', 5))  # Новостей на тему в AI-дайджесте
+    NEWS_DIGEST_MODEL = os.getenv('NEWS_DIGEST_MODEL', 'gemini-1.5-flash-8b')  # Модель Gemini для дайджестов
+    CHARTS_TTL = int(os.getenv('CHARTS_TTL', 600))  # Период обновления кэша чарта Яндекс.Музыки, сек
+    FEED_CACHE_TTL = int(os.getenv('FEED_CACHE_TTL', 300))  # Время жизни кэша RSS-лент, сек
+    FEED_POLL_ENABLED = os.getenv('FEED_POLL_ENABLED', '1') == '1'  # Фоновый опрос лент между слотами
+    FEED_POLL_MIN = int(os.getenv('FEED_POLL_MIN', 120))  # Минимальный интервал опроса ленты, сек
+    FEED_POLL_MAX = int(os.getenv('FEED_POLL_MAX', 3600))  # Максимальный интервал опроса ленты, сек
+    FEED_PREFETCH_LEAD = int(os.getenv('FEED_PREFETCH_LEAD', 60))  # За сколько секунд до слота обновлять ленты
+    BOT_MODE = os.getenv('BOT_MODE', 'polling')  # Получение апдейтов: polling или webhook
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # Публичный адрес бота, напр. https://bot.example.com
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')  # Путь, на который Telegram шлёт апдейты
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')  # Секрет заголовка X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')  # Адрес, который слушает aiohttp-сервер
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8080))  # Порт aiohttp-сервера
+    WEBHOOK_BACKLOG = int(os.getenv('WEBHOOK_BACKLOG', 1000))  # Максимум необработанных апдейтов, сверх — 429 и повтор от Telegram
+    WEBHOOK_MAX_CONCURRENCY = int(os.getenv('WEBHOOK_MAX_CONCURRENCY', 100))  # Апдейтов в обработке одновременно
+    BOT_WORKERS = int(os.getenv('BOT_WORKERS', 1))  # Процессов-воркеров; больше 1 — супервизор с шардированием по chat_id
+    SPAM_WAVE_ENABLED = os.getenv('SPAM_WAVE_ENABLED', '0') == '1'  # Фильтр волн спама выключен, пока его не включат явно
+    SPAM_WAVE_USERS = int(os.getenv('SPAM_WAVE_USERS', 3))  # Сколько разных авторов одного текста считать волной
+    SPAM_WAVE_WINDOW = int(os.getenv('SPAM_WAVE_WINDOW', 120))  # Окно отслеживания сообщений чата, сек
+    SPAM_WAVE_DISTANCE = int(os.getenv('SPAM_WAVE_DISTANCE', 3))  # Порог Хэмминга для изменённых копий
+    SPAM_WAVE_MIN_LENGTH = int(os.getenv('SPAM_WAVE_MIN_LENGTH', 15))  # Короткие сообщения («+», «привет») не отслеживаются
+    SPAM_WAVE_MUTE = int(os.getenv('SPAM_WAVE_MUTE', 0))  # Мут участников волны, сек (0 — не мутить)
+    AI_MODERATION_ENABLED = os.getenv('AI_MODERATION_ENABLED', '0') == '1'  # Проверка подозрительных сообщений через Gemini
+    AI_MODERATION_MODEL = os.getenv('AI_MODERATION_MODEL', 'gemini-1.5-flash-8b')  # Модель классификатора
+    AI_MODERATION_BATCH = int(os.getenv('AI_MODERATION_BATCH', 20))  # Сообщений в одном запросе
+    AI_MODERATION_DELAY = float(os.getenv('AI_MODERATION_DELAY', 0.5))  # Максимальное ожидание сбора пачки, сек
+    AI_MODERATION_CACHE = int(os.getenv('AI_MODERATION_CACHE', 10000))  # Сколько вердиктов помнить по хэшу текста
+    MESSAGE_LOG_SIZE = int(os.getenv('MESSAGE_LOG_SIZE', 1000))  # Сколько последних сообщений чата помнить для /purge
+    PURGE_MAX = int(os.getenv('PURGE_MAX', 1000))  # Максимум сообщений за один /purge
+    GBAN_CONCURRENCY = int(os.getenv('GBAN_CONCURRENCY', 10))  # Сколько чатов банить одновременно при /gban
+    GBAN_MODERATORS = {int(user_id) for user_id in os.getenv('GBAN_MODERATORS', '').split(',') if user_id.strip()}  # Кроме ADMIN_ID, кому доступны /gban и /ungban
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # Порт /metrics, 0 — выключено; воркеры занимают порт + номер
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', '0') == '1'  # Трейсинг апдейтов с запуска (иначе /traces on)
+    TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 1000))  # Сколько последних трейсов хранить
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # json — одна JSON-строка на запись, text — как раньше
+    LOG_RATE_LIMIT = float(os.getenv('LOG_RATE_LIMIT', 10))  # Записей DEBUG/INFO в секунду с одной строки кода, 0 — без ограничения
+    TELEGRAM_API_BASE = os.getenv('TELEGRAM_API_BASE')  # Свой Bot API сервер или заглушка, например http://127.0.0.1:8081
+    GEMINI_API_BASE = os.getenv('GEMINI_API_BASE')  # Адрес Gemini API вместо generativelanguage.googleapis.com
+    OPENAI_API_BASE = os.getenv('OPENAI_API_BASE')  # OpenAI-совместимый API вместо g4f, например http://127.0.0.1:8083/v1
+    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4')
     RSS_MAPPING = {
         # ===== Технологии =====
         "технологии": [
@@ -1,19 +1,46 @@
+import logging
+
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
+from config import config
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
 
 class IsAdminFilter(BaseFilter):
     async def __call__(self, message: Message) -> bool:
         if message.chat.type not in ["group", "supergroup"]:
-            print("❌ Команда вызвана не в группе")
+            logger.debug("Admin command outside a group in chat %s", message.chat.id)
             return False
 
         try:
-            member = await message.bot.get_chat_member(
-                chat_id=message.chat.id,
-                user_id=message.from_user.id
-            )
-            print(f"Статус пользователя {message.from_user.id}: {member.status}")
+            with span("filter IsAdminFilter"):
+                member = await message.bot.get_chat_member(
+                    chat_id=message.chat.id,
+                    user_id=message.from_user.id
+                )
+            logger.debug("User %s status in chat %s: %s", message.from_user.id, message.chat.id, member.status)
             return member.status in ["administrator", "creator"]
         except Exception as e:
-            print(f"Ошибка проверки прав: {e}")
-            return False
\ No newline at end of file
+            logger.error("Admin check failed for %s in chat %s: %s", message.from_user.id, message.chat.id, e)
+            return False
+
+
+class IsBotOwnerFilter(BaseFilter):
+    """Команды владельца бота (ADMIN_ID) — работают в любом чате"""
+
+    async def __call__(self, message: Message) -> bool:
+        return bool(config.ADMIN_ID) and message.from_user is not None \
+            and str(message.from_user.id) == config.ADMIN_ID.strip()
+
+
+class IsGlobalModeratorFilter(IsBotOwnerFilter):
+    """Команды для всех чатов бота (/gban): владелец или id из GBAN_MODERATORS.
+
+    Админ группы сюда не подходит: группу с ботом может создать кто угодно.
+    """
+
+    async def __call__(self, message: Message) -> bool:
+        if await super().__call__(message):
+            return True
+        return message.from_user is not None and message.from_user.id in config.GBAN_MODERATORS
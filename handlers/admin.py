@@ -3,7 +3,7 @@ from services.ai import reset_chat_context
 from services.prompt_manager import prompt_manager, AIMode, GeminiModel
 from services.warn_manager import warn_manager
 from aiogram.filters import Command
-from aiogram.types import User
+from aiogram.types import User, BufferedInputFile
 from aiogram import Router
 from services.stats_manager import stats_manager
 import logging
@@ -11,6 +11,18 @@ from filters.admin import IsAdminFilter
 from services.context_manager import reset_chat_context
 from services.news_service import news_service
 from services.get_charts import show_charts_handler
+from services.feed_poller import feed_poller
+from services.moderation import moderation_engine
+from services.ai_moderation import ai_moderator
+from services.message_log import message_log
+from services.global_bans import global_bans
+from services.tracing import tracer
+from services.profiler import profiler
+import time
+from services.send_queue import outbound
+from utils.helpers import delete_messages_batched
+from config import config
+import re
 
 logger = logging.getLogger(__name__) 
 
@@ -21,7 +33,7 @@ async def check_target_is_admin(chat_id: int, user_id: int, bot: Bot) -> bool:
         member = await bot.get_chat_member(chat_id, user_id)
         return member.status in ["administrator", "creator"]
     except Exception as e:
-        logging.error(f"Ошибка проверки прав цели: {str(e)}")
+        logging.error("Ошибка проверки прав цели: %s", e)
         return False
 
 async def show_warns(message: types.Message):
@@ -104,6 +116,87 @@ async def ban_user(message: types.Message):
     except Exception as e:
         await message.answer(f"❌ Ошибка бана: {str(e)}")
 
+def _global_ban_target(message: types.Message):
+    """(user_id, имя, остаток аргумента) из реплая или из "/gban user_id ..." """
+    argument = _command_argument(message)
+    if message.reply_to_message and message.reply_to_message.from_user:
+        user = message.reply_to_message.from_user
+        return user.id, user.full_name, argument
+    user_id, _, rest = argument.partition(" ")
+    if user_id.isdigit():
+        return int(user_id), user_id, rest.strip()
+    return None, None, argument
+
+async def global_ban(message: types.Message):
+    """
+    Обработчик команды /gban
+    Использование: реплай + /gban [причина] или /gban user_id [причина]
+    Банит пользователя во всех чатах, которые модерирует бот
+    """
+    user_id, name, reason = _global_ban_target(message)
+    if user_id is None:
+        await message.answer("❌ Ответьте на сообщение пользователя или укажите его id: /gban 123456 спам")
+        return
+
+    reply_user = message.reply_to_message.from_user if message.reply_to_message else None
+    if reply_user and reply_user.is_bot:
+        await message.answer("🚫 Нельзя забанить бота!")
+        return
+
+    if message.chat.type in {"group", "supergroup"} \
+            and await check_target_is_admin(message.chat.id, user_id, message.bot):
+        await message.answer("🚫 Нельзя забанить администратора!")
+        return
+
+    status = await message.answer(f"⏳ Глобальный бан {name}: рассылаю по {len(global_bans.chats)} чатам...")
+    done, failed = await global_bans.ban(message.bot, user_id, reason, by=message.from_user.id)
+    text = f"🚨 {name} забанен глобально: {done} чатов"
+    if failed:
+        text += f", ошибок {failed} (нет прав или бот удалён из чата)"
+    await status.edit_text(text)
+
+async def global_unban(message: types.Message):
+    """
+    Обработчик команды /ungban
+    Использование: реплай + /ungban или /ungban user_id
+    """
+    user_id, name, _ = _global_ban_target(message)
+    if user_id is None:
+        await message.answer("❌ Ответьте на сообщение пользователя или укажите его id: /ungban 123456")
+        return
+
+    result = await global_bans.unban(message.bot, user_id)
+    if result is None:
+        await message.answer(f"ℹ️ {name} нет в глобальном бан-листе")
+        return
+    done, failed = result
+    await message.answer(f"✅ {name} разбанен глобально: {done} чатов" + (f", ошибок {failed}" if failed else ""))
+
+async def check_member_join(event: types.ChatMemberUpdated, bot: Bot):
+    """Банит вошедшего в чат пользователя из глобального бан-листа"""
+    joined = (
+        event.new_chat_member.status in {"member", "restricted"}
+        and event.old_chat_member.status in {"left", "kicked"}
+    )
+    user = event.new_chat_member.user
+    if not joined or not global_bans.is_banned(user.id):
+        return
+
+    try:
+        await outbound.send(event.chat.id, lambda: bot.ban_chat_member(event.chat.id, user.id))
+        logging.info("Глобально забаненный %s не пущен в чат %s", user.id, event.chat.id)
+    except Exception as e:
+        logging.error("Не удалось забанить %s при входе в %s: %s", user.id, event.chat.id, e)
+
+async def track_bot_membership(event: types.ChatMemberUpdated):
+    """Ведёт реестр чатов для /gban: в нём только группы, где бот администратор"""
+    if event.chat.type not in {"group", "supergroup"}:
+        return
+    if event.new_chat_member.status == "administrator":
+        global_bans.register_chat(event.chat.id, event.chat.title)
+    else:
+        global_bans.unregister_chat(event.chat.id)
+
 async def unban_user(message: types.Message):
     if not message.reply_to_message:
         await message.answer("❌ Ответьте на сообщение пользователя!")
@@ -190,6 +283,65 @@ async def delete_message(message: types.Message):
     except Exception as e:
         await message.answer(f"❌ Не удалось удалить сообщение: {str(e)}")
 
+async def purge_messages(message: types.Message):
+    """
+    Обработчик команды /purge
+    Использование:
+    /purge N — последние N сообщений чата
+    Реплай + /purge — всё от отмеченного сообщения до команды
+    Реплай + /purge user [N] — последние N сообщений автора (по умолчанию все известные)
+    """
+    args = _command_argument(message).split()
+    reply = message.reply_to_message
+    chat_id = message.chat.id
+    count = int(args.pop()) if args and args[-1].isdigit() else None
+    if count == 0:
+        await message.reply("❌ Число сообщений должно быть больше нуля")
+        return
+    limit = min(count or config.PURGE_MAX, config.PURGE_MAX)
+
+    if reply and args == ["user"]:
+        if not reply.from_user:
+            await message.reply("❌ Не удалось определить автора сообщения")
+            return
+        ids = message_log.recent(chat_id, limit, user_id=reply.from_user.id, before=message.message_id)
+        ids.append(reply.message_id)
+    elif reply and not args:
+        # deleteMessages пропускает несуществующие id, поэтому диапазон можно удалять целиком
+        first = max(reply.message_id, message.message_id - limit)
+        ids = list(range(first, message.message_id))
+    elif not reply and not args and count:
+        # Команда уже записана MessageLogMiddleware и в N не входит
+        ids = message_log.recent(chat_id, limit, before=message.message_id)
+    else:
+        await message.reply(
+            "❌ Использование:\n"
+            "/purge N — последние N сообщений\n"
+            "Реплай + /purge — от сообщения до команды\n"
+            "Реплай + /purge user [N] — сообщения автора"
+        )
+        return
+
+    ids = set(ids)
+    ids.add(message.message_id)
+    total = len(ids)
+    status = await message.answer(f"🧹 Удаляю {total} сообщений...")
+
+    async def report(done: int, total: int):
+        if done < total:
+            await outbound.send(chat_id, lambda: status.edit_text(f"🧹 Удалено {done} из {total}..."))
+
+    try:
+        deleted = await delete_messages_batched(message.bot, chat_id, ids, on_progress=report)
+        message_log.forget(chat_id, deleted)
+        text = f"✅ Удалено сообщений: {len(deleted)}"
+        if len(deleted) < total:
+            text += f" из {total}, остальные удалить не удалось"
+        await outbound.send(chat_id, lambda: status.edit_text(text))
+    except Exception as e:
+        logging.error("Ошибка очистки чата %s: %s", chat_id, e)
+        await message.answer(f"❌ Не удалось завершить очистку: {str(e)}")
+
 async def set_prompt(message: types.Message):
     if not message.reply_to_message:
         await message.answer("❌ Ответьте на сообщение с новым промптом!")
@@ -245,7 +397,7 @@ async def set_ai_command(message: types.Message):
         )
 
     except Exception as e:
-        logger.error(f"Ошибка при установке режима AI: {str(e)}")
+        logger.error("Ошибка при установке режима AI: %s", e)
         await message.reply("❌ Произошла ошибка при установке режима AI")
 
 async def set_gemini_model_command(message: types.Message):
@@ -274,5 +426,157 @@ async def set_gemini_model_command(message: types.Message):
             await message.reply("❌ Указанная модель не найдена!")
 
     except Exception as e:
-        logger.error(f"Ошибка при установке модели Gemini: {str(e)}")
+        logger.error("Ошибка при установке модели Gemini: %s", e)
         await message.reply("❌ Произошла ошибка при установке модели")
+
+async def show_feeds(message: types.Message):
+    """
+    Обработчик команды /feeds
+    Показывает интервал опроса и давность данных по каждой RSS-ленте
+    """
+    report = feed_poller.report()
+    if not report:
+        await message.answer("📡 Фоновый опрос лент не запущен или нет подписок")
+        return
+
+    lines = ["📡 Опрос RSS-лент (интервал / давность / новых в час):"]
+    for url, interval, age, per_hour in report:
+        age_text = f"{age / 60:.0f} мин" if age != float("inf") else "—"
+        lines.append(f"• {url}\n  {interval / 60:.0f} мин / {age_text} / {per_hour:.1f}")
+
+    stats = news_service.last_cycle_stats
+    if stats:
+        lines.append(
+            f"\nПоследний цикл: запросов {stats['requests']}, загрузок {stats['fetches']}, "
+            f"из кэша {stats['hits']}, объединено {stats['coalesced']}"
+        )
+
+    await message.answer("\n".join(lines), disable_web_page_preview=True)
+
+def _command_argument(message: types.Message) -> str:
+    parts = message.text.split(maxsplit=1)
+    return parts[1].strip() if len(parts) > 1 else ""
+
+async def add_mod_word(message: types.Message):
+    """
+    Обработчик команды /mod_add
+    Использование: /mod_add слово или фраза
+    """
+    word = _command_argument(message)
+    if not word:
+        await message.reply("❌ Использование: /mod_add слово или фраза")
+        return
+
+    if moderation_engine.add_word(message.chat.id, word):
+        await message.reply(f"✅ Правило добавлено: {word}")
+    else:
+        await message.reply("ℹ️ Такое правило уже есть")
+
+async def add_mod_pattern(message: types.Message):
+    """
+    Обработчик команды /mod_add_re
+    Использование: /mod_add_re регулярное выражение (текст сравнивается в нижнем регистре)
+    """
+    pattern = _command_argument(message)
+    if not pattern:
+        await message.reply("❌ Использование: /mod_add_re регулярное выражение")
+        return
+
+    try:
+        moderation_engine.add_pattern(message.chat.id, pattern)
+    except re.error as e:
+        await message.reply(f"❌ Некорректное выражение: {e}")
+        return
+    await message.reply(f"✅ Шаблон добавлен: {pattern}")
+
+async def remove_mod_rule(message: types.Message):
+    """
+    Обработчик команды /mod_del
+    Использование: /mod_del правило (слово или шаблон в том виде, как добавлялся)
+    """
+    rule = _command_argument(message)
+    if moderation_engine.remove(message.chat.id, rule):
+        await message.reply(f"✅ Правило удалено: {rule}")
+    else:
+        await message.reply("❌ Правило не найдено. Список: /mod_list")
+
+async def show_mod_rules(message: types.Message):
+    """
+    Обработчик команды /mod_list
+    Показывает правила модерации этого чата
+    """
+    rules = moderation_engine.get_rules(message.chat.id)
+    if not rules.words and not rules.patterns:
+        await message.answer("🛡 В этом чате нет своих правил модерации")
+        return
+
+    lines = ["🛡 Правила модерации чата:"]
+    lines.extend(f"• {word}" for word in rules.words)
+    lines.extend(f"• /{pattern}/" for pattern in rules.patterns)
+    await message.answer("\n".join(lines))
+
+async def show_mod_stats(message: types.Message):
+    """
+    Обработчик команды /mod_stats
+    Показывает работу AI-классификатора модерации
+    """
+    report = ai_moderator.report()
+    await message.answer(
+        "🤖 AI-модерация:\n"
+        f"• Проверено сообщений: {report['messages']:.0f}\n"
+        f"• Из кэша: {report['cache_hit_rate']:.0%}\n"
+        f"• Запросов к модели: {report['batches']:.0f}, в среднем {report['avg_batch']:.1f} сообщ.\n"
+        f"• Добавленная задержка: средняя {report['avg_latency'] * 1000:.0f} мс, "
+        f"максимальная {report['max_latency'] * 1000:.0f} мс\n"
+        f"• Ошибок: {report['errors']:.0f}"
+    )
+
+async def show_traces(message: types.Message):
+    """
+    Обработчик команды /traces (только владелец бота)
+    Использование: /traces on | /traces off | /traces [N] — N самых медленных апдейтов
+    """
+    argument = _command_argument(message).lower()
+    if argument in ("on", "off"):
+        tracer.enabled = argument == "on"
+        await message.answer(f"🔍 Трейсинг {'включён' if tracer.enabled else 'выключен'}")
+        return
+
+    count = int(argument) if argument.isdigit() else 5
+    traces = tracer.slowest(count)
+    if not traces:
+        hint = "" if tracer.enabled else " Включите: /traces on"
+        await message.answer(f"ℹ️ Трейсов пока нет.{hint}")
+        return
+
+    text = "\n\n".join(tracer.format(record) for record in traces)
+    if len(text) <= 4000:
+        await message.answer(f"🐢 Самые медленные апдейты:\n\n{text}")
+    else:
+        await message.answer_document(
+            BufferedInputFile(text.encode("utf-8"), filename=f"traces-{int(time.time())}.txt"),
+            caption=f"🐢 {len(traces)} самых медленных апдейтов"
+        )
+
+async def run_profile(message: types.Message):
+    """
+    Обработчик команды /profile (только владелец бота)
+    Использование: /profile [секунды] — сэмплирующий профайлер, результат в collapsed-формате
+    """
+    argument = _command_argument(message)
+    seconds = min(int(argument), 120) if argument.isdigit() and int(argument) > 0 else 10
+    if profiler.running:
+        await message.answer("⏳ Профайлер уже запущен")
+        return
+
+    await message.answer(f"🔥 Профилирую {seconds} сек...")
+    collapsed = await profiler.profile(seconds)
+    if not collapsed:
+        await message.answer("ℹ️ Не удалось снять ни одного сэмпла")
+        return
+
+    samples = sum(int(line.rsplit(" ", 1)[1]) for line in collapsed.splitlines())
+    await message.answer_document(
+        BufferedInputFile(collapsed.encode("utf-8"), filename=f"profile-{int(time.time())}.folded"),
+        caption=f"🔥 {samples} сэмплов за {seconds} сек. Открыть: speedscope.app или flamegraph.pl"
+    )
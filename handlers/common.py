@@ -3,6 +3,9 @@ from aiogram.enums import ContentType
 from config import config
 from services import ai, moderation
 from services.stats_manager import stats_manager
+from services.global_bans import global_bans
+from services.send_queue import outbound
+from services.ai_moderation import ai_moderator, is_suspicious, LABEL_OK
 import logging
 from aiogram.exceptions import TelegramNetworkError
 import asyncio
@@ -17,6 +20,18 @@ from aiogram import Bot, types
 from aiogram.types import ContentType
 from aiogram.exceptions import TelegramNetworkError
 
+async def needs_ai_check(message: types.Message, bot: Bot) -> bool:
+    """Подозрительное сообщение не от админа: обращение к боту само по себе не повод"""
+    try:
+        username = (await bot.me()).username
+    except TelegramNetworkError:
+        username = None
+    if not is_suspicious(message.text, username):
+        return False
+    if message.chat.type in {"group", "supergroup"} and message.from_user:
+        return not await ai_moderator.is_admin(bot, message.chat.id, message.from_user.id)
+    return True
+
 async def handle_message(message: types.Message, bot: Bot):
     # Проверка и сохранение в статистику
     if (
@@ -26,21 +41,30 @@ async def handle_message(message: types.Message, bot: Bot):
     ):
         try:
             stats_manager.update_user(message.chat.id, message.from_user.id)
-            logging.info(f"Статистика обновлена для {message.from_user.id}")
+            logger.debug("Статистика обновлена для %s", message.from_user.id)
         except Exception as e:
-            logging.error(f"Ошибка статистики: {e}")
+            logger.error("Ошибка статистики: %s", e)
+        try:
+            await global_bans.discover_chat(bot, message.chat.id, message.chat.title)
+        except Exception as e:
+            logger.error("Не удалось проверить права бота в чате %s: %s", message.chat.id, e)
     
     # Защита от отсутствия текста
     if not message.text:
         return
     
-    # Проверка на плохие слова
-    if moderation.contains_bad_words(message.text):
+    # Проверка на плохие слова, подозрительные сообщения дополнительно проверяет AI
+    violation = moderation.contains_bad_words(message.text, message.chat.id)
+    if not violation and config.AI_MODERATION_ENABLED and await needs_ai_check(message, bot):
+        verdict = await ai_moderator.classify(message.text)
+        violation = verdict is not None and verdict != LABEL_OK
+
+    if violation:
         try:
             await message.delete()
             await message.answer("🚫 Сообщение удалено за нарушение правил!")
         except Exception as e:
-            logging.error(f"Ошибка удаления: {e}")
+            logger.error("Ошибка удаления: %s", e)
         return
         
     # Добавляем ВСЕ сообщения в контекст чата
@@ -52,7 +76,7 @@ async def handle_message(message: types.Message, bot: Bot):
                 role="user"
             )
         except Exception as e:
-            logging.error(f"Ошибка сохранения контекста: {e}")
+            logger.error("Ошибка сохранения контекста: %s", e)
             
     # Получаем информацию о боте с обработкой таймаутов
     max_retries = 3
@@ -105,23 +129,32 @@ async def handle_message(message: types.Message, bot: Bot):
                 continue
                 
             try:
-                await message.reply(text=part, parse_mode="Markdown")
+                await outbound.send(
+                    message.chat.id,
+                    lambda: message.reply(text=part, parse_mode="Markdown")
+                )
             except Exception as part_error:
-                logging.error(f"Ошибка отправки части сообщения: {str(part_error)}")
+                logger.error("Ошибка отправки части сообщения: %s", part_error)
                 # Пробуем отправить без форматирования
                 try:
-                    await message.reply(text=part, parse_mode=None)
+                    await outbound.send(
+                        message.chat.id,
+                        lambda: message.reply(text=part, parse_mode=None)
+                    )
                 except Exception:
                     # Если и это не помогло, пробуем очистить разметку
                     clean_part = remove_markdown(part)
-                    await message.reply(text=clean_part[:2000])
+                    await outbound.send(
+                        message.chat.id,
+                        lambda: message.reply(text=clean_part[:2000])
+                    )
                     
     except Exception as e:
-        logging.error(f"Ошибка генерации: {str(e)}", exc_info=True)
+        logger.error("Ошибка генерации: %s", e, exc_info=True)
         try:
             await message.reply("⚠️ Произошла ошибка при обработке запроса")
         except Exception as reply_error:
-            logging.error(f"Не удалось отправить сообщение об ошибке: {str(reply_error)}")
+            logger.error("Не удалось отправить сообщение об ошибке: %s", reply_error)
 
 def remove_markdown(text: str) -> str:
     """Удаляет разметку Markdown из текста"""
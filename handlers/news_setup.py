@@ -1,11 +1,12 @@
 from aiogram import F, types, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from services.news_service import news_service
+from services.news_service import news_service, NEWS_MODES
 from states import NewsSetupStates
 from config import config
 import logging
 import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 router = Router()
@@ -24,10 +25,10 @@ async def start_setup(message: types.Message, state: FSMContext):
             ])
         )
         await state.set_state(NewsSetupStates.waiting_channel)
-        logger.info(f"Начата настройка для пользователя {message.from_user.id}")
+        logger.info("Начата настройка для пользователя %s", message.from_user.id)
         
     except Exception as e:
-        logger.error(f"Ошибка старта настройки: {str(e)}")
+        logger.error("Ошибка старта настройки: %s", e)
         await message.answer("❌ Произошла ошибка, попробуйте позже.")
 
 @router.callback_query(F.data == "cancel")
@@ -35,14 +36,14 @@ async def cancel_setup(callback: types.CallbackQuery, state: FSMContext):
     """Обработка отмены настройки"""
     await state.clear()
     await callback.message.answer("❌ Настройка отменена.")
-    logger.info(f"Пользователь {callback.from_user.id} отменил настройку")
+    logger.info("Пользователь %s отменил настройку", callback.from_user.id)
 
 @router.message(NewsSetupStates.waiting_channel)
 async def process_channel(message: types.Message, state: FSMContext):
     """Обработка username канала"""
     try:
         channel_username = message.text.strip().lstrip('@')
-        logger.debug(f"Получен канал: {channel_username}")
+        logger.debug("Получен канал: %s", channel_username)
         
         chat = await message.bot.get_chat(f"@{channel_username}")
         admins = await message.bot.get_chat_administrators(chat.id)
@@ -51,13 +52,13 @@ async def process_channel(message: types.Message, state: FSMContext):
         
         # Проверка является ли пользователь администратором канала
         if not any(admin.user.id == user_id for admin in admins):
-            logger.warning(f"Пользователь {user_id} не является администратором канала {channel_username}")
+            logger.warning("Пользователь %s не является администратором канала %s", user_id, channel_username)
             await message.answer("❌ Вы должны быть администратором канала для его настройки!")
             return
         
         # Проверка является ли бот администратором канала
         if not any(admin.user.id == bot_id for admin in admins):
-            logger.warning(f"Бот не админ в канале {channel_username}")
+            logger.warning("Бот не админ в канале %s", channel_username)
             await message.answer("❌ Бот не является администратором канала!")
             return
             
@@ -67,10 +68,10 @@ async def process_channel(message: types.Message, state: FSMContext):
             f"Доступные темы: {', '.join(config.RSS_MAPPING.keys())}"
         )
         await state.set_state(NewsSetupStates.waiting_topics)
-        logger.info(f"Канал {channel_username} подтвержден")
+        logger.info("Канал %s подтвержден", channel_username)
         
     except Exception as e:
-        logger.error(f"Ошибка проверки канала: {str(e)}")
+        logger.error("Ошибка проверки канала: %s", e)
         await message.answer("❌ Канал не найден или бот не имеет прав!")
 
 @router.message(NewsSetupStates.waiting_topics)
@@ -102,16 +103,17 @@ async def process_topics(message: types.Message, state: FSMContext):
         await state.update_data(tags=valid_tags)
         await message.answer(
             "⏰ Укажите время публикаций (например: 09:00, 18:00)\n"
-            "Формат: ЧЧ:MM",
+            "Формат: ЧЧ:MM\n"
+            "Можно добавить часовой пояс: 09:00, 18:00 Europe/Moscow",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="Каждый час", callback_data="default_schedule")]
             ])
         )
         await state.set_state(NewsSetupStates.waiting_schedule)
-        logger.info(f"Валидные теги: {valid_tags}")
+        logger.info("Валидные теги: %s", valid_tags)
         
     except Exception as e:
-        logger.error(f"Ошибка обработки тем: {str(e)}")
+        logger.error("Ошибка обработки тем: %s", e)
         await message.answer("❌ Ошибка обработки тем, попробуйте снова.")
 
 @router.message(NewsSetupStates.waiting_schedule)
@@ -119,7 +121,21 @@ async def process_schedule(message: types.Message, state: FSMContext):
     """Обработка пользовательского расписания"""
     try:
         time_pattern = re.compile(r'^([01]?[0-9]|2[0-3]):([0-5][0-9])$')
-        raw_times = message.text.split(",")
+        text = message.text.strip()
+
+        # Необязательный часовой пояс последним словом
+        timezone = None
+        parts = text.rsplit(maxsplit=1)
+        if len(parts) == 2 and ("/" in parts[1] or parts[1].upper() == "UTC"):
+            try:
+                ZoneInfo(parts[1])
+            except (ZoneInfoNotFoundError, ValueError):
+                await message.answer(f"❌ Неизвестный часовой пояс: {parts[1]}")
+                return
+            timezone = parts[1]
+            text = parts[0].rstrip(", ")
+
+        raw_times = text.split(",")
         normalized = []
         errors = []
 
@@ -149,13 +165,15 @@ async def process_schedule(message: types.Message, state: FSMContext):
         news_service.add_subscription(
             channel_id=data["channel"],
             topics=data["tags"],
-            schedule=normalized
+            schedule=normalized,
+            timezone=timezone
         )
         
         await message.answer(
             "✅ Настройки сохранены!\n"
             f"• Темы: {', '.join(data['tags'])}\n"
             f"• Время: {', '.join(normalized)}"
+            + (f" ({timezone})" if timezone else "")
         )
         await state.clear()
         
@@ -163,7 +181,7 @@ async def process_schedule(message: types.Message, state: FSMContext):
         await message.answer("❌ Ошибка: данные повреждены. Начните заново.")
         await state.clear()
     except Exception as e:
-        logger.error(f"Ошибка: {str(e)}", exc_info=True)
+        logger.error("Ошибка: %s", e, exc_info=True)
         await message.answer("❌ Внутренняя ошибка. Попробуйте позже.")
 
 @router.callback_query(F.data == "default_schedule")
@@ -179,13 +197,9 @@ async def set_default_schedule(callback: types.CallbackQuery, state: FSMContext)
             await callback.message.answer("❌ Ошибка: сессия повреждена.")
             return
             
-        rss_urls = []
-        for tag in data["tags"]:
-            rss_urls.extend(config.RSS_MAPPING.get(tag, []))
-            
         news_service.add_subscription(
             channel_id=data["channel"],
-            rss_urls=list(set(rss_urls)),
+            topics=data["tags"],
             schedule=hourly_schedule
         )
         
@@ -194,10 +208,42 @@ async def set_default_schedule(callback: types.CallbackQuery, state: FSMContext)
             f"• Темы: {', '.join(data['tags'])}\n"
             f"• Время: каждый час"
         )
-        logger.info(f"Сохранено расписание для канала {data['channel']}")
+        logger.info("Сохранено расписание для канала %s", data['channel'])
         
     except Exception as e:
-        logger.error(f"Ошибка: {str(e)}")
+        logger.error("Ошибка: %s", e)
         await callback.message.answer("❌ Ошибка при сохранении!")
     finally:
-        await state.clear()
\ No newline at end of file
+        await state.clear()
+
+
+@router.message(Command("news_mode"))
+async def set_news_mode(message: types.Message):
+    """Переключение режима публикации: /news_mode @channel single|batch|digest"""
+    args = message.text.split()
+    if len(args) != 3 or args[2].lower() not in NEWS_MODES:
+        await message.answer(
+            "❌ Использование: /news_mode @канал режим\n"
+            f"Режимы: {', '.join(NEWS_MODES)}\n"
+            "single — каждая новость отдельным постом\n"
+            "batch — фото альбомами до 10, текст одним сообщением\n"
+            "digest — AI-дайджест по каждой теме"
+        )
+        return
+
+    try:
+        chat = await message.bot.get_chat(f"@{args[1].lstrip('@')}")
+        admins = await message.bot.get_chat_administrators(chat.id)
+        if not any(admin.user.id == message.from_user.id for admin in admins):
+            await message.answer("❌ Вы должны быть администратором канала для его настройки!")
+            return
+
+        if not news_service.set_mode(chat.id, args[2].lower()):
+            await message.answer("❌ Для этого канала нет подписки. Начните с /news_setup")
+            return
+
+        await message.answer(f"✅ Режим публикации: {args[2].lower()}")
+
+    except Exception as e:
+        logger.error("Ошибка смены режима: %s", e)
+        await message.answer("❌ Канал не найден или бот не имеет прав!")
@@ -1,12 +1,27 @@
 import sys
 import os
 import asyncio
-import logging
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.enums import ContentType
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.client.session.aiohttp import AiohttpSession
+from services.news_scheduler import news_scheduler
+from services.feed_poller import feed_poller
+from services.get_charts import chart_cache
 from services.news_service import news_service
+from services.prompt_manager import prompt_manager
+from services.stats_manager import stats_manager
+from services.warn_manager import warn_manager
+from services.moderation import moderation_engine
+from services.global_bans import global_bans
+from services import ai
+from services.webhook import run_webhook
+from services.send_queue import outbound
+from services.sharding import worker
+from services.supervisor import Supervisor, consume_updates
+from services.metrics import run_metrics_server
+from services.logs import setup_logging
 from handlers.news_setup import router as news_router  
 from states import NewsSetupStates
 from handlers.admin import admin_router
@@ -15,16 +30,49 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import config
 from middlewares.antiflood import AntiFloodMiddleware
 from middlewares.stats import StatsMiddleware
+from middlewares.spam_wave import SpamWaveMiddleware
+from middlewares.message_log import MessageLogMiddleware
+from middlewares.metrics import HandlerMetricsMiddleware
+from middlewares.tracing import TracingMiddleware, HandlerSpanMiddleware, ApiSpanMiddleware
+from services.tracing import traced
 from handlers import admin, common
-from filters.admin import IsAdminFilter
+from filters.admin import IsAdminFilter, IsBotOwnerFilter, IsGlobalModeratorFilter
+from utils.helpers import telegram_api_server
 
-async def main():
-    bot = Bot(token=config.BOT_TOKEN)
+async def load_services(leader: bool = True):
+    """Параллельно загружает состояние сервисов с диска.
+
+    Новости (подписки, история GUID с компактированием и миграцией) грузит
+    только лидер: все команды и рассылка новостей работают в нём.
+    """
+    services = (prompt_manager, stats_manager, warn_manager, moderation_engine, global_bans)
+    if leader:
+        services = (news_service,) + services
+    await asyncio.gather(*(asyncio.to_thread(service.load) for service in services))
+
+
+def build_dispatcher() -> Dispatcher:
+    """Диспетчер со всеми middleware, роутерами и обработчиками"""
     dp = Dispatcher(storage=MemoryStorage())
     
-    # Middleware
-    dp.update.outer_middleware(StatsMiddleware())
-    dp.update.outer_middleware(AntiFloodMiddleware(limit=5))
+    # Middleware (трейсинг первым, чтобы корневой спан охватывал остальные)
+    dp.update.outer_middleware(TracingMiddleware())
+    dp.update.outer_middleware(traced(StatsMiddleware()))
+    dp.update.outer_middleware(traced(MessageLogMiddleware()))
+    if config.SPAM_WAVE_ENABLED:
+        dp.update.outer_middleware(traced(SpamWaveMiddleware(
+            users=config.SPAM_WAVE_USERS,
+            window=config.SPAM_WAVE_WINDOW,
+            max_distance=config.SPAM_WAVE_DISTANCE,
+            min_length=config.SPAM_WAVE_MIN_LENGTH,
+            mute_seconds=config.SPAM_WAVE_MUTE
+        )))
+    dp.update.outer_middleware(traced(AntiFloodMiddleware(limit=5)))
+    handler_metrics = HandlerMetricsMiddleware()
+    handler_spans = HandlerSpanMiddleware()
+    for observer in (dp.message, dp.callback_query, dp.chat_member, dp.my_chat_member):
+        observer.middleware(handler_metrics)
+        observer.middleware(handler_spans)
 
     # Route
     dp.include_router(news_router)
@@ -44,21 +92,107 @@ async def main():
     dp.message.register(admin.show_warns, Command('warns'), IsAdminFilter())
     dp.message.register(admin.set_ai_command, Command('set_ai'), IsAdminFilter())
     dp.message.register(admin.set_gemini_model_command, Command('set_model'), IsAdminFilter())
+    dp.message.register(admin.show_feeds, Command('feeds'), IsAdminFilter())
+    dp.message.register(admin.add_mod_word, Command('mod_add'), IsAdminFilter())
+    dp.message.register(admin.add_mod_pattern, Command('mod_add_re'), IsAdminFilter())
+    dp.message.register(admin.remove_mod_rule, Command('mod_del'), IsAdminFilter())
+    dp.message.register(admin.show_mod_rules, Command('mod_list'), IsAdminFilter())
+    dp.message.register(admin.show_mod_stats, Command('mod_stats'), IsAdminFilter())
+    dp.message.register(admin.purge_messages, Command('purge'), IsAdminFilter())
+    dp.message.register(admin.global_ban, Command('gban'), IsGlobalModeratorFilter())
+    dp.message.register(admin.global_unban, Command('ungban'), IsGlobalModeratorFilter())
+    dp.message.register(admin.show_traces, Command('traces'), IsBotOwnerFilter())
+    dp.message.register(admin.run_profile, Command('profile'), IsBotOwnerFilter())
+    dp.chat_member.register(admin.check_member_join)
+    dp.my_chat_member.register(admin.track_bot_membership)
     dp.message.register(
         common.handle_message,
         F.content_type == ContentType.TEXT,
         F.chat.type.in_({"group", "supergroup"})
     )
 
-    asyncio.create_task(news_scheduler(bot))
+    dp.shutdown.register(chart_cache.close)
+    return dp
+
+
+async def start_services(bot: Bot, leader: bool = True):
+    """Загружает сервисы и запускает фоновые задачи (планировщик — только у лидера)"""
+    await load_services(leader)
+    # Тяжёлые AI-библиотеки импортируем в фоне, не задерживая старт polling
+    asyncio.create_task(asyncio.to_thread(ai.warm_up))
+    if config.METRICS_PORT:
+        asyncio.create_task(run_metrics_server(config.METRICS_HOST, config.METRICS_PORT + worker.index))
+
+    if leader:
+        asyncio.create_task(news_scheduler.run(bot))
+        if config.FEED_POLL_ENABLED:
+            asyncio.create_task(feed_poller.run())
+        asyncio.create_task(chart_cache.run())
+
+
+def create_bot() -> Bot:
+    """Бот со спанами запросов к Bot API для /traces и адресом API из TELEGRAM_API_BASE"""
+    bot = Bot(token=config.BOT_TOKEN, session=AiohttpSession(api=telegram_api_server()))
+    bot.session.middleware(ApiSpanMiddleware())
+    return bot
+
+
+async def main():
+    bot = create_bot()
+    dp = build_dispatcher()
+    await start_services(bot)
+
+    if config.BOT_MODE == 'webhook':
+        await run_webhook(dp, bot)
+    else:
+        # Снимаем webhook, оставшийся от прошлого запуска, иначе getUpdates не работает
+        await bot.delete_webhook()
+        await dp.start_polling(bot)
+
+
+async def worker_main(index: int, count: int, updates, limiter_state):
+    """Процесс-воркер: обрабатывает апдейты своих чатов"""
+    worker.configure(index, count)
+    outbound.share_global(limiter_state)
+
+    bot = create_bot()
+    dp = build_dispatcher()
+    await start_services(bot, leader=worker.is_leader)
+    await dp.emit_startup(bot=bot)
+    try:
+        await consume_updates(dp, bot, updates)
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+
+def run_worker(index: int, count: int, updates, limiter_state):
+    setup_logging(worker=index)
+    try:
+        asyncio.run(worker_main(index, count, updates, limiter_state))
+    except KeyboardInterrupt:
+        pass
+
 
-    await dp.start_polling(bot)
+async def supervise(supervisor: Supervisor):
+    """Приём апдейтов в супервизоре; обработка — в воркерах"""
+    allowed_updates = build_dispatcher().resolve_used_update_types()
+    if config.BOT_MODE == 'webhook':
+        await supervisor.run_webhook(create_bot(), allowed_updates)
+    else:
+        await supervisor.run_polling(config.BOT_TOKEN, allowed_updates)
 
-async def news_scheduler(bot: Bot):
-    while True:
-        await asyncio.sleep(60)  # Проверка каждую минуту
-        await news_service.process_scheduled_posts(bot)
 
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.DEBUG)
-    asyncio.run(main())
+    setup_logging()
+    if config.BOT_WORKERS > 1:
+        supervisor = Supervisor(config.BOT_WORKERS, run_worker)
+        supervisor.start()
+        try:
+            asyncio.run(supervise(supervisor))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            supervisor.stop()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,21 @@
+from aiogram import BaseMiddleware
+from aiogram.types import Message, Update
+from typing import Callable, Dict, Any, Awaitable
+
+from services.message_log import message_log
+
+
+class MessageLogMiddleware(BaseMiddleware):
+    """Запоминает id сообщений групп в кольцевом буфере для /purge"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        message = event.event
+        if isinstance(message, Message) and message.chat.type in {"group", "supergroup"}:
+            user_id = message.from_user.id if message.from_user else 0
+            message_log.record(message.chat.id, message.message_id, user_id)
+        return await handler(event, data)
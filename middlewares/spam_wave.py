@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, Set, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import ChatPermissions, Message, Update
+
+from services.moderation import normalize
+from services.simhash import SimHashIndex, simhash
+from utils.helpers import delete_messages_batched
+
+logger = logging.getLogger(__name__)
+
+FLUSH_DELAY = 1.0  # Сколько копить удаления перед пачкой deleteMessages, сек
+WINDOW_MAX = 1000  # Верхняя граница окна сообщений одного чата
+ADMINS_TTL = 300  # Сколько кэшировать список админов чата, сек
+
+
+class ChatWindow:
+    """Скользящее окно отпечатков сообщений одного чата.
+
+    Точные копии находятся по хэшу нормализованного текста, изменённые — через
+    SimHashIndex; оба поиска не зависят от размера окна. Каждому сюжету
+    сопоставлен набор авторов и id сообщений для последующей зачистки.
+    """
+
+    def __init__(self, max_distance: int):
+        self.index = SimHashIndex(max_distance=max_distance, capacity=WINDOW_MAX + 1)
+        self._exact: Dict[int, int] = {}  # хэш текста -> отпечаток сюжета
+        self._exact_counts: Dict[int, int] = {}
+        self._entries: deque = deque()  # (время, хэш, отпечаток, автор, id сообщения)
+        self.authors: Dict[int, Dict[int, int]] = {}  # отпечаток -> {автор: сообщений}
+        self.messages: Dict[int, deque] = {}  # отпечаток -> (id сообщения, автор) по времени
+        self.waves: Set[int] = set()  # Отпечатки, признанные волной
+
+    def expire(self, now: float, window: float):
+        while self._entries and (now - self._entries[0][0] > window or len(self._entries) > WINDOW_MAX):
+            _, exact, fingerprint, user_id, message_id = self._entries.popleft()
+            self.index.evict_oldest()
+
+            count = self._exact_counts[exact] - 1
+            if count:
+                self._exact_counts[exact] = count
+            else:
+                del self._exact_counts[exact]
+                del self._exact[exact]
+
+            authors = self.authors[fingerprint]
+            authors[user_id] -= 1
+            if not authors[user_id]:
+                del authors[user_id]
+            self.messages[fingerprint].popleft()  # Уходящее сообщение — самое старое у сюжета
+            if not authors:
+                del self.authors[fingerprint]
+                del self.messages[fingerprint]
+                self.waves.discard(fingerprint)
+
+    def idle(self, now: float, window: float) -> bool:
+        """В окне не осталось сообщений моложе window"""
+        return not self._entries or now - self._entries[-1][0] > window
+
+    def add(self, now: float, text: str, user_id: int, message_id: int) -> int:
+        """Добавляет сообщение; возвращает отпечаток его сюжета"""
+        exact = hash(text)
+        fingerprint = self._exact.get(exact)
+        if fingerprint is None:
+            raw = simhash(text)
+            fingerprint = self.index.find(raw)
+            if fingerprint is None:
+                fingerprint = raw
+            self._exact[exact] = fingerprint
+        self._exact_counts[exact] = self._exact_counts.get(exact, 0) + 1
+        # Окно индекса хранит отпечаток сюжета, чтобы вытеснение шло в том же порядке
+        self.index.add(fingerprint)
+
+        authors = self.authors.setdefault(fingerprint, {})
+        authors[user_id] = authors.get(user_id, 0) + 1
+        self.messages.setdefault(fingerprint, deque()).append((message_id, user_id))
+        self._entries.append((now, exact, fingerprint, user_id, message_id))
+        return fingerprint
+
+
+class SpamWaveMiddleware(BaseMiddleware):
+    """Ловит рейды: один и тот же (или слегка изменённый) текст от многих авторов.
+
+    Когда сюжет набирает users разных авторов в окне, все его сообщения и
+    последующие копии удаляются пачками через deleteMessages, а авторы по
+    желанию получают мут. Админы чата не считаются авторами волны, их
+    сообщения не удаляются. Окна чатов без сообщений дольше window
+    выбрасываются.
+    """
+
+    def __init__(self, users: int = 3, window: int = 120, max_distance: int = 3,
+                 min_length: int = 15, mute_seconds: int = 0):
+        self.users = users
+        self.window = window
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.mute_seconds = mute_seconds
+        self.chats: Dict[int, ChatWindow] = {}
+        self._pending: Dict[int, Set[int]] = {}
+        self._flush_tasks: Dict[int, asyncio.Task] = {}
+        self._muted: Dict[Tuple[int, int], float] = {}
+        self._admins: Dict[int, Tuple[float, Set[int]]] = {}  # chat_id -> (до какого времени, id админов)
+        self._swept = 0.0
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        message = event.event
+        if (
+            not isinstance(message, Message)
+            or message.chat.type not in {"group", "supergroup"}
+            or not message.from_user
+            or message.from_user.is_bot
+        ):
+            return await handler(event, data)
+
+        text = normalize(message.text or message.caption or "")
+        if len(text) < self.min_length:
+            return await handler(event, data)
+
+        chat_id = message.chat.id
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatWindow(self.max_distance)
+
+        now = time.monotonic()
+        self._sweep(now)
+        chat.expire(now, self.window)
+        fingerprint = chat.add(now, text, message.from_user.id, message.message_id)
+        authors = chat.authors[fingerprint]
+
+        if fingerprint not in chat.waves and len(authors) < self.users:
+            return await handler(event, data)
+
+        bot: Bot = data["bot"]
+        admins = await self._chat_admins(bot, chat_id, now)
+        if message.from_user.id in admins:
+            return await handler(event, data)
+        if fingerprint not in chat.waves:
+            suspects = authors.keys() - admins
+            if len(suspects) < self.users:
+                return await handler(event, data)
+            chat.waves.add(fingerprint)
+            logger.warning("Spam wave in chat %s: %s authors, cleaning up", chat_id, len(suspects))
+            # Зачищаем всё, что успело прийти до срабатывания
+            self._schedule_delete(bot, chat_id, (
+                message_id for message_id, user_id in chat.messages[fingerprint] if user_id not in admins
+            ))
+            if self.mute_seconds:
+                await asyncio.gather(*(self._mute(bot, chat_id, user_id) for user_id in suspects))
+        else:
+            self._schedule_delete(bot, chat_id, [message.message_id])
+            if self.mute_seconds:
+                await self._mute(bot, chat_id, message.from_user.id)
+
+    def _sweep(self, now: float):
+        """Раз в окно выбрасывает окна и кэш админов замолчавших чатов"""
+        if now - self._swept < self.window:
+            return
+        self._swept = now
+        for chat_id in [chat_id for chat_id, chat in self.chats.items() if chat.idle(now, self.window)]:
+            del self.chats[chat_id]
+            self._admins.pop(chat_id, None)
+
+    async def _chat_admins(self, bot: Bot, chat_id: int, now: float) -> Set[int]:
+        cached = self._admins.get(chat_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        try:
+            admins = {member.user.id for member in await bot.get_chat_administrators(chat_id)}
+        except Exception as e:
+            logger.error("Failed to get admins of %s: %s", chat_id, e)
+            admins = set()
+        self._admins[chat_id] = (now + ADMINS_TTL, admins)
+        return admins
+
+    def _schedule_delete(self, bot: Bot, chat_id: int, message_ids: Iterable[int]):
+        self._pending.setdefault(chat_id, set()).update(message_ids)
+        task = self._flush_tasks.get(chat_id)
+        if task is None or task.done():
+            self._flush_tasks[chat_id] = asyncio.create_task(self._flush(bot, chat_id))
+
+    async def _flush(self, bot: Bot, chat_id: int):
+        """Копит удаления чата FLUSH_DELAY секунд и отправляет их пачками"""
+        await asyncio.sleep(FLUSH_DELAY)
+        while self._pending.get(chat_id):
+            ids = self._pending.pop(chat_id)
+            try:
+                deleted = await delete_messages_batched(bot, chat_id, ids)
+            except Exception as e:
+                logger.error("Spam wave cleanup in chat %s failed: %s", chat_id, e)
+                continue
+            logger.info("Spam wave cleanup in chat %s: %s of %s messages", chat_id, len(deleted), len(ids))
+
+    async def _mute(self, bot: Bot, chat_id: int, user_id: int):
+        now = time.time()
+        if self._muted.get((chat_id, user_id), 0) > now:
+            return
+        if len(self._muted) > WINDOW_MAX:
+            self._muted = {key: until for key, until in self._muted.items() if until > now}
+        self._muted[(chat_id, user_id)] = now + self.mute_seconds
+        try:
+            await bot.restrict_chat_member(
+                chat_id, user_id,
+                permissions=ChatPermissions(can_send_messages=False),
+                until_date=int(now + self.mute_seconds)
+            )
+        except Exception as e:
+            logger.error("Failed to mute %s in %s: %s", user_id, chat_id, e)
@@ -1,20 +1,14 @@
 from aiogram import BaseMiddleware
-from aiogram.types import Message, Update
-from typing import Callable, Dict, Any, Awaitable
+from aiogram.types import Update
 import logging
-from services.stats_manager import stats_manager
 
 logger = logging.getLogger(__name__)
 
 class StatsMiddleware(BaseMiddleware):
      async def __call__(self, handler, event, data):
-        try:
-            if isinstance(event, Message):
-                logging.debug(f"Сообщение от {event.from_user.id} → '{event.text}'")
+        # Счётчики сообщений обновляет handle_message; здесь только отладочный лог,
+        # частоту которого ограничивает RateLimitFilter из services.logs
+        if isinstance(event, Update) and event.message and event.message.from_user:
+            logger.debug("Сообщение от %s → %r", event.message.from_user.id, event.message.text)
 
-                stats_manager.update_user(event.from_user.id) 
-                
-        except Exception as e:
-            logging.error(f"Ошибка при обработке события: {e}", exc_info=True)
-        
         return await handler(event, data)
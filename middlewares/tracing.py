@@ -0,0 +1,54 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from services.tracing import span, tracer
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Корневой спан апдейта; регистрируется первым outer middleware"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not tracer.enabled:
+            return await handler(event, data)
+
+        chat = data.get("event_chat")
+        with tracer.trace(event.update_id, event.event_type, chat.id if chat else None):
+            return await handler(event, data)
+
+
+class HandlerSpanMiddleware(BaseMiddleware):
+    """Спан обработчика (внутренний middleware наблюдателя)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        with span(f"handler {name}"):
+            return await handler(event, data)
+
+
+class ApiSpanMiddleware(BaseRequestMiddleware):
+    """Спан каждого запроса к Bot API (middleware сессии бота)"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        with span(f"api {method.__api_method__}"):
+            return await make_request(bot, method)
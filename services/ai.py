@@ -1,15 +1,16 @@
 import logging
-import g4f
 import html
+import json
 from typing import Dict, List, Union
 from config import config
 import os
 import re
+import time
 from pathlib import Path
 from services.prompt_manager import prompt_manager, AIMode, GeminiModel
 from services.context_manager import chat_contexts, reset_chat_context
-import google.generativeai as genai
-import requests
+from services.metrics import AI_RESPONSE_ERRORS, AI_RESPONSE_LATENCY
+from services.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -19,21 +20,32 @@ MAX_HISTORY_LENGTH = config.MAX_HISTORY_LENGTH
 MAX_RESPONSE_LENGTH = config.MAX_MESSAGE_LENGTH
 MAX_TELEGRAM_MESSAGE_LENGTH = config.MAX_MESSAGE_LENGTH  # Максимальная длина сообщения в Telegram
 
-from g4f.Provider import (
-    Liaobots,
-    DDG,
-    You,
-    AIUncensored,
-    Blackbox,
-    Chatgpt4o,
-    GPTalk
-)
+_genai = None
 
-# Настройка Gemini
-genai.configure(api_key=config.GEMINI_API_KEY)
+def get_genai():
+    """
+    Ленивая инициализация Gemini SDK.
+    google.generativeai и g4f тянут десятки модулей, поэтому импортируются
+    только при первом обращении к соответствующему бэкенду.
+    """
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        options = {}
+        if config.GEMINI_API_BASE:
+            # REST-транспорт умеет ходить на произвольный http(s)-адрес, например в заглушку
+            options = {"transport": "rest", "client_options": {"api_endpoint": config.GEMINI_API_BASE}}
+        genai.configure(api_key=config.GEMINI_API_KEY, **options)
+        _genai = genai
+    return _genai
 
-# Инициализация базовой модели
-default_gemini_model = genai.GenerativeModel(GeminiModel.FLASH_8B.value)
+def warm_up():
+    """Прогревает тяжёлые AI-библиотеки (вызывается в фоновом потоке)"""
+    try:
+        import g4f  # noqa: F401
+        get_genai()
+    except Exception as e:
+        logger.error("AI warm-up failed: %s", e)
 
 async def add_to_chat_context(chat_id: int, text: str, role: str = "user"):
     try:
@@ -52,7 +64,7 @@ async def add_to_chat_context(chat_id: int, text: str, role: str = "user"):
         )[:MAX_HISTORY_LENGTH+1]
 
     except Exception as e:
-        logger.error(f"Context error: {str(e)}")
+        logger.error("Context error: %s", e)
         if chat_id in chat_contexts and len(chat_contexts[chat_id]) == 0:
             combined_prompt = prompt_manager.get_combined_prompt(chat_id)
             chat_contexts[chat_id] = [{"role": "system", "content": combined_prompt}]
@@ -132,38 +144,48 @@ async def get_ai_response(chat_id: int, text: str) -> Union[str, List[str]]:
             if settings.ai_mode == AIMode.PRO:
                 try:
                     model_type = settings.gemini_model or GeminiModel.FLASH_8B
-                    gemini_model = genai.GenerativeModel(model_type.value)
+                    gemini_model = get_genai().GenerativeModel(model_type.value)
                     
                     chat_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in context])
-                    response = await gemini_model.generate_content_async(
-                        chat_text,
-                        generation_config={
-                            'temperature': 0.9,
-                            'top_p': 0.8,
-                        }
-                    )
+                    labels = ("gemini", model_type.value)
+                    start = time.perf_counter()
+                    try:
+                        with span("ai gemini"):
+                            response = await gemini_model.generate_content_async(
+                                chat_text,
+                                generation_config={
+                                    'temperature': 0.9,
+                                    'top_p': 0.8,
+                                }
+                            )
+                    except Exception:
+                        AI_RESPONSE_ERRORS.labels(*labels).inc()
+                        raise
+                    finally:
+                        AI_RESPONSE_LATENCY.labels(*labels).observe(time.perf_counter() - start)
                     response_text = response.text.strip()
                     
                     # Sanitize the response for Telegram
                     response_text = sanitize_for_telegram(response_text)
                     
                 except Exception as gemini_error:
-                    logger.error(f"Ошибка Gemini API: {str(gemini_error)}")
+                    logger.error("Ошибка Gemini API: %s", gemini_error)
                     prompt_manager.set_ai_mode(chat_id, AIMode.DEFAULT)
                     return "⚠️ Произошла ошибка с Gemini API. Автоматически переключаюсь на стандартный режим."
             else:
-                response = await g4f.ChatCompletion.create_async(
-                    model=DEFAULT_MODEL,
-                    messages=context[-MAX_HISTORY_LENGTH:],
-                    safe_mode=False,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                                    "(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
-                    },
-                    timeout=config.AI_TIMEOUT,
-                    temperature=1.0,
-                    top_p=0.99,
-                )
+                if config.OPENAI_API_BASE:
+                    labels, chat = ("openai", config.OPENAI_MODEL), openai_chat
+                else:
+                    labels, chat = ("g4f", DEFAULT_MODEL), g4f_chat
+                start = time.perf_counter()
+                try:
+                    with span(f"ai {labels[0]}"):
+                        response = await chat(context[-MAX_HISTORY_LENGTH:])
+                except Exception:
+                    AI_RESPONSE_ERRORS.labels(*labels).inc()
+                    raise
+                finally:
+                    AI_RESPONSE_LATENCY.labels(*labels).observe(time.perf_counter() - start)
                 response_text = response if isinstance(response, str) else "Не удалось обработать ответ нейросети"
                 response_text = response_text.strip()
 
@@ -194,13 +216,66 @@ async def get_ai_response(chat_id: int, text: str) -> Union[str, List[str]]:
                 return message_parts
                 
         except Exception as inner_e:
-            logger.error(f"Внутренняя ошибка генерации: {str(inner_e)}", exc_info=True)
+            logger.error("Внутренняя ошибка генерации: %s", inner_e, exc_info=True)
             return "⚠️ Произошла ошибка при обработке ответа. Попробуйте еще раз."
 
     except Exception as e:
-        logger.error(f"Ошибка генерации: {str(e)}", exc_info=True)
+        logger.error("Ошибка генерации: %s", e, exc_info=True)
         return "⚠️ Произошла ошибка при генерации ответа. Попробуйте позже."
 
+async def g4f_chat(messages: List[dict]):
+    import g4f
+
+    return await g4f.ChatCompletion.create_async(
+        model=DEFAULT_MODEL,
+        messages=messages,
+        safe_mode=False,
+        headers={
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                        "(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+        },
+        timeout=config.AI_TIMEOUT,
+        temperature=1.0,
+        top_p=0.99,
+    )
+
+async def openai_chat(messages: List[dict]) -> str:
+    """Ответ OpenAI-совместимого API из OPENAI_API_BASE (свой шлюз или заглушка)"""
+    import aiohttp
+
+    headers = {"Authorization": f"Bearer {config.OPENAI_API_KEY}"} if config.OPENAI_API_KEY else {}
+    payload = {"model": config.OPENAI_MODEL, "messages": messages, "temperature": 1.0, "top_p": 0.99}
+    timeout = aiohttp.ClientTimeout(total=config.AI_TIMEOUT)
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+        async with session.post(f"{config.OPENAI_API_BASE.rstrip('/')}/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data["choices"][0]["message"]["content"]
+
+async def generate_text(prompt: str, model: GeminiModel = GeminiModel.FLASH_8B) -> str:
+    """Разовая генерация через Gemini без контекста чата (дайджесты и т.п.)"""
+    gemini_model = get_genai().GenerativeModel(model.value)
+    response = await gemini_model.generate_content_async(
+        prompt,
+        generation_config={
+            'temperature': 0.4,
+            'top_p': 0.8,
+        }
+    )
+    return sanitize_for_telegram(html.unescape(response.text.strip()))
+
+async def generate_json(prompt: str, model: GeminiModel = GeminiModel.FLASH_8B):
+    """Разовая генерация через Gemini со строгим JSON-ответом (классификаторы)"""
+    gemini_model = get_genai().GenerativeModel(model.value)
+    response = await gemini_model.generate_content_async(
+        prompt,
+        generation_config={
+            'temperature': 0,
+            'response_mime_type': 'application/json',
+        }
+    )
+    return json.loads(response.text)
+
 def sanitize_for_telegram(text: str) -> str:
     """
     Sanitize text to prevent Telegram entity parsing errors.
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from config import config
+from services.ai import generate_json
+from services.moderation import normalize
+from services.prompt_manager import GeminiModel, parse_gemini_model
+
+logger = logging.getLogger(__name__)
+
+LABEL_OK = "ok"
+LABELS = (LABEL_OK, "spam", "scam", "abuse")
+MAX_TEXT_LENGTH = 500  # Сколько символов сообщения отправлять классификатору
+MAX_CONCURRENT_BATCHES = 4
+ADMINS_TTL = 300  # Сколько кэшировать список админов чата, сек
+
+CLASSIFY_PROMPT = (
+    "Ты модератор русскоязычного Telegram-чата. Для каждого сообщения из JSON-массива "
+    "ниже выбери одну метку: ok — обычное сообщение, spam — реклама и флуд, scam — "
+    "мошенничество и фишинг, abuse — оскорбления и травля. Ответь JSON-массивом меток "
+    "той же длины и в том же порядке, без пояснений.\n\n{messages}"
+)
+
+# Ссылки, приглашения, упоминания и телефоны — повод спросить классификатор
+SUSPICIOUS_RE = re.compile(r"https?://|t\.me/|www\.|@\w{4,}|\+?\d[\d\s()\-]{9,}\d", re.IGNORECASE)
+
+
+def is_suspicious(text: str, bot_username: Optional[str] = None) -> bool:
+    """Есть ли в тексте ссылки, упоминания или телефоны; обращение к самому боту не в счёт"""
+    if bot_username:
+        text = re.sub(rf"@{re.escape(bot_username)}\b", "", text, flags=re.IGNORECASE)
+    return bool(SUSPICIOUS_RE.search(text))
+
+
+@dataclass
+class _Pending:
+    text: str
+    enqueued: float
+    future: asyncio.Future
+
+
+class AIModerator:
+    """Классификатор сообщений через Gemini с микробатчингом.
+
+    Сообщения копятся в очереди и уходят одним запросом, когда набралось
+    batch_size или самое старое ждёт max_delay. Вердикты кэшируются по хэшу
+    нормализованного текста, одинаковые сообщения в полёте объединяются.
+    При ошибке модели вердикт None — сообщение пропускается (fail-open).
+    """
+
+    def __init__(self, model: GeminiModel, batch_size: int = 20, max_delay: float = 0.5,
+                 cache_size: int = 10000):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._queue: "OrderedDict[str, _Pending]" = OrderedDict()
+        self._batcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+        self._inflight: Set[asyncio.Task] = set()
+        self._admins: Dict[int, Tuple[float, Set[int]]] = {}  # chat_id -> (до какого времени, id админов)
+        self.stats: Dict[str, float] = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, float]:
+        return {
+            "messages": 0, "cache_hits": 0, "coalesced": 0, "batches": 0,
+            "classified": 0, "errors": 0, "latency_sum": 0.0, "latency_max": 0.0,
+        }
+
+    def report(self) -> Dict[str, float]:
+        """Производные метрики: средний размер пачки и добавленная задержка"""
+        stats = self.stats
+        classified = stats["classified"] or 1
+        return {
+            "messages": stats["messages"],
+            "cache_hit_rate": stats["cache_hits"] / (stats["messages"] or 1),
+            "batches": stats["batches"],
+            "avg_batch": stats["classified"] / (stats["batches"] or 1),
+            "avg_latency": stats["latency_sum"] / classified,
+            "max_latency": stats["latency_max"],
+            "errors": stats["errors"],
+        }
+
+    async def is_admin(self, bot: Bot, chat_id: int, user_id: int) -> bool:
+        """Админов чата классификатор не проверяет; список кэшируется на ADMINS_TTL"""
+        now = time.monotonic()
+        cached = self._admins.get(chat_id)
+        if cached is None or cached[0] <= now:
+            try:
+                admins = {member.user.id for member in await bot.get_chat_administrators(chat_id)}
+            except Exception as e:
+                logger.error("Failed to get admins of %s: %s", chat_id, e)
+                admins = set()
+            if len(self._admins) >= self.cache_size:
+                self._admins = {key: value for key, value in self._admins.items() if value[0] > now}
+            cached = self._admins[chat_id] = (now + ADMINS_TTL, admins)
+        return user_id in cached[1]
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.blake2b(normalize(text).encode("utf-8"), digest_size=12).hexdigest()
+
+    async def classify(self, text: str) -> Optional[str]:
+        """Метка из LABELS или None, если классификатор недоступен"""
+        self.stats["messages"] += 1
+        key = self.content_hash(text)
+        verdict = self._cache.get(key)
+        if verdict is not None:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return verdict
+
+        pending = self._queue.get(key)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+            pending = self._queue[key] = _Pending(text[:MAX_TEXT_LENGTH], time.monotonic(), future)
+            self._ensure_batcher()
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.set()
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(pending.future)
+
+    def _ensure_batcher(self):
+        if self._batcher is None or self._batcher.done():
+            self._wakeup = asyncio.Event()
+            self._batcher = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """Собирает пачки по размеру или по дедлайну самого старого сообщения"""
+        while self._queue:
+            oldest = next(iter(self._queue.values()))
+            delay = oldest.enqueued + self.max_delay - time.monotonic()
+            if len(self._queue) < self.batch_size and delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch = {}
+            while self._queue and len(batch) < self.batch_size:
+                key, pending = self._queue.popitem(last=False)
+                batch[key] = pending
+            task = asyncio.create_task(self._classify_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _classify_batch(self, batch: Dict[str, _Pending]):
+        async with self._semaphore:
+            messages = json.dumps([pending.text for pending in batch.values()], ensure_ascii=False)
+            try:
+                self.stats["batches"] += 1
+                labels = await generate_json(CLASSIFY_PROMPT.format(messages=messages), self.model)
+                if not isinstance(labels, list) or len(labels) != len(batch):
+                    raise ValueError(f"expected {len(batch)} labels, got {labels!r:.200}")
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("AI moderation batch of %s failed: %s", len(batch), e)
+                labels = [None] * len(batch)
+
+        now = time.monotonic()
+        for (key, pending), label in zip(batch.items(), labels):
+            verdict = None
+            if label is not None:
+                label = str(label).strip().lower()
+                verdict = label if label in LABELS else LABEL_OK
+                self._remember(key, verdict)
+            latency = now - pending.enqueued
+            self.stats["classified"] += 1
+            self.stats["latency_sum"] += latency
+            self.stats["latency_max"] = max(self.stats["latency_max"], latency)
+            if not pending.future.done():
+                pending.future.set_result(verdict)
+
+    def _remember(self, key: str, verdict: str):
+        self._cache[key] = verdict
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+ai_moderator = AIModerator(
+    model=parse_gemini_model(config.AI_MODERATION_MODEL),
+    batch_size=config.AI_MODERATION_BATCH,
+    max_delay=config.AI_MODERATION_DELAY,
+    cache_size=config.AI_MODERATION_CACHE
+)
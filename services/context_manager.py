@@ -11,6 +11,6 @@ def reset_chat_context(chat_id: int):
     try:
         if chat_id in chat_contexts:
             del chat_contexts[chat_id]
-            logger.info(f"Context reset for chat {chat_id}")
+            logger.info("Context reset for chat %s", chat_id)
     except Exception as e:
-        logger.error(f"Context reset error: {str(e)}")
\ No newline at end of file
+        logger.error("Context reset error: %s", e)
\ No newline at end of file
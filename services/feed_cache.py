@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, Tuple
+
+from services.metrics import FEED_FETCH_LATENCY
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class FeedCache:
+    """TTL-кэш распарсенных RSS-лент с single-flight загрузкой по URL"""
+
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self.ttls: Dict[str, float] = {}  # TTL отдельных лент (их обновляет поллер)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, int] = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {"requests": 0, "hits": 0, "fetches": 0, "coalesced": 0, "errors": 0}
+
+    def reset_stats(self) -> Dict[str, int]:
+        """Возвращает счётчики с момента прошлого сброса и обнуляет их"""
+        stats, self.stats = self.stats, self._empty_stats()
+        return stats
+
+    async def get(self, url: str) -> Any:
+        """Возвращает ленту из кэша или загружает её (один запрос на URL).
+
+        Если ленту как раз перезагружают (опрос или прогрев перед слотом),
+        ждём свежую версию вместо кэша; при ошибке загрузки отдаём кэш.
+        """
+        self.stats["requests"] += 1
+
+        cached = self._entries.get(url)
+        if cached and url in self._inflight:
+            try:
+                return await self._load(url)
+            except Exception as e:
+                logger.warning("Refresh failed (%s), serving cached feed: %s", url, e)
+                return cached[1]
+        if cached and time.monotonic() - cached[0] < self.ttls.get(url, self.ttl):
+            self.stats["hits"] += 1
+            return cached[1]
+
+        return await self._load(url)
+
+    async def refresh(self, url: str) -> Any:
+        """Принудительно перезагружает ленту, не дублируя идущую загрузку"""
+        return await self._load(url)
+
+    def age(self, url: str) -> float:
+        """Сколько секунд назад лента была загружена (inf — ни разу)"""
+        cached = self._entries.get(url)
+        return time.monotonic() - cached[0] if cached else float("inf")
+
+    async def _load(self, url: str) -> Any:
+        task = self._inflight.get(url)
+        if task:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.create_task(self._fetch(url))
+            self._inflight[url] = task
+
+        # shield: отмена одного ожидающего не должна прерывать общую загрузку
+        return await asyncio.shield(task)
+
+    async def prefetch(self, urls: Iterable[str]):
+        """Параллельно прогревает кэш для набора лент"""
+        unique = {url for url in urls if url}
+        results = await asyncio.gather(
+            *(self.get(url) for url in unique),
+            return_exceptions=True
+        )
+        for url, result in zip(unique, results):
+            if isinstance(result, Exception):
+                logger.error("Prefetch failed (%s): %s", url, result)
+
+    async def _fetch(self, url: str) -> Any:
+        start = time.perf_counter()
+        try:
+            self.stats["fetches"] += 1
+            import feedparser
+
+            # feedparser блокирующий — выносим загрузку и парсинг из event loop
+            with span("feedparser"):
+                feed = await asyncio.to_thread(feedparser.parse, url)
+            FEED_FETCH_LATENCY.labels("ok").observe(time.perf_counter() - start)
+            self._entries[url] = (time.monotonic(), feed)
+            return feed
+        except Exception:
+            self.stats["errors"] += 1
+            FEED_FETCH_LATENCY.labels("error").observe(time.perf_counter() - start)
+            raise
+        finally:
+            self._inflight.pop(url, None)
+
+    def invalidate(self, url: str = None):
+        """Сбрасывает кэш для ленты или целиком"""
+        if url is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(url, None)
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import config
+from services.news_service import NewsService, news_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FeedState:
+    """Статистика обновлений одной ленты"""
+    interval: float
+    rate: float = 0.0  # EWMA новых записей в секунду
+    last_poll: float = 0.0
+    next_poll: float = 0.0
+    polls: int = 0
+    guids: Set[str] = field(default_factory=set)
+
+
+class FeedPoller:
+    """Фоновый опрос лент с адаптивным интервалом.
+
+    Интервал подстраивается под частоту появления новых записей: активные
+    ленты опрашиваются чаще, тихие — реже (в пределах min/max). Свежие
+    разобранные записи держатся в FeedCache/NewsService, поэтому в момент
+    слота остаётся только выбрать и отправить новости.
+    """
+
+    def __init__(self, service: NewsService):
+        self.service = service
+        self.min_interval = config.FEED_POLL_MIN
+        self.max_interval = config.FEED_POLL_MAX
+        self.target_new = 1.0  # Желаемое число новых записей на опрос
+        self.alpha = 0.3
+        self.states: Dict[str, FeedState] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _state(self, url: str) -> FeedState:
+        state = self.states.get(url)
+        if state is None:
+            state = self.states[url] = FeedState(interval=self.min_interval)
+        return state
+
+    async def poll(self, url: str):
+        """Загружает и разбирает ленту, обновляя её интервал"""
+        state = self._state(url)
+        now = time.time()
+        try:
+            feed = await self.service.feed_cache.refresh(url)
+        except Exception as e:
+            logger.error("Poll failed (%s): %s", url, e)
+            state.interval = min(self.max_interval, state.interval * 2)
+            return
+
+        guids = {entry.get("id", entry.get("link", "")) for entry in feed.entries}
+        new_count = len(guids - state.guids) if state.polls else 0
+        state.guids = guids
+
+        if state.polls:
+            elapsed = max(now - state.last_poll, 1.0)
+            state.rate = self.alpha * new_count / elapsed + (1 - self.alpha) * state.rate
+            if state.rate > 0:
+                interval = self.target_new / state.rate
+            else:
+                interval = state.interval * 1.5
+            state.interval = max(self.min_interval, min(self.max_interval, interval))
+
+        state.polls += 1
+        state.last_poll = now
+        # Лента считается свежей до следующего опроса
+        self.service.feed_cache.ttls[url] = state.interval + 60
+        if not feed.bozo:
+            self.service.warm_items(url, feed)
+
+    async def prefetch_channels(self, channel_ids: Iterable[int]):
+        """Обновляет ленты каналов перед ближайшим слотом"""
+        urls = self.service.subscribed_feeds(channel_ids)
+        await asyncio.gather(*(self.poll(url) for url in urls), return_exceptions=True)
+        logger.info("Prefetched %s feeds ahead of slot", len(urls))
+
+    def _sync_feeds(self, now: float):
+        """Добавляет в очередь новые ленты и забывает отписанные"""
+        wanted = self.service.subscribed_feeds()
+        for url in wanted - set(self.states):
+            self._state(url).next_poll = now
+            heapq.heappush(self._heap, (now, url))
+        for url in set(self.states) - wanted:
+            del self.states[url]
+            self.service.feed_cache.ttls.pop(url, None)
+
+    def notify(self, channel_id: int):
+        """Listener подписок: пересобрать набор лент"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def run(self):
+        """Основной цикл опроса"""
+        self._wakeup = asyncio.Event()
+        self.service.add_listener(self.notify)
+
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            self._sync_feeds(now)
+
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                poll_at, url = heapq.heappop(self._heap)
+                state = self.states.get(url)
+                if state is not None and state.next_poll == poll_at:
+                    due.append(url)
+            if due:
+                await asyncio.gather(*(self._poll_and_requeue(url) for url in due))
+                continue
+
+            delay = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll_and_requeue(self, url: str):
+        await self.poll(url)
+        state = self.states.get(url)
+        if state:
+            state.next_poll = time.time() + state.interval
+            heapq.heappush(self._heap, (state.next_poll, url))
+
+    def report(self) -> List[Tuple[str, float, float, float]]:
+        """(url, интервал, давность загрузки, новых записей в час) по каждой ленте"""
+        return [
+            (url, state.interval, self.service.feed_cache.age(url), state.rate * 3600)
+            for url, state in sorted(self.states.items())
+        ]
+
+
+feed_poller = FeedPoller(news_service)
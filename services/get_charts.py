@@ -1,77 +1,152 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
 from aiogram import types
 from aiogram.utils.markdown import hlink
+from config import config
 
-async def get_yandex_chart(limit=10):
+logger = logging.getLogger(__name__)
+
+CHART_URL = "https://music.yandex.ru/chart"
+CHART_SIZE = 50  # Кэшируем полный топ, любой limit отдаётся срезом
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7'
+}
+
+
+def parse_chart(page: str, limit: int = CHART_SIZE) -> List[Dict[str, str]]:
     """Актуальный парсинг чарта Яндекс.Музыки 2024"""
-    try:
-        url = "https://music.yandex.ru/chart"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'lxml')
-        tracks = []
-        
-        for track in soup.select('.d-track[data-item-id]'):  # Основной контейнер
-            try:
-                # Название трека
-                title = track.select_one('.d-track__name').text.strip()
-                
-                # Исполнители
-                artists = ', '.join(
-                    [a.text.strip() for a in track.select('.d-track__artists a')]
-                )
-                
-                # Ссылка на трек
-                track_id = track['data-item-id']
-                track_url = f"https://music.yandex.ru/track/{track_id}"
-                
-                tracks.append({
-                    'title': f"{title} - {artists}",
-                    'url': track_url
-                })
-                
-                if len(tracks) >= limit:
-                    break
-                    
-            except Exception as track_error:
-                print(f"Ошибка обработки трека: {track_error}")
-                continue
-                
-        return tracks[:limit]
-        
-    except Exception as e:
-        print(f"Yandex error: {str(e)}")
-        return []
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, 'lxml')
+    tracks = []
+
+    for track in soup.select('.d-track[data-item-id]'):  # Основной контейнер
+        try:
+            # Название трека
+            title = track.select_one('.d-track__name').text.strip()
+
+            # Исполнители
+            artists = ', '.join(
+                [a.text.strip() for a in track.select('.d-track__artists a')]
+            )
+
+            # Ссылка на трек
+            track_id = track['data-item-id']
+            track_url = f"https://music.yandex.ru/track/{track_id}"
+
+            tracks.append({
+                'title': f"{title} - {artists}",
+                'url': track_url
+            })
+
+            if len(tracks) >= limit:
+                break
+
+        except Exception as track_error:
+            logger.warning("Ошибка обработки трека: %s", track_error)
+            continue
+
+    return tracks
+
+
+class ChartCache:
+    """Кэш разобранного чарта с фоновым обновлением.
+
+    Пользователь получает срез из памяти; устаревший кэш отдаётся сразу, а
+    обновление идёт в фоне. Параллельные обновления объединяются в одно.
+    """
+
+    def __init__(self, ttl: int = 600):
+        self.ttl = ttl
+        self._tracks: List[Dict[str, str]] = []
+        self._updated = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=HEADERS,
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        return self._session
+
+    async def get(self, limit: int = 10) -> List[Dict[str, str]]:
+        """Первые limit треков чарта"""
+        if not self._tracks:
+            await self.refresh()
+        elif time.monotonic() - self._updated > self.ttl:
+            self.refresh()
+        return self._tracks[:limit]
+
+    def refresh(self) -> asyncio.Task:
+        """Запускает обновление, если оно ещё не идёт"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+        return self._refresh_task
+
+    async def _fetch(self):
+        try:
+            async with self._get_session().get(CHART_URL) as response:
+                response.raise_for_status()
+                page = await response.text()
+
+            # Разбор страницы тяжёлый — выносим из event loop
+            tracks = await asyncio.to_thread(parse_chart, page)
+            if tracks:
+                self._tracks = tracks
+                self._updated = time.monotonic()
+            else:
+                logger.warning("Yandex chart parsed empty, keeping previous data")
+
+        except Exception as e:
+            logger.error("Yandex error: %s", e)
+
+    async def run(self):
+        """Держит кэш тёплым, обновляя его раз в ttl"""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.ttl)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+chart_cache = ChartCache(ttl=config.CHARTS_TTL)
+
+
+async def get_yandex_chart(limit=10):
+    """Топ треков Яндекс.Музыки из кэша"""
+    return await chart_cache.get(limit)
 
 async def show_charts_handler(message: types.Message):
     """Обработчик команды /charts"""
     try:
         args = message.text.split()
-        limit = min(int(args[1]), 50) if len(args) > 1 and args[1].isdigit() else 10
-        
+        limit = min(int(args[1]), CHART_SIZE) if len(args) > 1 and args[1].isdigit() else 10
+
         tracks = await get_yandex_chart(limit)
-        
+
         if not tracks:
             return await message.answer("😔 Не удалось получить данные. Попробуйте позже.")
-            
+
         response = [f"🎶 Топ-{len(tracks)} из Яндекс.Музыки:\n"]
         response.extend(
-            f"{idx}. {hlink(track['title'], track['url'])}" 
+            f"{idx}. {hlink(track['title'], track['url'])}"
             for idx, track in enumerate(tracks, 1)
         )
-        
+
         await message.answer(
             "\n".join(response),
             parse_mode="HTML",
             disable_web_page_preview=True
         )
-        
+
     except Exception as e:
-        await message.answer(f"⚠️ Ошибка: {str(e)}")
\ No newline at end of file
+        await message.answer(f"⚠️ Ошибка: {str(e)}")
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from config import config
+from services.send_queue import outbound
+from services.sharding import key_chat_id, write_shared_json
+
+logger = logging.getLogger(__name__)
+
+CHATS_FILE = Path("data/managed_chats.json")
+BANS_FILE = Path("data/global_bans.json")
+GLOBAL_CHAT_ID = 0  # Список банов общий и принадлежит лидеру (см. LEADER_COMMANDS)
+RELOAD_INTERVAL = 5.0  # Как часто проверять изменения файлов, сек
+
+
+class GlobalBanList:
+    """Реестр чатов, которые модерирует бот, и глобальный бан-лист.
+
+    Баны хранятся словарём user_id -> запись, поэтому проверка при входе в
+    чат — один поиск по ключу. Бан и разбан расходятся по всем чатам реестра
+    параллельно через общую очередь отправки: она соблюдает лимиты Bot API
+    и повторяет запросы после flood wait, а семафор ограничивает число
+    одновременно стоящих в ней заданий.
+    """
+
+    def __init__(self, chats_file: Path = CHATS_FILE, bans_file: Path = BANS_FILE,
+                 concurrency: int = 10):
+        self.chats_file = chats_file
+        self.bans_file = bans_file
+        self.concurrency = concurrency
+        self.chats: Dict[int, str] = {}  # chat_id -> название
+        self.bans: Dict[int, Dict[str, Any]] = {}  # user_id -> {reason, by, at}
+        self._mtimes: Dict[Path, int] = {}
+        self._checked = 0.0
+        self._probed: Set[int] = set()  # Чаты, где права бота уже проверены этим процессом
+
+    def load(self):
+        self.chats = {int(chat_id): title for chat_id, title in self._read(self.chats_file).items()}
+        self.bans = {int(user_id): ban for user_id, ban in self._read(self.bans_file).items()}
+        logger.info("Loaded %s managed chats and %s global bans", len(self.chats), len(self.bans))
+
+    def _read(self, path: Path) -> Dict[str, Any]:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                return {}
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._mtimes[path] = path.stat().st_mtime_ns
+            return data
+        except Exception as e:
+            logger.error("Failed to load %s: %s", path, e)
+            return {}
+
+    def _write(self, path: Path, data: Dict[str, Any], chat_of: Callable[[str], int]):
+        try:
+            write_shared_json(path, data, chat_of, ensure_ascii=False, indent=2)
+            self._mtimes[path] = path.stat().st_mtime_ns
+        except Exception as e:
+            logger.error("Failed to save %s: %s", path, e)
+
+    def _save_chats(self):
+        self._write(self.chats_file, {str(chat_id): title for chat_id, title in self.chats.items()},
+                    key_chat_id)
+
+    def _save_bans(self):
+        self._write(self.bans_file, {str(user_id): ban for user_id, ban in self.bans.items()},
+                    lambda key: GLOBAL_CHAT_ID)
+
+    def _reload_if_changed(self, force: bool = False):
+        """Подхватывает изменения, сделанные другими воркерами"""
+        now = time.monotonic()
+        if not force and now - self._checked < RELOAD_INTERVAL:
+            return
+        self._checked = now
+        for path in (self.chats_file, self.bans_file):
+            try:
+                mtime = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime != self._mtimes.get(path):
+                self.load()
+                return
+
+    def register_chat(self, chat_id: int, title: Optional[str]):
+        if self.chats.get(chat_id) != (title or ""):
+            self.chats[chat_id] = title or ""
+            self._save_chats()
+
+    async def discover_chat(self, bot: Bot, chat_id: int, title: Optional[str]):
+        """Вносит в реестр чат, где бот уже админ, но my_chat_member не приходил.
+
+        Права проверяются один раз на чат за время работы процесса.
+        """
+        if chat_id in self.chats or chat_id in self._probed:
+            return
+        self._probed.add(chat_id)
+        member = await bot.get_chat_member(chat_id, bot.id)
+        if member.status == "administrator":
+            self.register_chat(chat_id, title)
+
+    def unregister_chat(self, chat_id: int):
+        if self.chats.pop(chat_id, None) is not None:
+            self._save_chats()
+
+    def is_banned(self, user_id: int) -> bool:
+        self._reload_if_changed()
+        return user_id in self.bans
+
+    async def ban(self, bot: Bot, user_id: int, reason: str = "", by: int = 0) -> Tuple[int, int]:
+        """Добавляет в бан-лист и банит во всех чатах; возвращает (успешно, ошибок)"""
+        self._reload_if_changed(force=True)
+        self.bans[user_id] = {"reason": reason, "by": by, "at": int(time.time())}
+        self._save_bans()
+        return await self._fan_out(lambda chat_id: bot.ban_chat_member(chat_id, user_id))
+
+    async def unban(self, bot: Bot, user_id: int) -> Optional[Tuple[int, int]]:
+        """Убирает из бан-листа и разбанивает везде; None, если бана не было"""
+        self._reload_if_changed(force=True)
+        if self.bans.pop(user_id, None) is None:
+            return None
+        self._save_bans()
+        return await self._fan_out(
+            lambda chat_id: bot.unban_chat_member(chat_id, user_id, only_if_banned=True)
+        )
+
+    async def _fan_out(self, action: Callable[[int], Awaitable[Any]]) -> Tuple[int, int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(chat_id: int) -> bool:
+            async with semaphore:
+                try:
+                    await outbound.send(chat_id, lambda: action(chat_id))
+                    return True
+                except Exception as e:
+                    logger.warning("Global ban action failed in chat %s: %s", chat_id, e)
+                    return False
+
+        results = await asyncio.gather(*(run(chat_id) for chat_id in list(self.chats)))
+        done = sum(results)
+        return done, len(results) - done
+
+
+global_bans = GlobalBanList(concurrency=config.GBAN_CONCURRENCY)
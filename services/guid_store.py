@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Запись журнала: 64-битный хеш GUID + unix-время добавления
+RECORD = struct.Struct("<QI")
+
+
+def guid_key(guid: str) -> int:
+    """Компактный 64-битный ключ GUID"""
+    return int.from_bytes(
+        hashlib.blake2b(guid.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class GuidStore:
+    """Хранилище отправленных GUID с истечением по времени и пакетной записью.
+
+    В памяти лежат только 64-битные хеши, упорядоченные по времени добавления,
+    поэтому очистка устаревших записей идёт с начала словаря. На диск пишется
+    append-only журнал фиксированных записей, который периодически сжимается.
+    """
+
+    def __init__(self, file_path: Path, retention_days: int = 30,
+                 max_entries: int = 100000, legacy_path: Optional[Path] = None):
+        self.file_path = Path(file_path)
+        self.retention = retention_days * 86400
+        self.max_entries = max_entries
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._entries: Dict[int, int] = {}
+        self._pending: List[Tuple[int, int]] = []
+        self._file_records = 0
+
+    def __contains__(self, guid: str) -> bool:
+        return guid_key(guid) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, guid: str):
+        """Отмечает GUID как отправленный (запись на диск — при flush)"""
+        key = guid_key(guid)
+        now = int(time.time())
+        # Переставляем в конец, чтобы сохранить порядок по времени
+        self._entries.pop(key, None)
+        self._entries[key] = now
+        self._pending.append((key, now))
+
+    def load(self):
+        """Загружает журнал, отбрасывая устаревшие записи"""
+        self._entries.clear()
+        self._pending.clear()
+        self._file_records = 0
+
+        if not self.file_path.exists():
+            self._migrate_legacy()
+            return
+
+        try:
+            data = self.file_path.read_bytes()
+            data = data[:len(data) - len(data) % RECORD.size]
+            cutoff = time.time() - self.retention
+            for key, ts in RECORD.iter_unpack(data):
+                self._file_records += 1
+                if ts < cutoff:
+                    continue
+                self._entries.pop(key, None)
+                self._entries[key] = ts
+            self._expire()
+            logger.info("Loaded %s GUIDs (%s records)", len(self._entries), self._file_records)
+        except Exception as e:
+            logger.error("Failed to load GUIDs: %s", e)
+
+        if self._file_records > 2 * len(self._entries) + 1000:
+            self._compact()
+
+    def flush(self):
+        """Дописывает накопленные GUID в журнал одной операцией"""
+        self._expire()
+        if not self._pending:
+            return
+
+        try:
+            if self._file_records + len(self._pending) > 2 * len(self._entries) + 1000:
+                self._compact()
+                return
+
+            with open(self.file_path, "ab") as f:
+                f.write(b"".join(RECORD.pack(key, ts) for key, ts in self._pending))
+            self._file_records += len(self._pending)
+            self._pending.clear()
+        except Exception as e:
+            logger.error("Failed to save GUIDs: %s", e)
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        entries = self._entries
+        while entries:
+            key = next(iter(entries))
+            if entries[key] >= cutoff and len(entries) <= self.max_entries:
+                break
+            del entries[key]
+
+    def _compact(self):
+        """Переписывает журнал только живыми записями"""
+        tmp_path = self.file_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(RECORD.pack(key, ts) for key, ts in self._entries.items()))
+        os.replace(tmp_path, self.file_path)
+        self._file_records = len(self._entries)
+        self._pending.clear()
+        logger.info("Compacted GUID journal to %s records", self._file_records)
+
+    def _migrate_legacy(self):
+        """Переносит GUID из старого JSON-списка, если он есть"""
+        if not self.legacy_path or not self.legacy_path.exists():
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                for guid in json.load(f):
+                    self.add(guid)
+            self._compact()
+            logger.info("Migrated %s GUIDs from %s", len(self._entries), self.legacy_path)
+        except Exception as e:
+            logger.error("Failed to migrate GUIDs: %s", e)
@@ -0,0 +1,140 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from config import config
+from services.send_queue import TokenBucket
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s:%(name)s:%(message)s"
+STREAM_BUFFER = 1 << 16  # Байт буфера вывода: сбрасывается, когда очередь логов опустела
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень, логгер, текст, воркер и трейсбек"""
+
+    def __init__(self, worker: Optional[int] = None):
+        super().__init__()
+        self.worker = worker
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if self.worker is not None:
+            entry["worker"] = self.worker
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Ограничивает частые записи до max_level: не больше rate в секунду с одной строки кода.
+
+    Отброшенные записи считаются, их число уходит в поле suppressed
+    следующей пропущенной записи с той же строки.
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+        self._buckets: Dict[Tuple[str, int], TokenBucket] = {}
+        self._suppressed: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, max(self.rate, 1))
+            if bucket.take():
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _LocalQueueHandler(QueueHandler):
+    """Кладёт запись в очередь как есть: сообщение форматируется в потоке записи, а не в вызывающем"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    """Пишет в буфер без сброса после каждой записи; сброс делает drain()"""
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        with self.lock:
+            self.stream.flush()
+
+
+class _BatchingListener(QueueListener):
+    """Сбрасывает буфер вывода, когда очередь пуста: пачка записей — один write"""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            self._drain()
+        return super().dequeue(block)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        self._drain()
+
+    def _drain(self):
+        for handler in self.handlers:
+            handler.drain()
+
+
+def setup_logging(worker: Optional[int] = None) -> QueueListener:
+    """Корневой логгер через очередь и фоновый поток записи (вызывается до старта сервисов).
+
+    Вызывающий код только кладёт запись в очередь: форматирование в JSON
+    или текст и запись в stderr — в потоке QueueListener, буфер сбрасывается
+    пачками. Частые записи до INFO ограничиваются LOG_RATE_LIMIT.
+    """
+    stream = open(sys.stderr.fileno(), "w", encoding="utf-8", buffering=STREAM_BUFFER, closefd=False)
+    output = _BufferedStreamHandler(stream)
+    if config.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter(worker))
+    else:
+        prefix = f"[worker {worker}] " if worker is not None else ""
+        output.setFormatter(logging.Formatter(prefix + TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    handler = _LocalQueueHandler(records)
+    handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT))
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+
+    listener = _BatchingListener(records, output)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
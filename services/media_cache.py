@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    """LRU-кэш «URL картинки → file_id Telegram».
+
+    После первой успешной отправки картинка переиспользуется по file_id, и
+    Telegram не скачивает её заново для каждого канала. Неудачные URL
+    запоминаются на failure_ttl секунд, чтобы сразу уходить в текст.
+    """
+
+    def __init__(self, file_path: Path, max_size: int = 2000, failure_ttl: int = 21600):
+        self.file_path = Path(file_path)
+        self.max_size = max_size
+        self.failure_ttl = failure_ttl
+        # url -> (file_id, время); пустой file_id означает неудачу
+        self._items: "OrderedDict[str, list]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._dirty = False
+
+    def get(self, url: str) -> Optional[str]:
+        """file_id для URL, если картинка уже отправлялась"""
+        item = self._items.get(url)
+        if not item or not item[0]:
+            return None
+        self._items.move_to_end(url)
+        return item[0]
+
+    def is_failed(self, url: str) -> bool:
+        item = self._items.get(url)
+        if not item or item[0]:
+            return False
+        if time.time() - item[1] > self.failure_ttl:
+            del self._items[url]
+            return False
+        return True
+
+    def put(self, url: str, file_id: str):
+        self._items[url] = [file_id, time.time()]
+        self._items.move_to_end(url)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        self._dirty = True
+
+    def mark_failed(self, url: str):
+        self.put(url, "")
+
+    def forget(self, url: str):
+        if self._items.pop(url, None):
+            self._dirty = True
+
+    def begin(self, url: str) -> Optional[asyncio.Future]:
+        """Single-flight первой загрузки URL.
+
+        Возвращает future, которого нужно дождаться, если URL уже загружает
+        другой канал, иначе регистрирует вызывающего ведущим и возвращает None.
+        """
+        pending = self._inflight.get(url)
+        if pending:
+            return pending
+        self._inflight[url] = asyncio.get_running_loop().create_future()
+        return None
+
+    def end(self, url: str):
+        pending = self._inflight.pop(url, None)
+        if pending and not pending.done():
+            pending.set_result(None)
+
+    def load(self):
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._items = OrderedDict((url, list(item)) for url, item in data.items())
+            logger.info("Loaded %s cached media ids", len(self._items))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Failed to load media cache: %s", e)
+
+    def flush(self):
+        """Сохраняет кэш, если он менялся"""
+        if not self._dirty:
+            return
+        try:
+            with open(self.file_path, "w", encoding="utf-8") as f:
+                json.dump(self._items, f, ensure_ascii=False)
+            self._dirty = False
+        except Exception as e:
+            logger.error("Failed to save media cache: %s", e)
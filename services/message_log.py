@@ -0,0 +1,48 @@
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+
+
+class MessageLog:
+    """Кольцевой буфер последних сообщений каждого чата: (id сообщения, автор).
+
+    Нужен для массовой чистки: Bot API не умеет искать сообщения чата,
+    поэтому бот сам помнит последние size id в каждом чате.
+    """
+
+    def __init__(self, size: int = 1000):
+        self.size = size
+        self._chats: Dict[int, Deque[Tuple[int, int]]] = {}
+
+    def record(self, chat_id: int, message_id: int, user_id: int):
+        buffer = self._chats.get(chat_id)
+        if buffer is None:
+            buffer = self._chats[chat_id] = deque(maxlen=self.size)
+        buffer.append((message_id, user_id))
+
+    def recent(self, chat_id: int, limit: int, user_id: Optional[int] = None,
+               before: Optional[int] = None) -> List[int]:
+        """id последних limit сообщений чата (или одного автора) старше before, от новых к старым"""
+        result = []
+        for message_id, author in reversed(self._chats.get(chat_id, ())):
+            if before is not None and message_id >= before:
+                continue
+            if user_id is None or author == user_id:
+                result.append(message_id)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def forget(self, chat_id: int, message_ids: Iterable[int]):
+        """Убирает удалённые сообщения из буфера"""
+        buffer = self._chats.get(chat_id)
+        if not buffer:
+            return
+        removed = set(message_ids)
+        kept = [entry for entry in buffer if entry[0] not in removed]
+        buffer.clear()
+        buffer.extend(kept)
+
+
+message_log = MessageLog(size=config.MESSAGE_LOG_SIZE)
@@ -0,0 +1,231 @@
+import asyncio
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последний — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Metric:
+    """Метрика с необязательными метками.
+
+    Значения для каждого набора меток создаются один раз и кэшируются, так что
+    на горячем пути остаются поиск в словаре и сложение. У метрики без меток
+    методы значения (inc, set, observe, time) вызываются напрямую.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        value = self._values.get(values)
+        if value is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            value = self._values[values] = self._new_value()
+        return value
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("_") or self.labelnames:
+            raise AttributeError(attr)
+        return getattr(self._default, attr)
+
+    def _label_pairs(self, values: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, values))
+
+    def samples(self) -> List[Sample]:
+        return [(self.name, self._label_pairs(values), value.value)
+                for values, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_value(self):
+        return _CounterValue()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_value(self):
+        return _GaugeValue()
+
+    def set_function(self, function: Callable[[], float]):
+        """Значение вычисляется при чтении /metrics, а не на горячем пути"""
+        self._function = function
+
+    def samples(self) -> List[Sample]:
+        if self._function is not None:
+            return [(self.name, (), float(self._function()))]
+        return super().samples()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    def samples(self) -> List[Sample]:
+        result = []
+        for values, value in self._values.items():
+            labels = self._label_pairs(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), value.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                result.append((f"{self.name}_bucket", labels + (("le", le),), cumulative))
+            result.append((f"{self.name}_sum", labels, value.sum))
+            result.append((f"{self.name}_count", labels, value.count))
+        return result
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """Набор метрик процесса и их вывод в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                    name = f"{name}{{{rendered}}}"
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+HANDLER_LATENCY = histogram("bot_handler_seconds", "Handler latency", ["handler"])
+HANDLER_ERRORS = counter("bot_handler_errors_total", "Handler exceptions", ["handler"])
+AI_RESPONSE_LATENCY = histogram(
+    "bot_ai_response_seconds", "get_ai_response latency", ["backend", "model"],
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+AI_RESPONSE_ERRORS = counter("bot_ai_response_errors_total", "AI backend errors", ["backend", "model"])
+SEND_QUEUE_DEPTH = gauge("bot_send_queue_depth", "Outbound jobs waiting to be sent")
+FEED_FETCH_LATENCY = histogram("bot_feed_fetch_seconds", "RSS fetch and parse time", ["result"])
+STORAGE_FLUSH_LATENCY = histogram(
+    "bot_storage_flush_seconds", "JSON persistence flush time", ["store"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def run_metrics_server(host: str, port: int):
+    """Отдельный aiohttp-сервер с единственным маршрутом /metrics"""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("Metrics available at http://%s:%s/metrics", host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -1,10 +1,272 @@
+import json
+import logging
 import re
+import time
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Pattern, Tuple
 
-def contains_bad_words(text: str) -> bool:
-    bad_patterns = {
-        # r'\b(?:спам|реклам)\b',
-        # r'\b(?:мат[а-я]*|руган)\b',
-        # r'\b(?:http|https|t\.me|@)\b'
-    }
-    text_lower = text.lower()
-    return any(re.search(pattern, text_lower) for pattern in bad_patterns)
\ No newline at end of file
+from services.sharding import key_chat_id, write_shared_json
+
+logger = logging.getLogger(__name__)
+
+RULES_FILE = Path("data/moderation_rules.json")
+GLOBAL_KEY = "0"  # Общие правила для всех чатов (правятся в файле вручную)
+RELOAD_INTERVAL = 5.0  # Как часто проверять, не изменился ли файл правил, сек
+
+# Невидимые символы, которыми разбивают слова
+ZERO_WIDTH = dict.fromkeys(map(ord, "\u00ad\u034f\u180e\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff"))
+# Латинские двойники и leetspeak сводим к кириллице
+HOMOGLYPHS = str.maketrans({
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к", "m": "м", "n": "п",
+    "o": "о", "p": "р", "r": "г", "t": "т", "u": "и", "x": "х", "y": "у", "ё": "е",
+    "0": "о", "3": "з", "4": "ч", "6": "б", "@": "а", "$": "с",
+})
+_REPEATS_RE = re.compile(r"(.)\1+")
+
+
+def normalize_light(text: str) -> str:
+    """Регистр, совместимые формы Unicode и невидимые символы — для regex-правил"""
+    return unicodedata.normalize("NFKC", text).translate(ZERO_WIDTH).casefold()
+
+
+def normalize(text: str) -> str:
+    """Полная нормализация для словарных правил: ещё двойники, leetspeak и повторы букв"""
+    return _REPEATS_RE.sub(r"\1", normalize_light(text).translate(HOMOGLYPHS))
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class AhoCorasick:
+    """Автомат Ахо-Корасик: все словарные правила за один проход по тексту.
+
+    Слово засчитывается только целиком, как \\b...\\b в regex: «мат» не
+    находится в «математике» и «автомате».
+    """
+
+    __slots__ = ("_goto", "_fail", "_out")
+
+    def __init__(self, words):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        for word in words:
+            self._insert(word)
+        self._build()
+
+    def _insert(self, word: str):
+        state = 0
+        for char in word:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = (word,)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                # Слова, оканчивающиеся в суффиксе, тоже проверяются в этом состоянии
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> Optional[str]:
+        """Первое слово, найденное на границах слов, или None"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for word in out[state]:
+                start = end - len(word)
+                if (start == 0 or not _is_word_char(text[start - 1])) \
+                        and (end == len(text) or not _is_word_char(text[end])):
+                    return word
+        return None
+
+
+@dataclass
+class ChatRules:
+    """Правила одного чата в том виде, в котором они хранятся"""
+    words: List[str] = field(default_factory=list)
+    patterns: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {"words": self.words, "patterns": self.patterns}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChatRules":
+        return cls(words=list(data.get("words", [])), patterns=list(data.get("patterns", [])))
+
+
+class CompiledRules:
+    """Общие и чатовые правила, собранные в один автомат и одну regex-альтернацию.
+
+    В альтернацию идут только шаблоны без групп и глобальных флагов: группы
+    в ней перенумеровываются (ломаются обратные ссылки), а (?i) не в начале
+    выражения — ошибка. Остальные проверяются по отдельности, некорректные
+    (например, вписанные в файл вручную) пропускаются.
+    """
+
+    __slots__ = ("automaton", "regex", "separate")
+
+    def __init__(self, rule_sets: List[ChatRules]):
+        words = {normalize(word) for rules in rule_sets for word in rules.words}
+        words.discard("")
+        self.automaton = AhoCorasick(sorted(words)) if words else None
+
+        combinable, self.separate = [], []
+        for pattern in dict.fromkeys(pattern for rules in rule_sets for pattern in rules.patterns):
+            try:
+                compiled = re.compile(pattern)
+            except re.error as e:
+                logger.error("Skipping invalid moderation pattern %r: %s", pattern, e)
+                continue
+            if compiled.groups or compiled.flags & ~re.UNICODE:
+                self.separate.append(compiled)
+            else:
+                combinable.append(pattern)
+        self.regex: Optional[Pattern] = None
+        if combinable:
+            try:
+                self.regex = re.compile("|".join(f"(?:{pattern})" for pattern in combinable))
+            except re.error:
+                self.separate.extend(re.compile(pattern) for pattern in combinable)
+
+    def match(self, text: str) -> Optional[str]:
+        """Сработавшее правило или None"""
+        light = normalize_light(text)
+        for regex in ([self.regex] if self.regex else []) + self.separate:
+            found = regex.search(light)
+            if found:
+                return found.group(0)
+        if self.automaton:
+            return self.automaton.search(normalize(light))
+        return None
+
+
+class ModerationEngine:
+    """Правила модерации по чатам с горячей перезагрузкой файла.
+
+    Правила чата компилируются вместе с общими один раз и кэшируются до
+    изменения. Файл правил перечитывается, если его изменили на диске
+    (вручную или другой воркер), без перезапуска бота.
+    """
+
+    def __init__(self, file_path: Path = RULES_FILE):
+        self.file_path = file_path
+        self.rules: Dict[str, ChatRules] = {}
+        self._compiled: Dict[str, CompiledRules] = {}
+        self._mtime = 0
+        self._checked = 0.0
+
+    def load(self):
+        try:
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            if not self.file_path.exists():
+                self.rules = {}
+                self._compiled.clear()
+                return
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.rules = {chat_id: ChatRules.from_dict(rules) for chat_id, rules in data.items()}
+            self._mtime = self.file_path.stat().st_mtime_ns
+            logger.info("Loaded moderation rules for %s chats", len(self.rules))
+        except Exception as e:
+            logger.error("Failed to load moderation rules: %s", e)
+        self._compiled.clear()
+
+    def _save(self):
+        try:
+            data = {chat_id: rules.to_dict() for chat_id, rules in self.rules.items()}
+            write_shared_json(self.file_path, data, key_chat_id, ensure_ascii=False, indent=2)
+            self._mtime = self.file_path.stat().st_mtime_ns
+        except Exception as e:
+            logger.error("Failed to save moderation rules: %s", e)
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked < RELOAD_INTERVAL:
+            return
+        self._checked = now
+        try:
+            mtime = self.file_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            logger.info("Moderation rules changed on disk, reloading")
+            self.load()
+
+    def compiled(self, chat_id: int) -> CompiledRules:
+        self._reload_if_changed()
+        key = str(chat_id)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            rule_sets = [self.rules[k] for k in (GLOBAL_KEY, key) if k in self.rules]
+            compiled = self._compiled[key] = CompiledRules(rule_sets)
+        return compiled
+
+    def check(self, chat_id: int, text: str) -> Optional[str]:
+        """Сработавшее правило для сообщения или None"""
+        return self.compiled(chat_id).match(text)
+
+    def get_rules(self, chat_id: int) -> ChatRules:
+        return self.rules.get(str(chat_id), ChatRules())
+
+    def add_word(self, chat_id: int, word: str) -> bool:
+        rules = self.rules.setdefault(str(chat_id), ChatRules())
+        word = word.strip()
+        if not word or word in rules.words:
+            return False
+        rules.words.append(word)
+        self._changed(chat_id)
+        return True
+
+    def add_pattern(self, chat_id: int, pattern: str):
+        """Добавляет regex-правило; некорректное выражение — re.error"""
+        re.compile(pattern)
+        rules = self.rules.setdefault(str(chat_id), ChatRules())
+        if pattern not in rules.patterns:
+            rules.patterns.append(pattern)
+            self._changed(chat_id)
+
+    def remove(self, chat_id: int, rule: str) -> bool:
+        rules = self.rules.get(str(chat_id))
+        if not rules:
+            return False
+        for bucket in (rules.words, rules.patterns):
+            if rule in bucket:
+                bucket.remove(rule)
+                self._changed(chat_id)
+                return True
+        return False
+
+    def _changed(self, chat_id: int):
+        key = str(chat_id)
+        if key == GLOBAL_KEY:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(key, None)
+        self._save()
+
+
+moderation_engine = ModerationEngine()
+
+
+def contains_bad_words(text: str, chat_id: int = 0) -> bool:
+    return moderation_engine.check(chat_id, text) is not None
@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config import config
+from services.ai import generate_text
+from services.news_parser import NewsItem
+from services.prompt_manager import GeminiModel, parse_gemini_model
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PROMPT = (
+    "Ты редактор новостного Telegram-канала. Составь краткий дайджест по теме «{topic}» "
+    "на русском языке: по одному-два предложения на каждую новость, без вступлений и "
+    "выводов, каждая новость с новой строки и начинается с «•». Не добавляй ссылки.\n\n"
+    "{items}"
+)
+
+
+class DigestService:
+    """Один AI-дайджест на тему и слот, общий для всех подписанных каналов.
+
+    Результат мемоизируется по (тема, слот, хеш набора новостей); параллельные
+    запросы одного ключа ждут одну и ту же генерацию. Неудачная генерация
+    из памяти убирается, следующий запрос попробует снова.
+    """
+
+    def __init__(self, model: GeminiModel, max_items: int = 5, memo_size: int = 256):
+        self.model = model
+        self.max_items = max_items
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[Tuple[str, str, str], asyncio.Task]" = OrderedDict()
+        self.generations = 0
+
+    @staticmethod
+    def items_hash(items: List[NewsItem]) -> str:
+        return hashlib.blake2b(
+            "\n".join(item.guid for item in items).encode("utf-8"), digest_size=8
+        ).hexdigest()
+
+    async def get(self, topic: str, slot: str, items: List[NewsItem]) -> Optional[str]:
+        """Текст дайджеста или None, если генерация не удалась"""
+        items = items[:self.max_items]
+        key = (topic, slot, self.items_hash(items))
+        task = self._memo.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(topic, items))
+            self._memo[key] = task
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        else:
+            self._memo.move_to_end(key)
+        result = await asyncio.shield(task)
+        if result is None and self._memo.get(key) is task:
+            del self._memo[key]
+        return result
+
+    async def _generate(self, topic: str, items: List[NewsItem]) -> Optional[str]:
+        listing = "\n\n".join(
+            f"{index}. {item.title}\n{item.content[:500]}"
+            for index, item in enumerate(items, 1)
+        )
+        try:
+            self.generations += 1
+            summary = await generate_text(
+                DIGEST_PROMPT.format(topic=topic, items=listing), self.model
+            )
+        except Exception as e:
+            logger.error("Digest generation failed for '%s': %s", topic, e)
+            return None
+
+        links = "\n".join(f"• [{item.title}]({item.link})" for item in items)
+        return f"🗞 *Дайджест: {topic}*\n\n{summary}\n\n{links}"
+
+
+digest_service = DigestService(
+    model=parse_gemini_model(config.NEWS_DIGEST_MODEL),
+    max_items=config.NEWS_DIGEST_ITEMS
+)
@@ -0,0 +1,93 @@
+import calendar
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+READ_MORE = "Читать далее"
+
+
+@dataclass(slots=True)
+class NewsItem:
+    """Новость в том виде, в котором она нужна для отправки"""
+    guid: str
+    title: str
+    content: str
+    image: str
+    link: str
+    hashtags: List[str]
+    published: float  # unix-время, 0 если дата неизвестна
+
+
+class _Extractor:
+    """Один проход по дереву описания: картинка, ссылка и чистый текст"""
+
+    __slots__ = ("parts", "image", "link")
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.image = ""
+        self.link = ""
+
+    def walk(self, el):
+        tag = el.tag
+        if isinstance(tag, str):
+            if tag == "img" and not self.image:
+                self.image = el.get("src", "")
+            elif tag == "a":
+                if not self.link:
+                    self.link = el.get("href", "")
+                # Служебную ссылку «Читать далее» выкидываем вместе с текстом
+                if len(el) == 0 and (el.text or "").strip() == READ_MORE:
+                    if el.tail:
+                        self.parts.append(el.tail)
+                    return
+            if el.text:
+                self.parts.append(el.text)
+            for child in el:
+                self.walk(child)
+        if el.tail:
+            self.parts.append(el.tail)
+
+
+def extract_item(entry, guid: str) -> Optional[NewsItem]:
+    """Преобразует запись feedparser в NewsItem"""
+    from lxml import html
+    from lxml.etree import ParserError
+
+    try:
+        extractor = _Extractor()
+        description = entry.get("description") or ""
+        if description.strip():
+            try:
+                root = html.fragment_fromstring(description, create_parent="div")
+                extractor.walk(root)
+            except ParserError:
+                extractor.parts.append(description)
+
+        image_url = extractor.image
+        # Fallback для медиа-контента
+        if not image_url and entry.get("media_content"):
+            image_url = entry.media_content[0].get("url", "")
+
+        hashtags = []
+        if entry.get("tags"):
+            hashtags = ["#" + tag.term.replace(" ", "_") for tag in entry.tags if tag.get("term")]
+        elif entry.get("category"):
+            hashtags = ["#" + entry.category.replace(" ", "_")]
+
+        published = entry.get("published_parsed")
+        return NewsItem(
+            guid=guid,
+            title=entry.get("title", ""),
+            content="".join(extractor.parts).strip(),
+            image=image_url,
+            link=entry.get("link") or extractor.link,
+            hashtags=hashtags,
+            published=float(calendar.timegm(published)) if published else 0.0
+        )
+
+    except Exception as e:
+        logger.error("Ошибка обработки новости: %s", e)
+        return None
@@ -0,0 +1,212 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from datetime import datetime, timedelta, tzinfo
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from aiogram import Bot
+from config import config
+from services.news_service import NewsService, news_service
+from services.feed_poller import feed_poller
+from services.metrics import STORAGE_FLUSH_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+def get_timezone(name: Optional[str]) -> Optional[tzinfo]:
+    """Часовой пояс канала; None — локальное время сервера"""
+    name = name or config.NEWS_TIMEZONE
+    return ZoneInfo(name) if name else None
+
+
+def slot_times(settings: dict, after: float, until: float) -> List[Tuple[float, str]]:
+    """Все моменты слотов расписания в интервале (after, until]"""
+    schedule = sorted(set(settings.get("schedule") or []))
+    if not schedule:
+        return []
+
+    tz = get_timezone(settings.get("timezone"))
+    day = datetime.fromtimestamp(after, tz).date()
+    result = []
+    while True:
+        for slot in schedule:
+            hours, minutes = map(int, slot.split(":"))
+            local = datetime(day.year, day.month, day.day, hours, minutes, tzinfo=tz)
+            fire_at = local.timestamp()
+            if fire_at > until:
+                return result
+            if fire_at > after:
+                result.append((fire_at, slot))
+        day += timedelta(days=1)
+
+
+def next_fire(settings: dict, after: float) -> Optional[Tuple[float, str]]:
+    """Ближайший слот строго после момента after"""
+    # Расписание повторяется ежедневно, поэтому хватает окна в двое суток
+    times = slot_times(settings, after, after + 2 * 86400)
+    return times[0] if times else None
+
+
+class NewsScheduler:
+    """Планировщик автопостинга на куче «время следующего слота».
+
+    Спит ровно до ближайшего слота, обрабатывает все наступившие разом и
+    перекладывает каналы обратно в кучу. Изменения подписок приходят через
+    listener NewsService; устаревшие записи в куче отбрасываются по версии.
+    """
+
+    def __init__(self, service: NewsService, state_path: str = "data/schedule_state.json",
+                 prefetch: Callable[[List[int]], Awaitable[None]] = None):
+        self.service = service
+        self.prefetch = prefetch
+        self.prefetch_lead = config.FEED_PREFETCH_LEAD
+        self._prefetched_at = 0.0
+        self._prefetch_tasks: Set[asyncio.Task] = set()  # Ссылки держим, чтобы задачи не собрал GC
+        self.state_path = Path(state_path)
+        self.catchup_window = config.NEWS_CATCHUP_WINDOW * 60
+        self.catchup_limit = config.NEWS_CATCHUP_LIMIT
+        self._heap: List[Tuple[float, int, int, str]] = []  # (время, канал, версия, слот)
+        self._versions: Dict[int, int] = {}
+        self._next_fire: Dict[int, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        service.add_listener(self.reschedule)
+
+    def reschedule(self, channel_id: int):
+        """Пересчитывает слот канала после изменения подписки"""
+        self._versions[channel_id] = self._versions.get(channel_id, 0) + 1
+        self._next_fire.pop(channel_id, None)
+        settings = self.service.subscriptions.get(channel_id)
+        if settings:
+            self._push_next(channel_id, settings, time.time())
+        if self._wakeup:
+            self._save_state()
+            self._wakeup.set()
+
+    def _push(self, fire_at: float, channel_id: int, slot: str):
+        version = self._versions.setdefault(channel_id, 0)
+        heapq.heappush(self._heap, (fire_at, channel_id, version, slot))
+
+    def _push_next(self, channel_id: int, settings: dict, after: float):
+        fire = next_fire(settings, after)
+        if fire:
+            self._next_fire[channel_id] = fire[0]
+            self._push(fire[0], channel_id, fire[1])
+
+    def _load_state(self) -> Dict[int, float]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return {int(k): float(v) for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error("Failed to load schedule state: %s", e)
+            return {}
+
+    def _save_state(self):
+        try:
+            with STORAGE_FLUSH_LATENCY.labels("schedule").time(), \
+                    open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(self._next_fire, f)
+        except Exception as e:
+            logger.error("Failed to save schedule state: %s", e)
+
+    def _build(self):
+        """Строит кучу с нуля, добавляя пропущенные за время простоя слоты"""
+        now = time.time()
+        saved = self._load_state()
+        self._heap.clear()
+        self._next_fire.clear()
+
+        for channel_id, settings in self.service.subscriptions.items():
+            missed_since = saved.get(channel_id)
+            if missed_since is not None and missed_since <= now:
+                # Пропущенные слоты в пределах окна, не больше лимита
+                missed = slot_times(
+                    settings,
+                    max(missed_since - 1, now - self.catchup_window),
+                    now
+                )
+                for _, slot in missed[-self.catchup_limit:] if self.catchup_limit else []:
+                    logger.info("Catching up missed slot %s for channel %s", slot, channel_id)
+                    self._push(now, channel_id, slot)
+            self._push_next(channel_id, settings, now)
+
+        self._save_state()
+        logger.info("Scheduler built: %s pending slots", len(self._heap))
+
+    def _pop_due(self, now: float) -> List[Tuple[int, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, channel_id, version, slot = heapq.heappop(self._heap)
+            if version != self._versions.get(channel_id):
+                continue
+            settings = self.service.subscriptions.get(channel_id)
+            if not settings:
+                continue
+            due.append((channel_id, slot))
+            if self._next_fire.get(channel_id) == fire_at:
+                # Следующий слот считаем от текущего, чтобы медленный цикл
+                # не приводил к пропуску
+                self._push_next(channel_id, settings, max(fire_at, now - self.catchup_window))
+        return due
+
+    def _peek_channels(self, until: float) -> List[int]:
+        """Каналы со слотом не позже until, без извлечения из кучи"""
+        channels, stack = [], [0]
+        while stack:
+            index = stack.pop()
+            if index >= len(self._heap) or self._heap[index][0] > until:
+                continue
+            _, channel_id, version, _ = self._heap[index]
+            if version == self._versions.get(channel_id):
+                channels.append(channel_id)
+            stack.extend((2 * index + 1, 2 * index + 2))
+        return channels
+
+    def _prefetch_done(self, task: asyncio.Task):
+        self._prefetch_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Prefetch before slot failed: %s", task.exception())
+
+    async def run(self, bot: Bot):
+        """Основной цикл планировщика"""
+        self._wakeup = asyncio.Event()
+        self._build()
+
+        while True:
+            self._wakeup.clear()
+            delay = self._heap[0][0] - time.time() if self._heap else None
+
+            if self.prefetch and delay and delay > 0 and self._heap[0][0] != self._prefetched_at:
+                if delay <= self.prefetch_lead:
+                    # Прогреваем ленты каналов ближайшего слота заранее
+                    self._prefetched_at = self._heap[0][0]
+                    channels = self._peek_channels(self._prefetched_at)
+                    task = asyncio.create_task(self.prefetch(channels))
+                    self._prefetch_tasks.add(task)
+                    task.add_done_callback(self._prefetch_done)
+                    continue
+                delay -= self.prefetch_lead
+
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._pop_due(time.time())
+            if not due:
+                continue
+            self._save_state()
+            await self.service.process_scheduled_posts(bot, due)
+
+
+news_scheduler = NewsScheduler(
+    news_service,
+    prefetch=feed_poller.prefetch_channels if config.FEED_POLL_ENABLED else None
+)
@@ -1,51 +1,80 @@
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, List, Any, Set, Tuple
 import json
 from config import config
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InputMediaPhoto
 from pathlib import Path 
-import feedparser
-from bs4 import BeautifulSoup
-import re
+from services.feed_cache import FeedCache
+from services.metrics import STORAGE_FLUSH_LATENCY
+from services.guid_store import GuidStore
+from services.news_parser import NewsItem, extract_item
+from services.send_queue import outbound, PRIORITY_NEWS
+from services.media_cache import MediaCache
+from services.simhash import SimHashIndex, simhash
+from services.news_digest import digest_service
 
 logger = logging.getLogger(__name__)
 
+MODE_SINGLE = "single"
+MODE_BATCH = "batch"
+MODE_DIGEST = "digest"
+NEWS_MODES = (MODE_SINGLE, MODE_BATCH, MODE_DIGEST)
+MEDIA_GROUP_SIZE = 10
+TEXT_SEPARATOR = "\n\n———\n\n"
+STORY_LEAD_LENGTH = 300  # Сколько символов текста учитывать в отпечатке сюжета
+
+# Ошибки Bot API про саму картинку по URL. Ошибки конкретного чата (например,
+# "not enough rights to send photos") сюда не относятся: URL помечается сбойным для всех каналов
+MEDIA_ERROR_MARKERS = (
+    "wrong file identifier/http url specified",
+    "failed to get http url content",
+    "wrong type of the web page content",
+    "image_process_failed",
+    "photo_invalid_dimensions",
+)
+
 class NewsService:
     def __init__(self, file_path: str = "data/subscriptions.json"):
         self.file_path = Path(file_path)
         self.subscriptions: Dict[int, Dict[str, Any]] = {}
         self.rss_sources = config.RSS_SOURCES
-        self.sent_guids = set()
-        self._guids_file = Path("data/sent_guids.json") 
+        self.sent_guids = GuidStore(
+            Path("data/sent_guids.bin"),
+            retention_days=config.GUID_RETENTION_DAYS,
+            max_entries=config.GUID_STORE_MAX,
+            legacy_path=Path("data/sent_guids.json")
+        )
+        self.feed_cache = FeedCache(ttl=config.FEED_CACHE_TTL)
+        self.media_cache = MediaCache(
+            Path("data/media_cache.json"),
+            max_size=config.MEDIA_CACHE_SIZE,
+            failure_ttl=config.MEDIA_FAILURE_TTL
+        )
+        self.story_index = SimHashIndex(
+            max_distance=config.STORY_DEDUP_DISTANCE,
+            capacity=config.STORY_DEDUP_WINDOW
+        )
+        self._parsed: Dict[str, Tuple[Any, List[NewsItem]]] = {}
+        self.last_cycle_stats: Dict[str, int] = {}
+        self._listeners: List[Callable[[int], None]] = []
+
+    def load(self):
+        """Загружает состояние с диска (вызывается из main при старте)"""
         self._init_storage()
         self._load_data()
-        self._load_sent_guids()
+        self.sent_guids.load()
+        self.media_cache.load()
         logger.info("NewsService initialized")
 
     def _init_storage(self):
         """Создает необходимые файлы и директории"""
         Path("data").mkdir(exist_ok=True)
-        self._guids_file.touch(exist_ok=True)
         self.file_path.touch(exist_ok=True)
 
-    def _load_sent_guids(self):
-        """Загружает историю отправленных GUID"""
-        try:
-            with open(self._guids_file, "r", encoding="utf-8") as f:
-                self.sent_guids = set(json.load(f))
-        except Exception as e:
-            logger.error(f"Failed to load GUIDs: {e}")
-
-    def _save_sent_guids(self):
-        """Сохраняет историю GUID в файл"""
-        try:
-            with open(self._guids_file, "w", encoding="utf-8") as f:
-                json.dump(list(self.sent_guids), f, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Failed to save GUIDs: {e}")
-
     def _load_data(self):
         """Загружает данные подписок"""
         try:
@@ -53,110 +82,276 @@ class NewsService:
                 self.subscriptions = {
                     int(k): v for k, v in json.load(f).items()
                 }
-            logger.info(f"Loaded {len(self.subscriptions)} subscriptions")
+            logger.info("Loaded %s subscriptions", len(self.subscriptions))
         except Exception as e:
-            logger.error(f"Failed to load data: {e}")
+            logger.error("Failed to load data: %s", e)
             self.subscriptions = {}
 
     def _save_data(self):
         """Сохраняет данные подписок"""
         try:
-            with open(self.file_path, "w", encoding="utf-8") as f:
+            with STORAGE_FLUSH_LATENCY.labels("subscriptions").time(), \
+                    open(self.file_path, "w", encoding="utf-8") as f:
                 json.dump(self.subscriptions, f, indent=2, ensure_ascii=False)
         except Exception as e:
-            logger.error(f"Failed to save data: {e}")
+            logger.error("Failed to save data: %s", e)
 
-    def add_subscription(self, channel_id: int, topics: list, schedule: list):
+    def add_subscription(self, channel_id: int, topics: list, schedule: list, timezone: str = None):
         """Добавляет новую подписку"""
         self.subscriptions[channel_id] = {
             "topics": [t.strip() for t in topics if t.strip()],
             "schedule": schedule,
+            "timezone": timezone,
+            "mode": self.subscriptions.get(channel_id, {}).get("mode", MODE_SINGLE),
             "last_post": None
         }
         self._save_data()
-        logger.info(f"Added subscription for channel {channel_id}")
-
-    async def process_scheduled_posts(self, bot: Bot):
-        """Обрабатывает запланированные публикации"""
+        self._notify(channel_id)
+        logger.info("Added subscription for channel %s", channel_id)
+
+    def set_mode(self, channel_id: int, mode: str) -> bool:
+        """Переключает режим публикации канала"""
+        if channel_id not in self.subscriptions or mode not in NEWS_MODES:
+            return False
+        self.subscriptions[channel_id]["mode"] = mode
+        self._save_data()
+        logger.info("Channel %s switched to %s mode", channel_id, mode)
+        return True
+
+    def add_listener(self, callback: Callable[[int], None]):
+        """Подписывает callback на изменения подписок канала"""
+        self._listeners.append(callback)
+
+    def _notify(self, channel_id: int):
+        for callback in self._listeners:
+            try:
+                callback(channel_id)
+            except Exception as e:
+                logger.error("Subscription listener failed: %s", e)
+
+    async def process_scheduled_posts(self, bot: Bot, due: List[Tuple[int, str]]):
+        """Обрабатывает наступившие слоты: список пар (канал, слот ЧЧ:ММ)"""
         try:
-            now = datetime.now().strftime("%H:%M")
-            logger.debug(f"Checking schedule at {now}")
-            
-            for channel_id, settings in self.subscriptions.copy().items():
-                if now in settings["schedule"] and settings["last_post"] != now:
-                    logger.info(f"Processing channel {channel_id} at {now}")
-                    await self._process_channel(bot, channel_id, settings, now)
+            jobs = [
+                (channel_id, self.subscriptions[channel_id], slot)
+                for channel_id, slot in due
+                if channel_id in self.subscriptions
+            ]
+            if jobs:
+                await self._run_cycle(bot, jobs)
 
         except Exception as e:
-            logger.error(f"Critical error: {str(e)}", exc_info=True)
+            logger.error("Critical error: %s", e, exc_info=True)
+
+    async def _run_cycle(self, bot: Bot, due: List[Tuple[int, dict, str]]):
+        """Загружает объединение лент один раз и раздаёт новости всем каналам"""
+        topics = {topic.lower() for _, settings, _ in due for topic in settings["topics"]}
+        await self.feed_cache.prefetch(
+            url for topic in topics for url in config.RSS_MAPPING.get(topic, [])
+        )
+
+        try:
+            # Одна выборка на тему, общая для всех подписанных каналов;
+            # для дайджестов берём сразу несколько новостей
+            digest_topics = {
+                topic.lower()
+                for _, settings, _ in due if settings.get("mode") == MODE_DIGEST
+                for topic in settings["topics"]
+            }
+            topic_news = {
+                topic: await self.fetch_news(
+                    topic, digest_service.max_items if topic in digest_topics else 1
+                )
+                for topic in topics
+            }
+
+            # Каналы обрабатываются параллельно, темп задаёт очередь отправки
+            await asyncio.gather(*(
+                self._process_channel(bot, channel_id, settings, slot, topic_news)
+                for channel_id, settings, slot in due
+            ))
+        finally:
+            # GUID, file_id и подписки сохраняются одной записью в конце цикла
+            self.sent_guids.flush()
+            self.media_cache.flush()
+            self._save_data()
 
-    async def _process_channel(self, bot: Bot, channel_id: int, settings: dict, now: str):
+        self.last_cycle_stats = self.feed_cache.reset_stats()
+        logger.info(
+            "Cycle: %s channels, %s topics, feed stats %s",
+            len(due), len(topics), self.last_cycle_stats
+        )
+
+    async def _process_channel(self, bot: Bot, channel_id: int, settings: dict, slot: str,
+                               topic_news: Dict[str, List[NewsItem]]):
         """Обрабатывает публикации для конкретного канала"""
+        logger.info("Processing channel %s at %s", channel_id, slot)
         try:
+            channel_items = []
             for topic in settings["topics"]:
-                news_items = await self.fetch_news(topic)
+                news_items = topic_news.get(topic.lower())
                 if not news_items:
-                    logger.warning(f"No news found for topic '{topic}'")
+                    logger.warning("No news found for topic '%s'", topic)
                     continue
-                
-                for news in news_items:
+
+                if settings.get("mode") == MODE_DIGEST:
+                    digest = await digest_service.get(topic.lower(), slot, news_items)
+                    if digest:
+                        await self._send_fallback(bot, channel_id, digest)
+                        continue
+                channel_items.extend(news_items[:1])
+
+            if settings.get("mode") == MODE_BATCH:
+                await self._send_batch(bot, channel_id, channel_items)
+            else:
+                for news in channel_items:
                     await self._send_news(bot, channel_id, news)
 
-            settings["last_post"] = now
-            self._save_data()
+            settings["last_post"] = slot
 
         except TelegramForbiddenError:
-            logger.error(f"Bot was removed from channel {channel_id}")
+            logger.error("Bot was removed from channel %s", channel_id)
             self.remove_subscription(channel_id)
         except TelegramBadRequest as e:
-            logger.error(f"Telegram API error: {str(e)}")
+            logger.error("Telegram API error: %s", e)
         except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-
-    async def _send_news(self, bot: Bot, channel_id: int, news: dict):
-        """Отправляет новость в канал"""
-        hashtags = " ".join(news["hashtags"])
-        text = (
-            f"📰 *{news['title']}*\n\n"
-            f"{news['content']}\n\n"
-            f"[Read more]({news['link']})\n"
+            logger.error("Unexpected error: %s", e)
+
+    @staticmethod
+    def _format_news(news: NewsItem) -> str:
+        """Текст поста по шаблону канала"""
+        hashtags = " ".join(news.hashtags)
+        return (
+            f"📰 *{news.title}*\n\n"
+            f"{news.content}\n\n"
+            f"[Read more]({news.link})\n"
             f"{hashtags}"
         )
 
+    async def _send_news(self, bot: Bot, channel_id: int, news: NewsItem):
+        """Отправляет новость в канал"""
+        text = self._format_news(news)
+
+        if news.image and await self._send_photo(bot, channel_id, news.image, text[:1024]):
+            return
+        await self._send_fallback(bot, channel_id, text)
+
+    async def _send_photo(self, bot: Bot, channel_id: int, url: str, caption: str) -> bool:
+        """Отправляет фото, переиспользуя file_id; False — нужен текстовый fallback"""
+        while True:
+            file_id = self.media_cache.get(url)
+            if file_id or self.media_cache.is_failed(url):
+                break
+            # Первую загрузку URL делает один канал, остальные ждут его file_id
+            pending = self.media_cache.begin(url)
+            if pending is None:
+                break
+            await pending
+
+        if not file_id and self.media_cache.is_failed(url):
+            return False
+
         try:
-            if news["image"]:
-                await bot.send_photo(
-                    chat_id=channel_id,
-                    photo=news["image"],
-                    caption=text[:1024],
-                    parse_mode="Markdown"
-                )
-            else:
-                await self._send_fallback(bot, channel_id, text)
+            message = await outbound.send(channel_id, lambda: bot.send_photo(
+                chat_id=channel_id,
+                photo=file_id or url,
+                caption=caption,
+                parse_mode="Markdown"
+            ), PRIORITY_NEWS)
+            if not file_id and message and message.photo:
+                self.media_cache.put(url, message.photo[-1].file_id)
+            return True
         except Exception as e:
-            logger.error(f"Failed to send photo: {str(e)}")
+            logger.error("Failed to send photo: %s", e)
+            if file_id:
+                self.media_cache.forget(url)
+            elif any(marker in str(e).lower() for marker in MEDIA_ERROR_MARKERS):
+                self.media_cache.mark_failed(url)
+            return False
+        finally:
+            if not file_id:
+                self.media_cache.end(url)
+
+    async def _send_batch(self, bot: Bot, channel_id: int, items: List[NewsItem]):
+        """Пакетный режим: фото-новости альбомами до 10, текстовые одним сообщением"""
+        photos, texts = [], []
+        for news in items:
+            if news.image and not self.media_cache.is_failed(news.image):
+                photos.append(news)
+            else:
+                texts.append(self._format_news(news))
+
+        for start in range(0, len(photos), MEDIA_GROUP_SIZE):
+            chunk = photos[start:start + MEDIA_GROUP_SIZE]
+            if len(chunk) == 1 or not await self._send_album(bot, channel_id, chunk):
+                # Альбом из одного фото невозможен, а при ошибке отправляем поштучно
+                for news in chunk:
+                    await self._send_news(bot, channel_id, news)
+
+        for text in self._pack_texts(texts, 4096):
             await self._send_fallback(bot, channel_id, text)
 
+    async def _send_album(self, bot: Bot, channel_id: int, chunk: List[NewsItem]) -> bool:
+        media = [
+            InputMediaPhoto(
+                media=self.media_cache.get(news.image) or news.image,
+                caption=self._format_news(news)[:1024],
+                parse_mode="Markdown"
+            )
+            for news in chunk
+        ]
+        try:
+            messages = await outbound.send(
+                channel_id,
+                lambda: bot.send_media_group(chat_id=channel_id, media=media),
+                PRIORITY_NEWS
+            )
+        except Exception as e:
+            logger.error("Failed to send media group: %s", e)
+            return False
+
+        for news, message in zip(chunk, messages or []):
+            if message.photo and not self.media_cache.get(news.image):
+                self.media_cache.put(news.image, message.photo[-1].file_id)
+        return True
+
+    @staticmethod
+    def _pack_texts(texts: List[str], limit: int) -> List[str]:
+        """Склеивает тексты в сообщения не длиннее limit"""
+        messages = []
+        current = ""
+        for text in texts:
+            text = text[:limit]
+            candidate = f"{current}{TEXT_SEPARATOR}{text}" if current else text
+            if len(candidate) <= limit:
+                current = candidate
+            else:
+                messages.append(current)
+                current = text
+        if current:
+            messages.append(current)
+        return messages
+
     async def _send_fallback(self, bot: Bot, channel_id: int, text: str):
         """Отправляет текстовое сообщение, если не удалось отправить фото"""
         try:
-            await bot.send_message(
+            await outbound.send(channel_id, lambda: bot.send_message(
                 chat_id=channel_id,
                 text=text[:4096],
                 parse_mode="Markdown",
                 disable_web_page_preview=True
-            )
+            ), PRIORITY_NEWS)
         except Exception as e:
-            logger.error(f"Failed to send message: {str(e)}")
+            logger.error("Failed to send message: %s", e)
 
-    async def fetch_news(self, topic: str) -> List[Dict]:
-        """Получает новости по указанной теме"""
+    async def fetch_news(self, topic: str, limit: int = 1) -> List[NewsItem]:
+        """Получает до limit свежих новостей по указанной теме"""
         try:
-            logger.info(f"Поиск новостей по тегу: {topic}")
+            logger.info("Поиск новостей по тегу: %s", topic)
             rss_urls = config.RSS_MAPPING.get(topic.lower(), [])
             
             if not rss_urls:
-                logger.error(f"Для тега '{topic}' нет RSS-лент")
+                logger.error("Для тега '%s' нет RSS-лент", topic)
                 return []
 
             news_items = []
@@ -168,82 +363,82 @@ class NewsService:
                 news_items += await self._parse_rss(rss_url)
 
             # Сортировка и выбор последней новости
-            news_items.sort(
-                key=lambda x: x.get("published_parsed", datetime.min.timetuple()),
-                reverse=True
-            )
-            return news_items[:1]
+            news_items.sort(key=lambda x: x.published, reverse=True)
+
+            # Один и тот же сюжет из разных источников отправляем один раз
+            selected = []
+            for news in news_items:
+                fingerprint = simhash(f"{news.title} {news.content[:STORY_LEAD_LENGTH]}")
+                if self.story_index.find(fingerprint) is not None:
+                    logger.info("Near-duplicate story dropped: %s", news.title)
+                    continue
+                self.story_index.add(fingerprint)
+                selected.append(news)
+                if len(selected) >= limit:
+                    break
+            return selected
 
         except Exception as e:
-            logger.error(f"Критическая ошибка: {str(e)}", exc_info=True)
+            logger.error("Критическая ошибка: %s", e, exc_info=True)
             return []
 
-    async def _parse_rss(self, rss_url: str) -> List[Dict]:
+    async def _parse_rss(self, rss_url: str) -> List[NewsItem]:
         """Парсит RSS-ленту"""
         try:
-            feed = feedparser.parse(rss_url)
+            feed = await self.feed_cache.get(rss_url)
             if feed.bozo:
-                logger.error(f"RSS error ({rss_url}): {feed.bozo_exception}")
+                logger.error("RSS error (%s): %s", rss_url, feed.bozo_exception)
                 return []
 
-            new_entries = []
-            for entry in feed.entries:
-                guid = entry.get("id", entry.get("link", str(datetime.now())))
-                if guid not in self.sent_guids:
-                    new_entries.append((entry, guid))
-
-            return [self._process_entry(entry, guid) for entry, guid in new_entries[:5]]
+            items = [
+                item for item in self.warm_items(rss_url, feed)
+                if item.guid not in self.sent_guids
+            ][:5]
+            for item in items:
+                self.sent_guids.add(item.guid)
+            return items
 
         except Exception as e:
-            logger.error(f"Ошибка парсинга {rss_url}: {str(e)}")
+            logger.error("Ошибка парсинга %s: %s", rss_url, e)
             return []
 
-    def _process_entry(self, entry, guid: str) -> Dict:
-        """Обрабатывает отдельную RSS-запись"""
-        try:
-            soup = BeautifulSoup(entry.description, "html.parser")
-            
-            # Поиск изображения
-            img_tag = soup.find("img")
-            image_url = img_tag["src"] if img_tag else ""
-            
-            # Fallback для медиа-контента
-            if not image_url and hasattr(entry, "media_content"):
-                image_url = entry.media_content[0]["url"]
-
-            # Очистка текста
-            text = re.sub(r'<a\b[^>]*>Читать далее</a>', '', entry.description)
-            clean_text = BeautifulSoup(text, "html.parser").get_text().strip()
-            
-            # Хештеги
-            hashtags = []
-            if hasattr(entry, "tags"):
-                hashtags = ["#" + tag.term.replace(" ", "_") for tag in entry.tags]
-            elif hasattr(entry, "category"):
-                hashtags = ["#" + entry.category.replace(" ", "_")]
-
-            # Добавляем GUID в историю
-            self.sent_guids.add(guid)
-            self._save_sent_guids()
-
-            return {
-                "title": entry.title,
-                "content": clean_text,
-                "image": image_url,
-                "link": entry.link,
-                "hashtags": hashtags,
-                "published_parsed": entry.get("published_parsed", datetime.min.timetuple())
-            }
-
-        except Exception as e:
-            logger.error(f"Ошибка обработки новости: {str(e)}")
-            return {}
+    def warm_items(self, rss_url: str, feed) -> List[NewsItem]:
+        """Разобранные записи ленты; разбор делается один раз на загрузку"""
+        cached = self._parsed.get(rss_url)
+        if cached and cached[0] is feed:
+            return cached[1]
+
+        items = []
+        for entry in feed.entries:
+            guid = entry.get("id", entry.get("link", str(datetime.now())))
+            # Уже отправленные записи отсекаются до какого-либо разбора
+            if guid in self.sent_guids:
+                continue
+            item = extract_item(entry, guid)
+            if item:
+                items.append(item)
+
+        self._parsed[rss_url] = (feed, items)
+        return items
+
+    def subscribed_feeds(self, channel_ids: Iterable[int] = None) -> Set[str]:
+        """URL лент, нужных подпискам (всех или указанных каналов)"""
+        if channel_ids is None:
+            channel_ids = list(self.subscriptions)
+        return {
+            url
+            for channel_id in channel_ids
+            for topic in self.subscriptions.get(channel_id, {}).get("topics", [])
+            for url in config.RSS_MAPPING.get(topic.lower(), [])
+            if url
+        }
 
     def remove_subscription(self, channel_id: int):
         """Удаляет подписку канала"""
         if channel_id in self.subscriptions:
             del self.subscriptions[channel_id]
             self._save_data()
-            logger.info(f"Removed subscription for channel {channel_id}")
+            self._notify(channel_id)
+            logger.info("Removed subscription for channel %s", channel_id)
 
 news_service = NewsService()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame: Optional[FrameType]) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер потока event loop.
+
+    Если цикл событий работает в главном потоке (обычный запуск), стек
+    снимается по сигналу SIGPROF раз в interval секунд процессорного
+    времени — ожидание сети в профиль не попадает, его видно в /traces.
+    Иначе (Windows, цикл не в главном потоке) стек снимает фоновый поток,
+    но он видит цикл только в моменты освобождения GIL.
+    Результат — collapsed stacks ("корень;...;лист число") для
+    flamegraph.pl или speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float) -> str:
+        async with self._lock:
+            if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+                stacks = await self._sample_signal(seconds)
+            else:
+                stacks = await asyncio.to_thread(self._sample_thread, threading.get_ident(), seconds)
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    async def _sample_signal(self, seconds: float) -> Counter:
+        stacks: Counter = Counter()
+
+        def on_sample(signum, frame):
+            stacks[_collapse(frame)] += 1
+
+        previous = signal.signal(signal.SIGPROF, on_sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous if previous is not None else signal.SIG_DFL)
+        return stacks
+
+    def _sample_thread(self, thread_id: int, seconds: float) -> Counter:
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            stack = _collapse(sys._current_frames().get(thread_id))
+            if stack:
+                stacks[stack] += 1
+            time.sleep(self.interval)
+        return stacks
+
+
+profiler = SamplingProfiler()
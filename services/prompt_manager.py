@@ -1,9 +1,13 @@
 # services/prompt_manager.py
 import json
+import logging
 from pathlib import Path
 from typing import Dict, Optional
 from enum import Enum
 from services.context_manager import reset_chat_context
+from services.sharding import key_chat_id, write_shared_json
+
+logger = logging.getLogger(__name__)
 
 PROMPTS_FILE = Path(__file__).resolve().parent.parent / "data" / "chat_settings.json"
 
@@ -18,6 +22,14 @@ class GeminiModel(Enum):
     FLASH_THINKING = "gemini-2.0-flash-thinking-exp-01-21"
     FLASH_8B = "gemini-1.5-flash-8b"
 
+def parse_gemini_model(value: str, default: GeminiModel = GeminiModel.FLASH_8B) -> GeminiModel:
+    """Модель из настройки; неизвестное значение — в лог и модель по умолчанию"""
+    try:
+        return GeminiModel(value)
+    except ValueError:
+        logger.error("Unknown Gemini model '%s', using %s", value, default.value)
+        return default
+
 class ChatSettings:
     def __init__(self, prompt: str, ai_mode: AIMode = AIMode.DEFAULT, gemini_model: GeminiModel = None):
         self.prompt = prompt
@@ -41,9 +53,14 @@ class ChatSettings:
 
 class PromptManager:
     def __init__(self):
+        self.default_prompt = " "
+        self.global_prompt = ""
+        self.chat_settings: Dict[str, ChatSettings] = {}
+
+    def load(self):
+        """Загружает промпты и настройки чатов (вызывается из main при старте)"""
         self.default_prompt = self._load_default_prompt()
         self.global_prompt = self._load_global_prompt()
-        self.chat_settings: Dict[str, ChatSettings] = {}
         self._load_settings()
 
     def _load_settings(self):
@@ -63,12 +80,11 @@ class PromptManager:
             self.chat_settings = {}
 
     def _save_settings(self):
-        with open(PROMPTS_FILE, "w", encoding="utf-8") as f:
-            data = {
-                chat_id: settings.to_dict()
-                for chat_id, settings in self.chat_settings.items()
-            }
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        data = {
+            chat_id: settings.to_dict()
+            for chat_id, settings in self.chat_settings.items()
+        }
+        write_shared_json(PROMPTS_FILE, data, key_chat_id, ensure_ascii=False, indent=2)
 
     def _load_default_prompt(self) -> str:
         try:
@@ -0,0 +1,243 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter
+from config import config
+from services.metrics import SEND_QUEUE_DEPTH
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Чем меньше значение, тем раньше уходит сообщение
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NEWS = 10
+BUCKET_SWEEP_INTERVAL = 60  # Как часто выбрасывать лимиты простаивающих чатов, сек
+
+
+class TokenBucket:
+    """Классический token bucket с возможностью паузы по retry_after"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def take(self) -> float:
+        """Забирает токен; возвращает 0 или сколько секунд ждать"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def idle(self, now: float) -> bool:
+        """Бакет восстановился полностью и не на паузе — не отличается от нового"""
+        return now >= self.blocked_until and \
+            self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+    def pause(self, seconds: float):
+        """Блокирует выдачу токенов на указанное время"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket, общий для нескольких процессов.
+
+    Состояние (токены, время обновления, пауза) лежит в multiprocessing.Array,
+    поэтому воркеры делят один глобальный лимит Bot API.
+    """
+
+    def __init__(self, rate: float, capacity: float, state):
+        self.rate = rate
+        self.capacity = capacity
+        self._state = state
+
+    @staticmethod
+    def create_state(ctx, capacity: float):
+        """Разделяемое состояние; создаётся в супервизоре до запуска воркеров"""
+        return ctx.Array("d", [capacity, time.monotonic(), 0.0])
+
+    def take(self) -> float:
+        with self._state.get_lock():
+            self.tokens, self.updated, self.blocked_until = self._state
+            wait = super().take()
+            self._state[:] = [self.tokens, self.updated, self.blocked_until]
+        return wait
+
+    def pause(self, seconds: float):
+        with self._state.get_lock():
+            self.tokens, self.updated, self.blocked_until = self._state
+            super().pause(seconds)
+            self._state[:] = [self.tokens, self.updated, self.blocked_until]
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    call: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    context: contextvars.Context = field(default_factory=contextvars.copy_context, compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class OutboundDispatcher:
+    """Центральная очередь исходящих вызовов Bot API.
+
+    У каждого чата своя очередь с приоритетами и свой воркер, поэтому разные
+    чаты отправляются параллельно, а один чат — последовательно. Глобальный
+    лимит выдаётся ожидающим строго по приоритету. На TelegramRetryAfter
+    на паузу ставятся чат и глобальный лимит (по ответу не понять, чей лимит
+    исчерпан), а задание возвращается в очередь. Лимиты чатов без очереди,
+    успевшие восстановиться, выбрасываются.
+    """
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1,
+                 group_rate_per_min: float = 20, max_retries: int = 5):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_min / 60
+        self.group_capacity = group_rate_per_min
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._global_waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._global_pump: Optional[asyncio.Task] = None
+        self._queues: Dict[int, List[_Job]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._swept = time.monotonic()
+        self._seq = itertools.count()
+
+    def share_global(self, state):
+        """Переключает глобальный лимит на общий для всех воркеров"""
+        self._global = SharedTokenBucket(self._global.rate, self._global.capacity, state)
+
+    def depth(self) -> int:
+        """Количество заданий, ожидающих отправки"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable[Any]],
+                   priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """Ставит вызов в очередь чата и ждёт его результата.
+
+        Вызов выполняется в контексте отправителя (снимок на момент send), а не
+        воркера чата: спаны запросов к Bot API попадают в трейс своего апдейта.
+        """
+        with span("outbound"):
+            job = _Job(priority, next(self._seq), call, asyncio.get_running_loop().create_future())
+            heapq.heappush(self._queues.setdefault(chat_id, []), job)
+            if chat_id not in self._workers:
+                self._workers[chat_id] = asyncio.create_task(self._worker(chat_id))
+            return await job.future
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            self._sweep_buckets()
+            # Отрицательные id — группы и каналы с лимитом в минуту
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_capacity)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_rate)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def _sweep_buckets(self):
+        now = time.monotonic()
+        if now - self._swept < BUCKET_SWEEP_INTERVAL:
+            return
+        self._swept = now
+        idle = [chat_id for chat_id, bucket in self._buckets.items()
+                if chat_id not in self._workers and bucket.idle(now)]
+        for chat_id in idle:
+            del self._buckets[chat_id]
+
+    async def _worker(self, chat_id: int):
+        queue = self._queues[chat_id]
+        bucket = self._bucket(chat_id)
+        try:
+            while queue:
+                if queue[0].future.done():
+                    heapq.heappop(queue)
+                    continue
+
+                wait = bucket.take()
+                if wait:
+                    await asyncio.sleep(wait)
+                    continue
+
+                job = heapq.heappop(queue)
+                await self._acquire_global(job.priority)
+                try:
+                    # create_task копирует текущий контекст, поэтому задача создаётся внутри job.context
+                    result = await job.context.run(lambda: asyncio.ensure_future(job.call()))
+                except TelegramRetryAfter as e:
+                    job.attempts += 1
+                    if job.attempts > self.max_retries:
+                        job.future.set_exception(e)
+                        continue
+                    logger.warning(
+                        "Flood wait %ss in chat %s, requeue (attempt %s)",
+                        e.retry_after, chat_id, job.attempts
+                    )
+                    bucket.pause(e.retry_after)
+                    self._global.pause(e.retry_after)
+                    heapq.heappush(queue, job)
+                    continue
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                    continue
+
+                if not job.future.done():
+                    job.future.set_result(result)
+        finally:
+            self._workers.pop(chat_id, None)
+            if not queue:
+                self._queues.pop(chat_id, None)
+
+    async def _acquire_global(self, priority: int):
+        if not self._global_waiters and not self._global.take():
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._global_waiters, (priority, next(self._seq), waiter))
+        if self._global_pump is None or self._global_pump.done():
+            self._global_pump = asyncio.create_task(self._pump_global())
+        await waiter
+
+    async def _pump_global(self):
+        """Раздаёт глобальные токены ожидающим в порядке приоритета"""
+        while self._global_waiters:
+            wait = self._global.take()
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+            while self._global_waiters:
+                _, _, waiter = heapq.heappop(self._global_waiters)
+                if not waiter.done():
+                    waiter.set_result(None)
+                    break
+
+
+outbound = OutboundDispatcher(
+    global_rate=config.SEND_GLOBAL_RATE,
+    chat_rate=config.SEND_CHAT_RATE,
+    group_rate_per_min=config.SEND_GROUP_RATE_PER_MIN,
+    max_retries=config.SEND_MAX_RETRIES
+)
+
+SEND_QUEUE_DEPTH.set_function(outbound.depth)
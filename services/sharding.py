@@ -0,0 +1,188 @@
+import json
+import os
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from services.metrics import STORAGE_FLUSH_LATENCY
+from services.tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка байта файла через msvcrt
+    fcntl = None
+    import msvcrt
+
+LEADER = 0
+# Команды, меняющие состояние новостей и глобальный бан-лист: их держит только лидер
+LEADER_COMMANDS = ("/news_setup", "/news_mode", "/subscribe", "/feeds", "/gban", "/ungban")
+# Кнопки диалога /news_setup: состояние FSM есть только у лидера
+LEADER_CALLBACKS = {"cancel", "default_schedule"}
+SETUP_PIN_TTL = 600  # Сколько секунд после /news_setup сообщения автора в этом чате идут лидеру
+
+
+class WorkerInfo:
+    """Номер текущего процесса-воркера и их общее число"""
+
+    def __init__(self):
+        self.index = LEADER
+        self.count = 1
+
+    def configure(self, index: int, count: int):
+        self.index = index
+        self.count = count
+
+    @property
+    def is_leader(self) -> bool:
+        return self.index == LEADER
+
+
+worker = WorkerInfo()
+
+
+def shard_for(chat_id: int, count: int) -> int:
+    """Воркер, которому принадлежит чат.
+
+    Личные чаты (положительные id) обслуживает лидер: там идёт настройка
+    новостей, а их состояние живёт только в лидере. Группы и каналы
+    распределяются по стабильному хэшу id.
+    """
+    if count == 1 or chat_id >= 0:
+        return LEADER
+    return zlib.crc32(chat_id.to_bytes(8, "little", signed=True)) % count
+
+
+def owns(chat_id: int) -> bool:
+    """Принадлежит ли чат текущему воркеру"""
+    return shard_for(chat_id, worker.count) == worker.index
+
+
+def update_chat_id(update: Dict[str, Any]) -> int:
+    """id чата из сырого апдейта Bot API (или пользователя, если чата нет)"""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+    return 0
+
+
+class UpdateRouter:
+    """Выбор воркера для сырого апдейта.
+
+    Команды из LEADER_COMMANDS и кнопки LEADER_CALLBACKS уходят лидеру.
+    После /news_setup сообщения того же пользователя в том же чате тоже
+    идут лидеру SETUP_PIN_TTL секунд или до кнопки, завершающей диалог:
+    ответы на шаги FSM должен получить процесс, который хранит её состояние.
+    """
+
+    def __init__(self, count: int, pin_ttl: float = SETUP_PIN_TTL):
+        self.count = count
+        self.pin_ttl = pin_ttl
+        self._pinned: Dict[Tuple[int, int], float] = {}  # (chat_id, user_id) -> до какого времени
+
+    def route(self, update: Dict[str, Any]) -> int:
+        if self.count == 1:
+            return LEADER
+        chat_id = update_chat_id(update)
+        message = update.get("message")
+        if message:
+            key = (chat_id, (message.get("from") or {}).get("id", 0))
+            text = message.get("text", "")
+            if text.startswith("/news_setup"):
+                self._pin(key)
+            if text.startswith(LEADER_COMMANDS):
+                return LEADER
+            if self._is_pinned(key):
+                return LEADER
+        callback = update.get("callback_query")
+        if callback and callback.get("data") in LEADER_CALLBACKS:
+            # Кнопки завершают диалог
+            self._pinned.pop((chat_id, callback["from"]["id"]), None)
+            return LEADER
+        return shard_for(chat_id, self.count)
+
+    def _pin(self, key: Tuple[int, int]):
+        now = time.monotonic()
+        if len(self._pinned) > 1000:
+            self._pinned = {pinned: until for pinned, until in self._pinned.items() if until > now}
+        self._pinned[key] = now + self.pin_ttl
+
+    def _is_pinned(self, key: Tuple[int, int]) -> bool:
+        until = self._pinned.get(key)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self._pinned[key]
+            return False
+        return True
+
+
+@contextmanager
+def _file_lock(path: Path):
+    with open(f"{path}.lock", "a+") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK сдаётся после ~10 с ожидания, ждём дальше
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_shared_json(path: Path, data: Dict[str, Any], chat_of: Callable[[str], int],
+                      **dump_kwargs):
+    """Сохраняет словарь с ключами по чатам.
+
+    В одном процессе просто перезаписывает файл. При нескольких воркерах
+    каждый пишет только свои чаты: записи чужих чатов берутся с диска под
+    файловой блокировкой, поэтому воркеры не затирают изменения друг друга.
+    """
+    store = Path(path).stem
+    with STORAGE_FLUSH_LATENCY.labels(store).time(), span(f"storage {store}"):
+        _write_shared_json(Path(path), data, chat_of, dump_kwargs)
+
+
+def _write_shared_json(path: Path, data: Dict[str, Any], chat_of: Callable[[str], int],
+                       dump_kwargs: Dict[str, Any]):
+    if worker.count == 1:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+        return
+
+    with _file_lock(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                current = json.load(f)
+        except (FileNotFoundError, ValueError):
+            current = {}
+
+        merged = {key: value for key, value in current.items() if not owns(chat_of(key))}
+        merged.update((key, value) for key, value in data.items() if owns(chat_of(key)))
+
+        tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(merged, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+
+
+def key_chat_id(key: str) -> int:
+    """chat_id из ключа вида "chat_id" или "chat_id,user_id" """
+    return int(key.split(",", 1)[0])
@@ -0,0 +1,106 @@
+import hashlib
+import re
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+BITS = 64
+_MASK = (1 << BITS) - 1
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Нормализованные слова: регистр, «ё», пунктуация"""
+    return _TOKEN_RE.findall(text.casefold().replace("ё", "е"))
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(text: str) -> int:
+    """64-битный SimHash по словам и парам соседних слов"""
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        return 0
+
+    weights = [0] * BITS
+    for feature in features:
+        h = _hash64(feature)
+        for bit in range(BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex:
+    """Окно последних отпечатков с поиском соседей через banded LSH.
+
+    Отпечаток режется на max_distance + 1 полос: по принципу Дирихле два
+    отпечатка на расстоянии не больше max_distance совпадают хотя бы в одной
+    полосе, поэтому сравнивать нужно только кандидатов из тех же корзин.
+    """
+
+    def __init__(self, max_distance: int = 3, capacity: int = 2000):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = BITS // self.bands
+        self._band_mask = (1 << self.band_bits) - 1
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(self.bands)]
+        self._counts: Dict[int, int] = {}
+        self._window: deque = deque()
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def _keys(self, fingerprint: int):
+        for band in range(self.bands):
+            yield band, fingerprint >> (band * self.band_bits) & self._band_mask
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """Ближайший известный отпечаток в пределах max_distance"""
+        if fingerprint in self._counts:
+            return fingerprint
+        for band, key in self._keys(fingerprint):
+            for candidate in self._buckets[band].get(key, ()):
+                if hamming(candidate, fingerprint) <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, fingerprint: int):
+        self._window.append(fingerprint)
+        count = self._counts.get(fingerprint, 0)
+        self._counts[fingerprint] = count + 1
+        if not count:
+            for band, key in self._keys(fingerprint):
+                self._buckets[band].setdefault(key, set()).add(fingerprint)
+
+        while len(self._window) > self.capacity:
+            self._remove(self._window.popleft())
+
+    def evict_oldest(self) -> int:
+        """Убирает самый старый отпечаток окна (для вытеснения по времени)"""
+        fingerprint = self._window.popleft()
+        self._remove(fingerprint)
+        return fingerprint
+
+    def _remove(self, fingerprint: int):
+        count = self._counts[fingerprint] - 1
+        if count:
+            self._counts[fingerprint] = count
+            return
+        del self._counts[fingerprint]
+        for band, key in self._keys(fingerprint):
+            bucket = self._buckets[band][key]
+            bucket.discard(fingerprint)
+            if not bucket:
+                del self._buckets[band][key]
@@ -3,6 +3,7 @@ import json
 from pathlib import Path
 from typing import Dict, List, Tuple
 import logging
+from services.sharding import key_chat_id, write_shared_json
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +13,12 @@ STATS_FILE = STATS_DIR / "stats.json"
 class StatsManager:
     def __init__(self):
         self.stats: Dict[Tuple[int, int], int] = {}  # (chat_id, user_id): count
-        print(f"Путь к файлу статистики: {STATS_FILE.absolute()}")
+
+    def load(self):
+        """Загружает статистику с диска (вызывается из main при старте)"""
         self._init_storage()
         self._load_stats()
-        print("Инициализирован StatsManager")
+        logger.info("Загружена статистика: %d записей из %s", len(self.stats), STATS_FILE)
 
     def _init_storage(self):
         try:
@@ -24,7 +27,7 @@ class StatsManager:
                 with open(STATS_FILE, "w", encoding="utf-8") as f:
                     json.dump({}, f, indent=2)
         except Exception as e:
-            logger.error(f"Ошибка инициализации хранилища: {str(e)}")
+            logger.error("Ошибка инициализации хранилища: %s", e)
 
     def _load_stats(self):
         try:
@@ -35,20 +38,19 @@ class StatsManager:
                     for key, count in data.items()
                 }
         except Exception as e:
-            logger.error(f"Ошибка загрузки: {str(e)}")
+            logger.error("Ошибка загрузки статистики: %s", e)
             self.stats = {}
 
     def _save_stats(self):
         try:
-            with open(STATS_FILE, "w", encoding="utf-8") as f:
-                # Конвертируем кортежи ключей в строки для JSON
-                serializable_data = {
-                    f"{chat_id},{user_id}": count 
-                    for (chat_id, user_id), count in self.stats.items()
-                }
-                json.dump(serializable_data, f, indent=2)
+            # Конвертируем кортежи ключей в строки для JSON
+            serializable_data = {
+                f"{chat_id},{user_id}": count 
+                for (chat_id, user_id), count in self.stats.items()
+            }
+            write_shared_json(STATS_FILE, serializable_data, key_chat_id, indent=2)
         except Exception as e:
-            print(f"Ошибка сохранения: {str(e)}")
+            logger.error("Ошибка сохранения статистики: %s", e)
 
     def update_user(self, chat_id: int, user_id: int):
         key = (chat_id, user_id)
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import secrets
+from typing import Any, Callable, Dict, List
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from config import config
+from services.send_queue import SharedTokenBucket
+from services.sharding import UpdateRouter
+from utils.helpers import telegram_api_server
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 30
+
+
+class Supervisor:
+    """Принимает апдейты и раздаёт их процессам-воркерам по chat_id.
+
+    Все апдейты одного чата попадают в один воркер, поэтому контексты AI,
+    антифлуд и FSM остаются локальными. Глобальный лимит отправки воркеры
+    делят через SharedTokenBucket. Воркер запускается как
+    target(index, count, updates, limiter_state, *args).
+    """
+
+    def __init__(self, workers: int, target: Callable, args: tuple = ()):
+        self.workers = workers
+        self.target = target
+        self.args = args
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues: List[multiprocessing.Queue] = []
+        self.processes: List[multiprocessing.Process] = []
+        self.routed = [0] * workers
+        self.router = UpdateRouter(workers)
+        # Держим ссылку: иначе семафор состояния удалится раньше, чем воркер его откроет
+        self.limiter_state = None
+
+    def start(self):
+        self.limiter_state = SharedTokenBucket.create_state(self._ctx, config.SEND_GLOBAL_RATE)
+        for index in range(self.workers):
+            updates = self._ctx.Queue()
+            process = self._ctx.Process(
+                target=self.target,
+                args=(index, self.workers, updates, self.limiter_state, *self.args),
+                name=f"bot-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            self.queues.append(updates)
+            self.processes.append(process)
+        logger.info("Started %s workers", self.workers)
+
+    def dispatch(self, update: Dict[str, Any]):
+        """Отправляет сырой апдейт воркеру, владеющему чатом"""
+        index = self.router.route(update)
+        self.routed[index] += 1
+        self.queues[index].put(update)
+
+    def stop(self, timeout: float = 10):
+        for updates in self.queues:
+            updates.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning("%s did not stop, terminating", process.name)
+                process.terminate()
+
+    async def run_polling(self, token: str, allowed_updates: List[str]):
+        """Long polling сырых апдейтов без разбора в моделях aiogram"""
+        offset = None
+        api = telegram_api_server()
+        async with aiohttp.ClientSession() as session:
+            await session.post(api.api_url(token, "deleteWebhook"))
+            url = api.api_url(token, "getUpdates")
+            while True:
+                payload = {"timeout": POLL_TIMEOUT, "allowed_updates": allowed_updates}
+                if offset is not None:
+                    payload["offset"] = offset
+                try:
+                    async with session.post(url, json=payload,
+                                            timeout=aiohttp.ClientTimeout(total=POLL_TIMEOUT + 10)) as response:
+                        data = await response.json()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error("getUpdates failed: %s", e)
+                    await asyncio.sleep(1)
+                    continue
+
+                if not data.get("ok"):
+                    retry_after = data.get("parameters", {}).get("retry_after", 1)
+                    logger.error("getUpdates error: %s", data.get('description'))
+                    await asyncio.sleep(retry_after)
+                    continue
+
+                for update in data["result"]:
+                    offset = update["update_id"] + 1
+                    self.dispatch(update)
+
+    async def run_webhook(self, bot: Bot, allowed_updates: List[str]):
+        """Webhook-приём: проверка секрета, маршрутизация и мгновенный ответ"""
+        if not config.WEBHOOK_URL:
+            raise RuntimeError("WEBHOOK_URL is required for BOT_MODE=webhook")
+
+        async def handle(request: web.Request) -> web.Response:
+            token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if config.WEBHOOK_SECRET and not secrets.compare_digest(token, config.WEBHOOK_SECRET):
+                return web.Response(body="Unauthorized", status=401)
+            self.dispatch(await request.json())
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_post(config.WEBHOOK_PATH, handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT).start()
+
+        url = config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH
+        await bot.set_webhook(url, secret_token=config.WEBHOOK_SECRET, allowed_updates=allowed_updates)
+        await bot.session.close()
+        logger.info("Supervisor webhook listening on %s:%s", config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+async def consume_updates(dp: Dispatcher, bot: Bot, updates: multiprocessing.Queue):
+    """Цикл воркера: забирает апдейты из очереди и обрабатывает их задачами"""
+    tasks = set()
+    while True:
+        batch = [await asyncio.to_thread(updates.get)]
+        # Забираем всё накопившееся за один переход в поток
+        while batch[-1] is not None:
+            try:
+                batch.append(updates.get_nowait())
+            except queue.Empty:
+                break
+
+        for update in batch:
+            if update is None:
+                await asyncio.gather(*tasks, return_exceptions=True)
+                return
+            task = asyncio.create_task(dp.feed_raw_update(bot, update))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
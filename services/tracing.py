@@ -0,0 +1,118 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+
+from config import config
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = 0.0
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+@dataclass
+class Trace:
+    update_id: int
+    kind: str
+    chat_id: Optional[int]
+    root: Span
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Дочерний спан текущего трейса; вне трейса ничего не делает.
+
+    Фоновые задачи наследуют контекст создавшего их апдейта, поэтому к уже
+    закрытому родителю спаны не добавляются.
+    """
+    parent = _current.get()
+    if parent is None or parent.end:
+        yield
+        return
+    child = Span(name)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+class Tracer:
+    """Трейсы апдейтов в кольцевом буфере.
+
+    Пока трейсинг выключен, спаны не создаются: span() видит пустой
+    контекст и сразу отдаёт управление.
+    """
+
+    def __init__(self, capacity: int = 1000, enabled: bool = False):
+        self.enabled = enabled
+        self.traces: Deque[Trace] = deque(maxlen=capacity)
+
+    @contextmanager
+    def trace(self, update_id: int, kind: str, chat_id: Optional[int]) -> Iterator[Trace]:
+        root = Span(kind)
+        record = Trace(update_id, kind, chat_id, root)
+        token = _current.set(root)
+        try:
+            yield record
+        except Exception as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            root.end = time.perf_counter()
+            _current.reset(token)
+            self.traces.append(record)
+
+    def slowest(self, count: int) -> List[Trace]:
+        return sorted(self.traces, key=lambda record: record.root.duration, reverse=True)[:count]
+
+    @staticmethod
+    def format(record: Trace) -> str:
+        header = (f"update {record.update_id} ({record.kind}, chat {record.chat_id}) "
+                  f"{record.root.duration * 1000:.1f} ms")
+        if record.error:
+            header += f" — {record.error}"
+        lines = [header]
+
+        def walk(node: Span, depth: int):
+            for child in node.children:
+                lines.append(f"{'  ' * depth}└ {child.name} {child.duration * 1000:.1f} ms")
+                walk(child, depth + 1)
+
+        walk(record.root, 1)
+        return "\n".join(lines)
+
+
+def traced(middleware: Callable[..., Awaitable[Any]], name: Optional[str] = None):
+    """Оборачивает middleware в спан; вне трейса вызывает его напрямую"""
+    name = name or type(middleware).__name__
+
+    async def wrapper(handler, event, data: Dict[str, Any]) -> Any:
+        if _current.get() is None:
+            return await middleware(handler, event, data)
+        with span(name):
+            return await middleware(handler, event, data)
+
+    return wrapper
+
+
+tracer = Tracer(capacity=config.TRACE_BUFFER_SIZE, enabled=config.TRACING_ENABLED)
@@ -1,6 +1,10 @@
 import json
+import logging
 from pathlib import Path
 from typing import Dict, Tuple
+from services.sharding import key_chat_id, write_shared_json
+
+logger = logging.getLogger(__name__)
 
 WARNS_DIR = Path(__file__).resolve().parent.parent / "stats"  # Используем ту же папку
 WARNS_FILE = WARNS_DIR / "warns.json"
@@ -8,9 +12,11 @@ WARNS_FILE = WARNS_DIR / "warns.json"
 class WarnManager:
     def __init__(self):
         self.warns: Dict[Tuple[int, int], int] = {}  # (chat_id, user_id): count
+
+    def load(self):
+        """Загружает варны с диска (вызывается из main при старте)"""
         self._init_storage()  # Добавляем инициализацию хранилища
         self._load_warns()
-        print("Инициализирован WarnManager")
 
     def _init_storage(self):
         """Создает файл и директорию при необходимости"""
@@ -18,14 +24,14 @@ class WarnManager:
         if not WARNS_FILE.exists():
             with open(WARNS_FILE, "w", encoding="utf-8") as f:
                 json.dump({}, f)
-            print("Создан новый файл варнов")
+            logger.info("Создан новый файл варнов %s", WARNS_FILE)
 
     # Остальные методы без изменений
     def _load_warns(self):
         try:
             if WARNS_FILE.stat().st_size == 0:
                 self.warns = {}
-                print("Файл варнов пуст")
+                logger.info("Файл варнов пуст")
                 return
 
             with open(WARNS_FILE, "r", encoding="utf-8") as f:
@@ -35,18 +41,17 @@ class WarnManager:
                     for key, count in data.items()
                     for chat_id, user_id in [key.split(",")]
                 }
-            print(f"Загружено варнов: {len(self.warns)}")
+            logger.info("Загружено варнов: %d", len(self.warns))
         except Exception as e:
-            print(f"Ошибка загрузки варнов: {str(e)}")
+            logger.error("Ошибка загрузки варнов: %s", e)
             self.warns = {}
 
     def _save_warns(self):
         try:
-            with open(WARNS_FILE, "w", encoding="utf-8") as f:
-                serialized = {f"{c},{u}": count for (c, u), count in self.warns.items()}
-                json.dump(serialized, f, indent=2)
+            serialized = {f"{c},{u}": count for (c, u), count in self.warns.items()}
+            write_shared_json(WARNS_FILE, serialized, key_chat_id, indent=2)
         except Exception as e:
-            print(f"Ошибка сохранения варнов: {str(e)}")
+            logger.error("Ошибка сохранения варнов: %s", e)
 
     def add_warn(self, chat_id: int, user_id: int) -> int:
         key = (chat_id, user_id)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Webhook-обработчик: мгновенный ответ Telegram и ограниченная фоновая обработка.
+
+    Апдейт подтверждается сразу, а обрабатывается в фоне — одновременно не
+    больше max_concurrency. Если необработанных апдейтов уже backlog, отвечаем
+    429: Telegram доставит апдейт повторно, а память не растёт без границ.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, secret_token: Optional[str] = None,
+                 max_concurrency: int = 100, backlog: int = 1000, **data: Any):
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.backlog = backlog
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def pending(self) -> int:
+        """Принятые, но ещё не обработанные апдейты"""
+        return len(self._background_feed_update_tasks)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        async with self._semaphore:
+            await super()._background_feed_update(bot, update)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if self.pending >= self.backlog:
+            logger.warning("Webhook backlog full (%s), asking Telegram to retry", self.pending)
+            return web.Response(status=429, text="Too Many Requests")
+        return await super()._handle_request_background(bot, request)
+
+
+def build_app(dp: Dispatcher, bot: Bot, **data: Any) -> web.Application:
+    """aiohttp-приложение с webhook-маршрутом и хуками startup/shutdown диспетчера"""
+    app = web.Application()
+    BoundedRequestHandler(
+        dp, bot,
+        secret_token=config.WEBHOOK_SECRET,
+        max_concurrency=config.WEBHOOK_MAX_CONCURRENCY,
+        backlog=config.WEBHOOK_BACKLOG,
+        **data
+    ).register(app, path=config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot, **data)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """Поднимает aiohttp-сервер и регистрирует webhook в Telegram"""
+    if not config.WEBHOOK_URL:
+        raise RuntimeError("WEBHOOK_URL is required for BOT_MODE=webhook")
+
+    runner = web.AppRunner(build_app(dp, bot))
+    await runner.setup()
+    site = web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+    await site.start()
+
+    url = config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH
+    await bot.set_webhook(
+        url,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types()
+    )
+    logger.info("Webhook listening on %s:%s, url %s", config.WEBHOOK_HOST, config.WEBHOOK_PORT, url)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
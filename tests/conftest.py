@@ -0,0 +1,6 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("BOT_TOKEN", "42:test")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
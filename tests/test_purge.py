@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from handlers import admin
+from services.message_log import MessageLog
+
+CHAT_ID = -100
+
+
+class FakeOutbound:
+    async def send(self, chat_id, call):
+        return await call()
+
+
+class FakeMessage:
+    def __init__(self, text: str, message_id: int):
+        self.text = text
+        self.message_id = message_id
+        self.chat = SimpleNamespace(id=CHAT_ID)
+        self.reply_to_message = None
+        self.bot = None
+        self.answers = []
+
+    async def answer(self, text: str):
+        self.answers.append(text)
+        return self
+
+    async def reply(self, text: str):
+        self.answers.append(text)
+        return self
+
+    async def edit_text(self, text: str):
+        self.answers.append(text)
+
+
+def test_purge_n_deletes_exactly_n_earlier_messages(monkeypatch):
+    log = MessageLog()
+    for message_id in range(1, 11):
+        log.record(CHAT_ID, message_id, user_id=7)
+    # MessageLogMiddleware записывает команду раньше, чем её увидит обработчик
+    log.record(CHAT_ID, 11, user_id=1)
+    deleted = []
+
+    async def fake_delete(bot, chat_id, ids, on_progress=None):
+        deleted.extend(sorted(ids))
+        return list(ids)
+
+    monkeypatch.setattr(admin, "message_log", log)
+    monkeypatch.setattr(admin, "outbound", FakeOutbound())
+    monkeypatch.setattr(admin, "delete_messages_batched", fake_delete)
+
+    asyncio.run(admin.purge_messages(FakeMessage("/purge 5", message_id=11)))
+
+    assert deleted == [6, 7, 8, 9, 10, 11]
+    assert log.recent(CHAT_ID, 100) == [5, 4, 3, 2, 1]
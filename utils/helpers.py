@@ -0,0 +1,50 @@
+import logging
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from aiogram import Bot
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+
+from config import config
+
+from services.send_queue import outbound
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 100  # Лимит deleteMessages в Bot API
+
+
+def telegram_api_server() -> TelegramAPIServer:
+    """Bot API из TELEGRAM_API_BASE (локальный сервер, заглушка) или api.telegram.org"""
+    if config.TELEGRAM_API_BASE:
+        return TelegramAPIServer.from_base(config.TELEGRAM_API_BASE.rstrip("/"))
+    return PRODUCTION
+
+
+async def delete_messages_batched(
+    bot: Bot,
+    chat_id: int,
+    message_ids: Iterable[int],
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+) -> List[int]:
+    """Удаляет сообщения пачками по 100 через deleteMessages; возвращает id из успешных пачек.
+
+    on_progress(done, total) вызывается после каждой пачки. Если не удалась
+    ни одна пачка (например, у бота нет права удалять), ошибка последней
+    пробрасывается.
+    """
+    ids: List[int] = sorted(set(message_ids))
+    deleted: List[int] = []
+    error: Optional[Exception] = None
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        chunk = ids[start:start + DELETE_BATCH_SIZE]
+        try:
+            await outbound.send(chat_id, lambda chunk=chunk: bot.delete_messages(chat_id, chunk))
+            deleted.extend(chunk)
+        except Exception as e:
+            error = e
+            logger.error("Failed to delete %s messages in %s: %s", len(chunk), chat_id, e)
+        if on_progress:
+            await on_progress(start + len(chunk), len(ids))
+    if error is not None and not deleted:
+        raise error
+    return deleted